@@ -1,7 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin import AdminSite
 from django.utils.html import format_html
-from .models import Hall, Booking
+from .models import Hall, Booking, ArchivedBooking, OutboxMessage, WaitlistEntry
+from .admission import admit_booking
+from .moderation import APPROVE, REJECT, moderate_bookings
 
 
 class HallBookingAdminSite(AdminSite):
@@ -54,6 +56,7 @@ class HallAdmin(admin.ModelAdmin):
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['booking_id', 'hall_name', 'user_name', 'booking_date', 'time_slot', 'status_badge', 'purpose']
     list_filter = ['status', 'booking_date', 'hall', 'created_at']
+    list_select_related = ['hall', 'user']
     search_fields = ['user__username', 'user__first_name', 'hall__name', 'purpose']
     date_hierarchy = 'booking_date'
     ordering = ['-booking_date', '-created_at']
@@ -110,32 +113,61 @@ class BookingAdmin(admin.ModelAdmin):
     status_badge.short_description = "Status"
     
     def approve_bookings(self, request, queryset):
-        updated = 0
-        for booking in queryset.filter(status='pending'):
-            booking.status = 'approved'
-            booking.approved_by = request.user
-            booking.rejection_reason = ''
-            booking.save()
-            updated += 1
-        self.message_user(request, f'{updated} booking(s) approved successfully.')
+        result = moderate_bookings(queryset, APPROVE, request.user)
+        self._report_moderation(request, result)
     approve_bookings.short_description = "✓ Approve selected bookings"
     
     def reject_bookings(self, request, queryset):
-        updated = 0
-        for booking in queryset.filter(status='pending'):
-            booking.status = 'rejected'
-            booking.approved_by = request.user
-            booking.save()
-            updated += 1
-        self.message_user(request, f'{updated} booking(s) rejected successfully.')
+        result = moderate_bookings(queryset, REJECT, request.user)
+        self._report_moderation(request, result)
     reject_bookings.short_description = "✗ Reject selected bookings"
     
+    def _report_moderation(self, request, result):
+        level = messages.WARNING if result.failures else messages.SUCCESS
+        self.message_user(request, result.summary(), level)
+        for booking_id, reason in result.failures.items():
+            self.message_user(request, f'Booking #{booking_id}: {reason}', messages.WARNING)
+    
     def save_model(self, request, obj, form, change):
         if obj.status == 'approved' and not obj.approved_by:
             obj.approved_by = request.user
-        super().save_model(request, obj, form, change)
+        admit_booking(obj)
     
     class Media:
         css = {
             'all': ('/static/css/admin.css',)
         }
+
+
+@admin.register(WaitlistEntry, site=admin_site)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['hall', 'user', 'booking_date', 'start_time', 'end_time', 'faculty', 'priority', 'status', 'created_at']
+    list_filter = ['status', 'faculty', 'hall']
+    list_select_related = ['hall', 'user']
+    search_fields = ['user__username', 'hall__name', 'purpose']
+    date_hierarchy = 'booking_date'
+    readonly_fields = ['created_at', 'booking']
+
+
+@admin.register(ArchivedBooking, site=admin_site)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ['id', 'hall', 'user', 'booking_date', 'start_time', 'end_time', 'status', 'archived_at']
+    list_filter = ['status', 'faculty', 'hall']
+    list_select_related = ['hall', 'user']
+    search_fields = ['user__username', 'hall__name', 'purpose']
+    date_hierarchy = 'booking_date'
+
+    # The archive is history: rows only arrive through archive_bookings
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxMessage, site=admin_site)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'channel', 'recipient', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'channel']
+    search_fields = ['recipient']
+    readonly_fields = ['channel', 'recipient', 'payload', 'attempts', 'last_error', 'created_at', 'sent_at']
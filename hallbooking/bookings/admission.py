@@ -0,0 +1,90 @@
+"""Concurrency-safe booking admission.
+
+Bookings for the same hall and date are serialized on a ``HallDayLock``
+row, so two overlapping requests cannot both pass the conflict check.
+Requests for different halls or days never wait on each other. On
+PostgreSQL an exclusion constraint (migration 0005) backs this up at the
+database level.
+"""
+import random
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+
+from .conflicts import ACTIVE_STATUSES
+from .models import HallDayLock
+
+
+CONFLICT_MESSAGE = "Time slot conflicts with existing booking"
+
+# SQLite reports a busy writer as an error rather than blocking (always
+# for shared-cache databases, otherwise once its timeout expires), so
+# admission is retried a few times with jittered backoff.
+SQLITE_LOCK_RETRIES = 20
+SQLITE_LOCK_BACKOFF = 0.01
+
+
+def lock_hall_day(hall_id, booking_date):
+    """Lock the (hall, date) row for the rest of the current transaction."""
+    if connection.features.has_select_for_update:
+        lock, _ = HallDayLock.objects.get_or_create(hall_id=hall_id, date=booking_date)
+        HallDayLock.objects.select_for_update().get(pk=lock.pk)
+        return
+    # SQLite has no row locks. Making the first statement a write takes the
+    # database write lock before any conflict read, which has the same effect.
+    updated = HallDayLock.objects.filter(hall_id=hall_id, date=booking_date).update(
+        version=F('version') + 1
+    )
+    if not updated:
+        HallDayLock.objects.create(hall_id=hall_id, date=booking_date)
+
+
+def lock_hall_days(hall_id, dates):
+    """Lock several (hall, date) rows at once, in date order."""
+    dates = sorted(set(dates))
+    # The insert doubles as the up-front write that SQLite needs
+    HallDayLock.objects.bulk_create(
+        [HallDayLock(hall_id=hall_id, date=day) for day in dates], ignore_conflicts=True
+    )
+    if connection.features.has_select_for_update:
+        list(HallDayLock.objects.select_for_update().filter(
+            hall_id=hall_id, date__in=dates
+        ).order_by('date'))
+
+
+def admit_booking(booking):
+    """Validate and save ``booking`` while holding its hall-day lock.
+
+    Raises ValidationError if the slot is taken, including when a
+    concurrent request wins the race and the database rejects the row.
+    """
+    # Field validation reads the hall row, so do it before the transaction
+    # starts; on SQLite the lock write has to be the first statement.
+    booking.clean_fields()
+    pk, adding = booking.pk, booking._state.adding
+    attempt = 0
+    while True:
+        try:
+            return _admit(booking)
+        except OperationalError as e:
+            attempt += 1
+            if (connection.vendor != 'sqlite' or 'locked' not in str(e)
+                    or attempt >= SQLITE_LOCK_RETRIES or connection.in_atomic_block):
+                raise
+            booking.pk, booking._state.adding = pk, adding
+            time.sleep(SQLITE_LOCK_BACKOFF * attempt * random.uniform(0.5, 1.5))
+
+
+def _admit(booking):
+    try:
+        with transaction.atomic():
+            if booking.status in ACTIVE_STATUSES:
+                lock_hall_day(booking.hall_id, booking.booking_date)
+            booking.clean()
+            booking.validate_unique()
+            booking.save(validate=False)
+    except IntegrityError:
+        raise ValidationError(CONFLICT_MESSAGE)
+    return booking
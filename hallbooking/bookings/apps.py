@@ -5,3 +5,6 @@ class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookings'
     verbose_name = 'Hall Bookings'
+
+    def ready(self):
+        from . import precompile, signals  # noqa: F401
@@ -0,0 +1,67 @@
+"""Archival of past bookings.
+
+Bookings only ever accumulate, and every live view, status filter and
+conflict check pays for the history in the table and its indexes.
+``manage.py archive_bookings --before DATE`` moves closed bookings into
+``ArchivedBooking``, keeping their ids: cancelled and rejected ones of any
+date, and approved ones dated before the cutoff (which may not be in the
+future). Pending bookings stay until they are moderated. Each batch is
+copied and deleted in one transaction.
+
+The live views read ``Booking`` only. ``DailyBookingStat`` keeps counting
+archived bookings, so reports cover both tables without reading either,
+and ``rebuild_daily_stats`` and the export read both.
+"""
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import ArchivedBooking, Booking, WaitlistEntry
+from .occupancy import refresh_occupancy
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Nothing can happen to these any more
+CLOSED_STATUSES = ('cancelled', 'rejected')
+
+
+def closed_bookings(before):
+    """Bookings that ``archive_bookings`` moves for the cutoff ``before``."""
+    return Booking.objects.filter(
+        Q(status__in=CLOSED_STATUSES) | Q(status='approved', booking_date__lt=before)
+    )
+
+
+def _delete(ids):
+    # Straight SQL: no delete signals (the stats keep counting archived
+    # bookings) and no cascade, the waitlist links are cleared above
+    table, pk = (connection.ops.quote_name(name) for name in (Booking._meta.db_table, 'id'))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({", ".join(["%s"] * len(ids))})', ids)
+
+
+def archive_bookings(before, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Move closed bookings (see ``closed_bookings``) to the archive; return how many moved."""
+    if before > datetime.now().date():
+        raise ValueError('The archive cutoff cannot be in the future')
+    bookings = closed_bookings(before)
+    if dry_run:
+        return bookings.count()
+    moved, last_id = 0, 0
+    while True:
+        with transaction.atomic():
+            # Keyset over the primary key, so each batch starts where the last stopped
+            batch = list(
+                bookings.filter(id__gt=last_id).order_by('id').select_for_update()[:batch_size]
+            )
+            if not batch:
+                return moved
+            ids = [booking.id for booking in batch]
+            ArchivedBooking.objects.bulk_create(ArchivedBooking.from_booking(b) for b in batch)
+            WaitlistEntry.objects.filter(booking_id__in=ids).update(booking=None)
+            _delete(ids)
+            refresh_occupancy({(b.hall_id, b.booking_date) for b in batch})
+        moved += len(batch)
+        last_id = ids[-1]
@@ -0,0 +1,40 @@
+"""Cached ``request.user`` lookups.
+
+``AuthenticationMiddleware`` loads the logged-in user through the session's
+backend on every request. ``CachedModelBackend.get_user`` serves it from
+the ``AUTH_USER_CACHE`` cache and only queries the database on a miss.
+Saving or deleting a user drops its entry (see ``signals.py``), so a
+password, permission or ``is_active`` change applies on the next request
+in this process; other processes only see it once their entry expires
+unless the cache is shared. ``AUTH_USER_CACHE_TIMEOUT = 0`` turns caching off.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE', 'default')]
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_user(user_id):
+    _cache().delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 0)
+        if not timeout:
+            return super().get_user(user_id)
+        cache = _cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout)
+        return user
@@ -0,0 +1,121 @@
+"""Per-day slot bitmaps for hall availability.
+
+A day is split into 96 quarter-hour slots. Bit ``i`` of a day's bitmap is
+set when slot ``i`` (starting at ``i * 15`` minutes past midnight) overlaps
+an active booking. Bitmaps are sent to the browser as 24-digit hex
+strings, least significant bit first, i.e. slot 0 is the lowest bit of the
+last hex digit.
+
+Each hall-day's bitmap is stored, in that hex form, on its
+``HallDayOccupancy`` row (see ``occupancy``), so a range of days costs one
+indexed read of at most one row per hall-day.
+"""
+from datetime import timedelta
+
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+HEX_WIDTH = SLOTS_PER_DAY // 4
+
+# Longest range a single request may ask for
+MAX_RANGE_DAYS = 366
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def slot_mask(start_time, end_time):
+    """Return the bitmap of slots touched by [start_time, end_time)."""
+    first = _minutes(start_time) // SLOT_MINUTES
+    last = -(-_minutes(end_time) // SLOT_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def is_free(bitmap, start_time, end_time):
+    """Check whether every slot of [start_time, end_time) is free in ``bitmap``."""
+    return not bitmap & slot_mask(start_time, end_time)
+
+
+def to_hex(bitmap):
+    return format(bitmap, f'0{HEX_WIDTH}x')
+
+
+def from_hex(value):
+    return int(value, 16)
+
+
+def date_range(date_from, date_to):
+    day = date_from
+    while day <= date_to:
+        yield day
+        day += timedelta(days=1)
+
+
+def busy_runs(bitmap):
+    """Yield ``(start_minute, end_minute)`` for each run of busy slots in ``bitmap``."""
+    slot = 0
+    while bitmap:
+        # Skip to the next busy slot, then to the end of its run
+        skip = (bitmap & -bitmap).bit_length() - 1
+        bitmap >>= skip
+        slot += skip
+        run = (~bitmap & (bitmap + 1)).bit_length() - 1
+        yield slot * SLOT_MINUTES, (slot + run) * SLOT_MINUTES
+        bitmap >>= run
+        slot += run
+
+
+def _busy_rows(hall_ids, date_from, date_to):
+    from .models import HallDayOccupancy
+
+    return HallDayOccupancy.objects.filter(
+        hall_id__in=hall_ids,
+        date__range=(date_from, date_to),
+    ).values_list('hall_id', 'date', 'busy')
+
+
+def busy_bitmaps(hall_ids, date_from, date_to):
+    """Return ``{(hall_id, date): bitmap}`` for days with active bookings.
+
+    Days without bookings are simply absent.
+    """
+    return {(hall_id, day): from_hex(busy) for hall_id, day, busy in _busy_rows(hall_ids, date_from, date_to)}
+
+
+async def abusy_bitmaps(hall_ids, date_from, date_to):
+    return {(hall_id, day): from_hex(busy) async for hall_id, day, busy in _busy_rows(hall_ids, date_from, date_to)}
+
+
+def availability_payload(halls, date_from, date_to):
+    """Build the JSON body for the range availability API."""
+    bitmaps = busy_bitmaps([hall.id for hall in halls], date_from, date_to)
+    return _payload(halls, date_from, date_to, bitmaps)
+
+
+async def aavailability_payload(halls, date_from, date_to):
+    bitmaps = await abusy_bitmaps([hall.id for hall in halls], date_from, date_to)
+    return _payload(halls, date_from, date_to, bitmaps)
+
+
+def _payload(halls, date_from, date_to, bitmaps):
+    days = list(date_range(date_from, date_to))
+    return {
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'slot_minutes': SLOT_MINUTES,
+        'halls': [
+            {
+                'id': hall.id,
+                'name': hall.name,
+                'days': {
+                    day.isoformat(): to_hex(bitmaps.get((hall.id, day), 0))
+                    for day in days
+                },
+            }
+            for hall in halls
+        ],
+    }
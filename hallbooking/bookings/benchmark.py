@@ -0,0 +1,326 @@
+"""Reproducible request benchmarks.
+
+Each scenario is a deterministic list of requests against one view. Two
+drivers replay them:
+
+* ``run_client`` sends them one at a time through the Django test client
+  and counts the SQL each request runs.
+* ``run_wsgi`` serves the project's WSGI application from a threaded
+  server on a free local port and sends them from ``concurrency`` worker
+  threads. Queries per request come from the metrics middleware registry.
+
+Both return per-scenario summaries (p50/p95/p99 latency, queries per
+request, throughput) that the ``benchmark`` command writes as JSON.
+``run_hashers`` times the configured password hashers and
+``run_templates`` times rendering the heaviest templates on their own.
+"""
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as clock, timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .metrics import registry
+from .models import Booking, Hall
+from .seed import FACULTIES
+
+
+SCENARIOS = (
+    'index', 'hall_detail', 'check_availability', 'availability_range',
+    'my_bookings', 'admin_reports', 'book_hall',
+)
+# The WSGI driver only replays GETs; POSTs would need a CSRF round trip
+WSGI_SCENARIOS = tuple(s for s in SCENARIOS if s != 'book_hall')
+
+
+class BenchRequest:
+    def __init__(self, method, path, data=None, user=None):
+        self.method = method
+        self.path = path
+        self.data = data
+        self.user = user
+
+
+class Workload:
+    """Builds the request lists for each scenario from the seeded data"""
+
+    def __init__(self, staff, users, seed):
+        self.staff = staff
+        self.users = list(users)
+        self.seed = seed
+        self.halls = list(Hall.objects.order_by('id'))
+        self.dates = sorted(set(Booking.objects.values_list('booking_date', flat=True)))
+        if not self.dates:
+            raise ValueError('The workload needs seeded bookings to pick dates from')
+        # book_hall writes into days after the seeded data so it never conflicts
+        self.free_from = self.dates[-1] + timedelta(days=1)
+        self._booked = 0
+
+    def requests(self, scenario, count):
+        rng = random.Random(f'{self.seed}:{scenario}')
+        build = getattr(self, f'_{scenario}')
+        return [build(rng) for _ in range(count)]
+
+    def _index(self, rng):
+        return BenchRequest('GET', reverse('index'), user=rng.choice(self.users))
+
+    def _hall_detail(self, rng):
+        return BenchRequest('GET', reverse('hall_detail', args=[rng.choice(self.halls).id]))
+
+    def _check_availability(self, rng):
+        query = urlencode({'hall_id': rng.choice(self.halls).id, 'date': rng.choice(self.dates)})
+        return BenchRequest('GET', f"{reverse('check_availability')}?{query}")
+
+    def _availability_range(self, rng):
+        date_from = rng.choice(self.dates)
+        query = urlencode({'from': date_from, 'to': date_from + timedelta(days=30)})
+        return BenchRequest('GET', f"{reverse('availability_range')}?{query}")
+
+    def _my_bookings(self, rng):
+        return BenchRequest('GET', reverse('my_bookings'), user=rng.choice(self.users))
+
+    def _admin_reports(self, rng):
+        return BenchRequest('GET', reverse('admin_reports'), user=self.staff)
+
+    def _book_hall(self, rng):
+        i = self._booked
+        self._booked += 1
+        hall = self.halls[i % len(self.halls)]
+        slot = (i // len(self.halls)) % 10
+        day = self.free_from + timedelta(days=i // (len(self.halls) * 10))
+        return BenchRequest('POST', reverse('book_hall', args=[hall.id]), user=rng.choice(self.users), data={
+            'booking_date': day.isoformat(),
+            'start_time': f'{8 + slot:02d}:00',
+            'end_time': f'{9 + slot:02d}:00',
+            'purpose': 'Benchmark booking',
+            'expected_attendees': 10,
+            'faculty': rng.choice(FACULTIES),
+        })
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 3)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'max_ms': ms(latencies[-1]) if latencies else None,
+        'queries_per_request': round(queries, 2) if queries is not None else None,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+def _is_success(scenario, status):
+    # A successful booking redirects to its confirmation page
+    return status == 302 if scenario == 'book_hall' else status == 200
+
+
+def run_client(workload, scenarios, count):
+    """Replay each scenario sequentially through the test client.
+
+    Every user keeps one logged-in client, i.e. one session, for the run.
+    """
+    results = {}
+    clients = {None: Client()}
+    for scenario in scenarios:
+        latencies, query_counts, errors = [], [], 0
+        started = time.perf_counter()
+        for req in workload.requests(scenario, count):
+            client = clients.get(req.user)
+            if client is None:
+                client = clients[req.user] = Client()
+                client.force_login(req.user)
+            send = client.post if req.method == 'POST' else client.get
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = send(req.path, req.data)
+                latencies.append(time.perf_counter() - start)
+            query_counts.append(len(ctx.captured_queries))
+            errors += not _is_success(scenario, response.status_code)
+        elapsed = time.perf_counter() - started
+        results[scenario] = summarize(latencies, sum(query_counts) / len(query_counts), errors, elapsed)
+    return results
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchServer:
+    """Threaded WSGI server for the project on 127.0.0.1 and a free port"""
+
+    def __init__(self):
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), _QuietRequestHandler)
+        self.server.set_app(WSGIHandler())
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def _fetch(url, cookie):
+    request = urllib.request.Request(url, headers={'Cookie': cookie} if cookie else {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return time.perf_counter() - start, status
+
+
+def run_wsgi(workload, scenarios, count, concurrency):
+    """Replay each GET scenario over HTTP from ``concurrency`` threads.
+
+    Needs ``METRICS_SAMPLE_RATE = 1`` for the per-request query counts.
+    """
+    results = {}
+    cookies = {}
+    with BenchServer() as server, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for scenario in scenarios:
+            jobs = []
+            for req in workload.requests(scenario, count):
+                if req.user is not None and req.user.pk not in cookies:
+                    cookies[req.user.pk] = session_cookie(req.user)
+                jobs.append((server.base_url + req.path, cookies.get(getattr(req.user, 'pk', None))))
+
+            registry.reset()
+            started = time.perf_counter()
+            outcomes = list(pool.map(lambda job: _fetch(*job), jobs))
+            elapsed = time.perf_counter() - started
+
+            metrics = registry.get(scenario)
+            queries = metrics.queries.sum / metrics.queries.count if metrics and metrics.queries.count else None
+            errors = sum(not _is_success(scenario, status) for _, status in outcomes)
+            results[scenario] = summarize([latency for latency, _ in outcomes], queries, errors, elapsed)
+    registry.reset()
+    return results
+
+
+def run_hashers(rounds=3, password='benchmark-password'):
+    """Mean encode and verify time of each usable hasher in PASSWORD_HASHERS."""
+    results = {}
+    for hasher in get_hashers():
+        try:
+            hasher.encode(password, hasher.salt())
+        except ValueError:
+            # Its library (argon2-cffi, bcrypt) is not installed
+            continue
+        encode, verify = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            encoded = hasher.encode(password, hasher.salt())
+            encode.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            hasher.verify(password, encoded)
+            verify.append(time.perf_counter() - start)
+        results[hasher.algorithm] = {
+            'encode_ms': round(sum(encode) / rounds * 1000, 1),
+            'verify_ms': round(sum(verify) / rounds * 1000, 1),
+        }
+    return results
+
+
+TEMPLATE_SCENARIOS = ('bookings/index.html', 'bookings/hall_detail.html', 'bookings/my_bookings.html')
+
+
+def template_contexts(size):
+    """Contexts like the views build, with ``size`` halls or bookings and no database rows."""
+    user = User(id=1, username='bench_user')
+    halls = [
+        Hall(
+            id=i, name=f'Hall {i}', capacity=50 + i, location=f'Block {i % 5}',
+            description='A well lit hall with a stage, a projector and seating in rows. ' * 3,
+            amenities='Projector, Sound System, Air Conditioning, Stage',
+        )
+        for i in range(1, size + 1)
+    ]
+    statuses = [status for status, _ in Booking.STATUS_CHOICES]
+    bookings = [
+        Booking(
+            id=i, hall=halls[i % len(halls)], user=user, booking_date=date(2030, 1, 1) + timedelta(days=i),
+            start_time=clock(9 + i % 8), end_time=clock(10 + i % 8), purpose=f'Event {i}',
+            expected_attendees=40, status=statuses[i % len(statuses)],
+            rejection_reason='Clashes with exams' if i % 7 == 0 else '',
+        )
+        for i in range(1, size + 1)
+    ]
+    return user, {
+        'bookings/index.html': {'halls': halls, 'total_halls': len(halls)},
+        'bookings/hall_detail.html': {
+            'hall': halls[0], 'bookings': bookings, 'amenities': halls[0].amenities_list, 'next_cursor': 'x',
+        },
+        'bookings/my_bookings.html': {
+            'bookings': bookings, 'next_cursor': 'x',
+            'total_count': size, 'pending_count': size // 3, 'approved_count': size // 3,
+        },
+    }
+
+
+def run_templates(rounds=50, size=200):
+    """Render time of each of TEMPLATE_SCENARIOS with ``size`` halls or bookings.
+
+    Every round gets a new ``catalog_version``, so the ``{% cache %}``
+    fragments are rendered rather than read back from the cache.
+    """
+    user, contexts = template_contexts(size)
+    request = RequestFactory().get('/')
+    request.user = user
+    results = {}
+    for name, context in contexts.items():
+        latencies = []
+        for i in range(rounds):
+            context['catalog_version'] = f'bench-{datetime.now().timestamp()}-{i}'
+            start = time.perf_counter()
+            render_to_string(name, context, request=request)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        results[name] = {
+            'rounds': rounds,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'mean_ms': round(sum(latencies) / rounds * 1000, 3),
+        }
+    return results
@@ -0,0 +1,120 @@
+"""Cached hall catalog.
+
+The list of halls changes rarely but is read on every ``index`` and
+``hall_detail`` hit, so it is kept in Django's cache under a version key.
+Saving or deleting a Hall (see ``signals.py``) bumps the version, which
+orphans the old entries instead of deleting them; template fragments
+cached with ``{% cache ... catalog_version %}`` go stale the same way.
+
+The cache alias and timeout come from ``HALL_CATALOG_CACHE`` and
+``HALL_CATALOG_TIMEOUT`` in settings. The version key expires with the
+entries, so with a per-process cache such as the LocMem default, where a
+bump only reaches the process that saved the hall, the other workers
+catch up (and change their ETags) within the timeout.
+
+Catalog misses read from ``DEFAULT_DB_ALIAS``: a lagging replica must
+never put old halls in the cache, and asking the router for the write
+alias would pin the visitor to the primary (see ``routers``). The ``a``-prefixed functions are the
+async equivalents for async views.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+
+VERSION_KEY = 'hall_catalog:version'
+
+
+def _cache():
+    return caches[getattr(settings, 'HALL_CATALOG_CACHE', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'HALL_CATALOG_TIMEOUT', 60)
+
+
+def catalog_version():
+    """Return the current catalog version, starting a new one if unset."""
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so an evicted counter never reuses an old version
+        version = time.time_ns()
+        if not cache.add(VERSION_KEY, version, timeout=_timeout()):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+async def acatalog_version():
+    cache = _cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(VERSION_KEY, version, timeout=_timeout()):
+            version = await cache.aget(VERSION_KEY, version)
+    return version
+
+
+def invalidate_catalog():
+    """Move to a new catalog version."""
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=_timeout())
+
+
+def get_catalog():
+    """Return ``(version, halls)`` with every Hall, amenities pre-parsed."""
+    from .models import Hall
+
+    cache = _cache()
+    version = catalog_version()
+    key = f'hall_catalog:{version}:halls'
+    halls = cache.get(key)
+    if halls is None:
+        halls = list(Hall.objects.using(DEFAULT_DB_ALIAS))
+        for hall in halls:
+            hall.amenities_list  # parsed once, then cached on the instance
+        cache.set(key, halls, timeout=_timeout())
+    return version, halls
+
+
+async def aget_catalog():
+    from .models import Hall
+
+    cache = _cache()
+    version = await acatalog_version()
+    key = f'hall_catalog:{version}:halls'
+    halls = await cache.aget(key)
+    if halls is None:
+        halls = [hall async for hall in Hall.objects.using(DEFAULT_DB_ALIAS)]
+        for hall in halls:
+            hall.amenities_list
+        await cache.aset(key, halls, timeout=_timeout())
+    return version, halls
+
+
+def available_halls():
+    """Return ``(version, halls)`` for halls open for booking."""
+    version, halls = get_catalog()
+    return version, [hall for hall in halls if hall.available]
+
+
+def get_hall(hall_id):
+    """Return ``(version, hall)`` from the catalog, or ``(version, None)``."""
+    version, halls = get_catalog()
+    for hall in halls:
+        if hall.id == hall_id:
+            return version, hall
+    return version, None
+
+
+async def aget_hall(hall_id):
+    version, halls = await aget_catalog()
+    for hall in halls:
+        if hall.id == hall_id:
+            return version, hall
+    return version, None
@@ -0,0 +1,111 @@
+"""Time-slot conflict detection for hall bookings.
+
+Single bookings are checked with one indexed overlap query against the
+database. Bulk paths (imports, batch moderation, recurring series) load a
+hall-day once and check candidates in memory with ``IntervalSet`` or
+``sweep_conflicts``; the free-slot search walks ``IntervalSet.gaps``.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+
+
+# Statuses that hold a time slot
+ACTIVE_STATUSES = ('pending', 'approved')
+
+
+def overlapping_bookings(hall_id, booking_date, start_time, end_time, exclude_id=None):
+    """Return active bookings on the hall-day that overlap [start_time, end_time)."""
+    from .models import Booking
+
+    qs = Booking.objects.filter(
+        hall_id=hall_id,
+        booking_date=booking_date,
+        status__in=ACTIVE_STATUSES,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    )
+    if exclude_id is not None:
+        qs = qs.exclude(id=exclude_id)
+    return qs
+
+
+def has_conflict(hall_id, booking_date, start_time, end_time, exclude_id=None):
+    """Check for an overlapping active booking with a single EXISTS query."""
+    return overlapping_bookings(
+        hall_id, booking_date, start_time, end_time, exclude_id=exclude_id
+    ).exists()
+
+
+class IntervalSet:
+    """Sorted, merged set of half-open time intervals for one hall-day.
+
+    Overlapping or touching intervals are merged on insert, so the stored
+    blocks are disjoint and both their starts and ends are sorted. That
+    lets ``overlaps`` answer with one binary search.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return iter(zip(self._starts, self._ends))
+
+    def overlaps(self, start, end):
+        """Return True if [start, end) intersects any stored interval."""
+        idx = bisect_left(self._starts, end)
+        return idx > 0 and self._ends[idx - 1] > start
+
+    def add(self, start, end):
+        """Insert [start, end), merging it with any blocks it touches."""
+        lo = bisect_left(self._ends, start)
+        hi = bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+    def gaps(self, start, end):
+        """Yield the free ``(gap_start, gap_end)`` intervals inside [start, end)."""
+        cursor = start
+        # Blocks ending at or before ``start`` cannot cut into the window
+        first = bisect_right(self._ends, start)
+        for block_start, block_end in zip(self._starts[first:], self._ends[first:]):
+            if block_start >= end:
+                break
+            if block_start > cursor:
+                yield cursor, block_start
+            cursor = max(cursor, block_end)
+        if cursor < end:
+            yield cursor, end
+
+    def try_add(self, start, end):
+        """Insert [start, end) unless it overlaps; return whether it was added."""
+        if self.overlaps(start, end):
+            return False
+        self.add(start, end)
+        return True
+
+
+def sweep_conflicts(intervals):
+    """Return the set of key pairs whose intervals overlap.
+
+    ``intervals`` is an iterable of ``(start, end, key)`` tuples. Intervals
+    are swept in start order while a heap keyed on end time holds the ones
+    still open, so the cost is O(n log n) plus the number of overlaps.
+    """
+    active = []
+    pairs = set()
+    for seq, (start, end, key) in enumerate(sorted(intervals, key=lambda i: (i[0], i[1]))):
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, _, other in active:
+            pairs.add((other, key))
+        heapq.heappush(active, (end, seq, key))
+    return pairs
@@ -0,0 +1,250 @@
+"""Live hall availability over server-sent events.
+
+Whenever bookings change, the new busy-slot bitmap (see ``availability``)
+of every affected hall-day is published on the hall's channel once the
+transaction commits. ``hall_events`` streams a channel to the browser.
+
+Events go through a pub/sub backend chosen by ``BOOKING_EVENTS_BACKEND``.
+The default ``InProcessBackend`` only reaches viewers connected to the
+same process; a backend with the same interface on e.g. Redis pub/sub is
+needed once there is more than one. Each channel keeps the last
+``BOOKING_EVENTS_REPLAY`` events, so a client reconnecting with
+``Last-Event-ID`` gets what it missed, or a ``reset`` event telling it to
+refetch when that is no longer possible.
+
+Streams are only served under ASGI, where a waiting stream costs an idle
+coroutine. Under WSGI, Django 4.2 reads an async iterator to the end
+before sending anything, which would hold a worker thread for the
+stream's whole lifetime and deliver nothing live; ``hall_events`` answers
+204 there instead, which tells ``EventSource`` not to reconnect, and the
+pages leave the stream closed (``live_events``).
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .availability import busy_bitmaps, to_hex
+
+
+DEFAULT_BACKEND = 'bookings.events.InProcessBackend'
+DEFAULT_REPLAY = 200
+
+# Events a slow subscriber may fall behind by before it is sent a reset
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Browsers wait this long before reconnecting a dropped stream
+RETRY_MS = 3000
+
+
+class Event:
+    def __init__(self, id, name, data):
+        self.id = id
+        self.name = name
+        self.data = data
+
+    def encode(self):
+        return f'id: {self.id}\nevent: {self.name}\ndata: {json.dumps(self.data)}\n\n'
+
+
+# Queued to a subscriber in place of the events it could not keep up with
+OVERFLOW = Event(None, 'overflow', None)
+
+
+class Subscription:
+    """Receives a channel's events on the event loop that created it"""
+
+    def __init__(self, backend, channel):
+        self.backend = backend
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Hand ``event`` over from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is closed; the stream is gone
+            self.close()
+
+    def _put(self, event):
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = OVERFLOW
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.backend.unsubscribe(self)
+
+
+class InProcessBackend:
+    """Thread-safe pub/sub with a bounded replay buffer per channel"""
+
+    def __init__(self, replay=DEFAULT_REPLAY):
+        self.replay_size = replay
+        self._lock = threading.Lock()
+        # Seeded from the clock so ids keep increasing across restarts
+        self._first_id = self._last_id = time.time_ns()
+        self._history = defaultdict(lambda: deque(maxlen=self.replay_size))
+        self._evicted = {}
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, name, data):
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, name, data)
+            history = self._history[channel]
+            if len(history) == history.maxlen:
+                self._evicted[channel] = history[0].id
+            history.append(event)
+            subscribers = list(self._subscribers[channel])
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.channel].discard(subscription)
+
+    def last_id(self):
+        return self._last_id
+
+    def replay(self, channel, after_id):
+        """Return ``(events, complete)`` for ``channel`` after event ``after_id``.
+
+        ``complete`` is False when some of those events are no longer held,
+        e.g. evicted from the buffer or published before a restart.
+        """
+        with self._lock:
+            events = [event for event in self._history.get(channel, ()) if event.id > after_id]
+            complete = after_id >= max(self._first_id, self._evicted.get(channel, 0))
+        return events, complete
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = import_string(getattr(settings, 'BOOKING_EVENTS_BACKEND', DEFAULT_BACKEND))
+                _backend = backend_class(replay=getattr(settings, 'BOOKING_EVENTS_REPLAY', DEFAULT_REPLAY))
+    return _backend
+
+
+def reset_backend():
+    """Drop the backend so the next get_backend() builds a fresh one (for tests)."""
+    global _backend
+    _backend = None
+
+
+def serves_streams(request):
+    """Whether ``request`` came through the ASGI handler, which can stream events."""
+    return isinstance(request, ASGIRequest)
+
+
+def live_events(request):
+    """Context processor: ``live_events`` is True when pages may open an event stream."""
+    return {'live_events': serves_streams(request)}
+
+
+def hall_channel(hall_id):
+    return f'hall:{hall_id}'
+
+
+def publish_hall_days(hall_days):
+    """Publish the current bitmap of each ``(hall_id, date)`` after commit."""
+    hall_days = set(hall_days)
+    if hall_days:
+        transaction.on_commit(lambda: _publish_bitmaps(hall_days))
+
+
+def publish_booking_changes(bookings):
+    publish_hall_days(booking.stat_key()[:2] for booking in bookings)
+
+
+def publish_reset(hall_ids):
+    """Tell viewers of ``hall_ids`` to refetch everything, after commit."""
+    hall_ids = set(hall_ids)
+    if hall_ids:
+        transaction.on_commit(lambda: _publish_resets(hall_ids))
+
+
+def _publish_bitmaps(hall_days):
+    days = [day for _, day in hall_days]
+    bitmaps = busy_bitmaps({hall_id for hall_id, _ in hall_days}, min(days), max(days))
+    backend = get_backend()
+    for hall_id, day in sorted(hall_days):
+        backend.publish(hall_channel(hall_id), 'availability', {
+            'hall_id': hall_id,
+            'date': day.isoformat(),
+            'busy': to_hex(bitmaps.get((hall_id, day), 0)),
+        })
+
+
+def _publish_resets(hall_ids):
+    backend = get_backend()
+    for hall_id in sorted(hall_ids):
+        backend.publish(hall_channel(hall_id), 'reset', {'hall_id': hall_id})
+
+
+async def stream(channel, last_event_id=None):
+    """Yield the SSE body for ``channel``, starting after ``last_event_id``.
+
+    Sends a comment every ``BOOKING_EVENTS_HEARTBEAT_SECONDS`` so proxies
+    keep the connection open, and ends after ``BOOKING_EVENTS_STREAM_SECONDS``;
+    the browser then reconnects with the last id it saw.
+    """
+    heartbeat = getattr(settings, 'BOOKING_EVENTS_HEARTBEAT_SECONDS', 15)
+    lifetime = getattr(settings, 'BOOKING_EVENTS_STREAM_SECONDS', 300)
+    backend = get_backend()
+    # Subscribe before replaying so nothing published in between is lost
+    subscription = backend.subscribe(channel)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        if last_event_id is not None:
+            missed, complete = backend.replay(channel, last_event_id)
+            if not complete:
+                last_event_id = backend.last_id()
+                yield Event(last_event_id, 'reset', {}).encode()
+                missed = []
+            for event in missed:
+                yield event.encode()
+                last_event_id = event.id
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + lifetime
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(subscription.get(), min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is OVERFLOW:
+                yield Event(backend.last_id(), 'reset', {}).encode()
+                return
+            if last_event_id is None or event.id > last_event_id:
+                yield event.encode()
+                last_event_id = event.id
+    finally:
+        subscription.close()
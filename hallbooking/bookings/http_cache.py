@@ -0,0 +1,158 @@
+"""Conditional GETs and cache headers for the public pages and availability API.
+
+``Hall.changed_at`` moves on with every write to the hall (``auto_now``).
+Writes to its bookings move ``HallBookingsVersion.changed_at`` instead:
+``touch_halls`` runs from signals for single saves and deletes and
+explicitly on the bulk paths (moderation, recurring series, import), and
+writes the row once the transaction commits. Updating a row inside the
+booking transaction would hold its lock until commit and queue bookings
+for different days of one hall behind each other, which the per-hall-day
+locks in ``admission`` exist to avoid. The version lives in the database
+rather than the cache so that every worker process sees it.
+``hall_changed_at`` combines both, and ``conditional_view`` turns that
+into a response's ETag and Last-Modified, so a conditional GET that still
+matches gets ``304 Not Modified`` after one primary-key lookup, before
+the view queries or renders anything.
+
+Sync views go through Django's ``condition`` decorator. Django 4.2's
+``condition`` cannot wrap coroutine views, so async views get the same
+checks from ``get_conditional_response``, which ``condition`` uses too.
+
+Pages vary on the session cookie. Anonymous visitors get ``public``
+responses with a ``max-age`` of ``PUBLIC_PAGE_MAX_AGE`` seconds, so a
+reverse proxy can serve the catalog. Signed-in users get ``private,
+no-cache``: their pages carry their name and a CSRF token, and the ETag
+includes their id. Pages with pending flash messages are never cached.
+API responses are the same for everyone and get ``public, no-cache``,
+so every use revalidates.
+"""
+from calendar import timegm
+from datetime import datetime, time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from .models import Hall, HallBookingsVersion
+
+
+DEFAULT_PUBLIC_PAGE_MAX_AGE = 60
+
+
+def _write_versions(hall_ids):
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            HallBookingsVersion.objects.bulk_create(
+                [HallBookingsVersion(hall_id=hall_id, changed_at=now) for hall_id in sorted(hall_ids)],
+                update_conflicts=True, unique_fields=['hall'], update_fields=['changed_at'],
+            )
+    except IntegrityError:
+        # A hall was deleted since the write committed; version the others
+        remaining = set(Hall.objects.filter(id__in=hall_ids).values_list('id', flat=True))
+        if remaining != hall_ids:
+            _write_versions(remaining)
+
+
+def touch_halls(hall_ids):
+    """Record that bookings of the given halls changed, once the transaction commits."""
+    hall_ids = set(hall_ids)
+    if hall_ids:
+        transaction.on_commit(lambda: _write_versions(hall_ids))
+
+
+def hall_changed_at(hall_id):
+    """Return when the hall or its bookings last changed, or None for no such hall."""
+    try:
+        row = Hall.objects.filter(id=hall_id).values_list('changed_at', 'bookings_version__changed_at').first()
+    except ValueError:
+        return None
+    if row is None:
+        return None
+    changed_at, bookings_changed = row
+    return changed_at if bookings_changed is None else max(changed_at, bookings_changed)
+
+
+def start_of_today():
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+
+
+def _validate(validators, per_user, request, args, kwargs):
+    """Return ``(etag, last_modified, public)`` for the request."""
+    anonymous = not request.user.is_authenticated if per_user else True
+    # Rendering would consume the messages, so a 304 must not swallow them
+    if per_user and get_messages(request):
+        return None, None, False
+    found = validators(request, *args, **kwargs)
+    if found is None:
+        return None, None, anonymous
+    etag, last_modified = found
+    if per_user and not anonymous:
+        etag = f'{etag}-u{request.user.pk}'
+    return etag, last_modified, anonymous
+
+
+def _cache_headers(response, per_user, public):
+    if response.status_code not in (200, 304):
+        return response
+    if not per_user:
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+    patch_vary_headers(response, ('Cookie',))
+    if public and not response.cookies:
+        max_age = getattr(settings, 'PUBLIC_PAGE_MAX_AGE', DEFAULT_PUBLIC_PAGE_MAX_AGE)
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_view(validators, per_user=True):
+    """Answer GET and HEAD with 304 while ``validators`` still match.
+
+    ``validators(request, *args, **kwargs)`` returns ``(etag, last_modified)``
+    (either may be None) or None when the request cannot be validated.
+    Use ``per_user=False`` for responses that do not depend on who asks.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+                etag, last_modified, public = await sync_to_async(_validate)(
+                    validators, per_user, request, args, kwargs
+                )
+                etag = quote_etag(etag) if etag else None
+                last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                # As condition() does
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+                return _cache_headers(response, per_user, public)
+            return wrapper
+
+        conditional = condition(
+            etag_func=lambda request, *args, **kwargs: request._validators[0],
+            last_modified_func=lambda request, *args, **kwargs: request._validators[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            request._validators = _validate(validators, per_user, request, args, kwargs)
+            response = conditional(request, *args, **kwargs)
+            return _cache_headers(response, per_user, request._validators[2])
+        return wrapper
+    return decorator
@@ -0,0 +1,241 @@
+"""Bulk booking import from CSV or JSON Lines.
+
+Rows are streamed from the file in batches. Each batch is validated in
+memory: halls and users come from lookup maps built once, and conflicts
+are checked per hall-day with ``IntervalSet`` against a single query of
+existing bookings, read while the batch holds its hall-day locks (see
+``admission``). Valid rows are written with ``bulk_create`` in the same
+transaction; invalid rows go to a reject file with the reason.
+
+The column names match ``export.FIELDS``, so an export can be imported
+again. A hall is identified by ``hall_id`` or ``hall_name`` and a user by
+``username``.
+"""
+import csv
+import json
+from collections import Counter, defaultdict
+from datetime import date, datetime, time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from .admission import lock_hall_days
+from .conflicts import ACTIVE_STATUSES, IntervalSet
+from .events import publish_reset
+from .http_cache import touch_halls
+from .models import Booking, Hall
+from .occupancy import refresh_occupancy
+from .reporting import apply_deltas
+
+
+DEFAULT_BATCH_SIZE = 5000
+INSERT_BATCH_SIZE = 1000
+
+FACULTIES = dict(Booking.FACULTY_CHOICES)
+STATUSES = dict(Booking.STATUS_CHOICES)
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path, fmt):
+    """Yield ``(line_number, row_dict)`` from a CSV or JSONL file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        elif fmt == 'jsonl':
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                # Only an object is a row; anything else goes to the rejects as it was
+                yield line_number, row if isinstance(row, dict) else {'_raw': line.rstrip('\n')}
+        else:
+            raise ValueError(f'Unknown import format: {fmt}')
+
+
+def _field(row, name, default=''):
+    """``row[name]`` as stripped text; JSON Lines values may be numbers or null."""
+    value = row.get(name)
+    return default if value is None else (str(value).strip() or default)
+
+
+class RejectWriter:
+    """Writes rejected rows, with their line number and reason, in the input format"""
+
+    def __init__(self, f, fmt):
+        self.f = f
+        self.fmt = fmt
+        self.count = 0
+        self._csv = None
+
+    def write(self, line_number, row, error):
+        self.count += 1
+        record = {'line': line_number, 'error': error, **row}
+        if self.fmt == 'jsonl':
+            self.f.write(json.dumps(record, default=str) + '\n')
+            return
+        if self._csv is None:
+            self._csv = csv.DictWriter(self.f, fieldnames=list(record), extrasaction='ignore')
+            self._csv.writeheader()
+        self._csv.writerow(record)
+
+
+class BookingImporter:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, allow_past=False, dry_run=False):
+        self.batch_size = batch_size
+        self.allow_past = allow_past
+        self.dry_run = dry_run
+        self.created = 0
+        self.today = datetime.now().date()
+        halls = list(Hall.objects.all())
+        self.halls_by_id = {str(h.id): h for h in halls}
+        self.halls_by_name = {h.name: h for h in halls}
+        self.users = dict(User.objects.values_list('username', 'id'))
+
+    def run(self, rows, rejects):
+        """Import ``(line_number, row)`` pairs; return the number created."""
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return self.created
+            self._import_batch(batch, rejects)
+
+    def _import_batch(self, batch, rejects):
+        parsed = []
+        for line_number, row in batch:
+            try:
+                parsed.append((line_number, row, self._build(row)))
+            except RowError as e:
+                rejects.write(line_number, row, str(e))
+
+        if self.dry_run:
+            self.created += len(self._without_conflicts(parsed, rejects))
+            return
+        accepted = []
+        try:
+            with transaction.atomic():
+                # Hold the batch's hall-days, as create_series does, so no
+                # booking can take a slot between the conflict check and the insert
+                for hall_id, days in sorted(self._hall_days(parsed).items()):
+                    lock_hall_days(hall_id, days)
+                accepted = self._without_conflicts(parsed, rejects)
+                if not accepted:
+                    return
+                bookings = [booking for _, _, booking in accepted]
+                Booking.objects.bulk_create(bookings, batch_size=INSERT_BATCH_SIZE)
+                # bulk_create skips post_save, so update the report stats and occupancy here
+                apply_deltas(Counter(b.stat_key() for b in bookings))
+                refresh_occupancy(b.stat_key()[:2] for b in bookings)
+                # Too many hall-days to push one by one; viewers refetch instead
+                publish_reset(b.hall_id for b in bookings)
+                touch_halls(b.hall_id for b in bookings)
+        except IntegrityError as e:
+            for line_number, row, _ in accepted:
+                rejects.write(line_number, row, f'Batch rolled back by a concurrent change ({e}); re-run to retry')
+            return
+        self.created += len(bookings)
+
+    def _build(self, row):
+        """Turn an input row into an unsaved Booking, or raise RowError."""
+        if '_raw' in row:
+            raise RowError('Malformed line')
+        hall = self.halls_by_id.get(_field(row, 'hall_id')) or self.halls_by_name.get(_field(row, 'hall_name'))
+        if hall is None:
+            raise RowError('Unknown hall')
+        user_id = self.users.get(_field(row, 'username'))
+        if user_id is None:
+            raise RowError('Unknown user')
+
+        try:
+            booking_date = date.fromisoformat(_field(row, 'booking_date'))
+            start_time = time.fromisoformat(_field(row, 'start_time'))
+            end_time = time.fromisoformat(_field(row, 'end_time'))
+        except ValueError:
+            raise RowError('Invalid date or time')
+        if start_time >= end_time:
+            raise RowError('Start time must be before end time')
+        if booking_date < self.today and not self.allow_past:
+            raise RowError('Booking date cannot be in the past')
+
+        value = _field(row, 'expected_attendees')
+        if not value:
+            raise RowError('Expected attendees is required')
+        try:
+            expected_attendees = int(value)
+        except ValueError:
+            raise RowError('Invalid expected_attendees')
+        if expected_attendees < 0:
+            raise RowError('Expected attendees cannot be negative')
+        if expected_attendees > hall.capacity:
+            raise RowError(f'Expected attendees exceed hall capacity of {hall.capacity}')
+
+        purpose = _field(row, 'purpose')
+        if not purpose or len(purpose) > 200:
+            raise RowError('Purpose is required (at most 200 characters)')
+        faculty = _field(row, 'faculty', 'Science')
+        if faculty not in FACULTIES:
+            raise RowError('Unknown faculty')
+        status = _field(row, 'status', 'pending')
+        if status not in STATUSES:
+            raise RowError('Unknown status')
+
+        return Booking(
+            hall=hall, user_id=user_id, booking_date=booking_date,
+            start_time=start_time, end_time=end_time, purpose=purpose,
+            expected_attendees=expected_attendees, faculty=faculty, status=status,
+        )
+
+    def _hall_days(self, parsed):
+        days = defaultdict(set)
+        for _, _, booking in parsed:
+            days[booking.hall_id].add(booking.booking_date)
+        return days
+
+    def _without_conflicts(self, parsed, rejects):
+        """Drop rows that overlap, or share a start time with, another booking."""
+        if not parsed:
+            return []
+        by_day = defaultdict(list)
+        for item in parsed:
+            booking = item[2]
+            by_day[booking.hall_id, booking.booking_date].append(item)
+
+        # One query for the existing bookings on every hall-day in the batch
+        taken = defaultdict(IntervalSet)
+        starts = defaultdict(set)
+        days = [day for _, day in by_day]
+        existing = Booking.objects.filter(
+            hall_id__in={hall_id for hall_id, _ in by_day},
+            booking_date__range=(min(days), max(days)),
+        ).order_by().values_list('hall_id', 'booking_date', 'start_time', 'end_time', 'status')
+        for hall_id, day, start, end, status in existing:
+            # booking_active_slot_uniq only covers active rows, so a cancelled
+            # or rejected booking's start time may be booked again
+            if (hall_id, day) in by_day and status in ACTIVE_STATUSES:
+                starts[hall_id, day].add(start)
+                taken[hall_id, day].add(start, end)
+
+        accepted = []
+        for key, items in by_day.items():
+            slots, day_starts = taken[key], starts[key]
+            for line_number, row, booking in sorted(items, key=lambda i: (i[2].start_time, i[0])):
+                active = booking.status in ACTIVE_STATUSES
+                # booking_active_slot_uniq only covers active rows, as above
+                if active and booking.start_time in day_starts:
+                    rejects.write(line_number, row, 'A booking with this start time already exists')
+                elif active and not slots.try_add(booking.start_time, booking.end_time):
+                    rejects.write(line_number, row, 'Time slot conflicts with existing booking')
+                else:
+                    if active:
+                        day_starts.add(booking.start_time)
+                    accepted.append((line_number, row, booking))
+        return accepted
@@ -0,0 +1,45 @@
+"""Views imported on their first request.
+
+The URLconf is imported by the first request, and every views module it
+imports comes with it. A ``lazy_view`` pattern names its view by dotted
+path instead, so rarely used pages (the staff views) and what they import
+stay out of that until a request for one of them arrives. reverse()
+and resolve() never import it.
+"""
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class LazyView:
+    """A view given by dotted path, imported on its first call.
+
+    The CSRF middleware and the handler inspect a view before calling it,
+    so the view must be a plain sync function view without ``csrf_exempt``.
+    """
+
+    def __init__(self, dotted_path):
+        self.dotted_path = dotted_path
+        # What resolve() and the URL checks report, without an import
+        self.__module__, self.__name__ = dotted_path.rsplit('.', 1)
+        self.__qualname__ = self.__name__
+        self._view = None
+
+    def load(self):
+        if self._view is None:
+            view = import_string(self.dotted_path)
+            if iscoroutinefunction(view) or getattr(view, 'csrf_exempt', False):
+                raise ImproperlyConfigured(f'{self.dotted_path} cannot be loaded lazily')
+            self._view = view
+        return self._view
+
+    def __call__(self, request, *args, **kwargs):
+        return self.load()(request, *args, **kwargs)
+
+    def __repr__(self):
+        return f'<LazyView {self.dotted_path}>'
+
+
+def lazy_view(dotted_path):
+    return LazyView(dotted_path)
+
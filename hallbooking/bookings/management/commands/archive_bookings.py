@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from bookings.archive import DEFAULT_BATCH_SIZE, archive_bookings
+
+
+def _date(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+class Command(BaseCommand):
+    help = ('Move closed bookings (cancelled, rejected, and approved ones dated before a cutoff) '
+            'from the live table into ArchivedBooking')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=_date, required=True,
+                            help='Archive approved bookings dated before this day (YYYY-MM-DD), at most today')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the bookings that would move')
+
+    def handle(self, *args, **options):
+        try:
+            moved = archive_bookings(
+                options['before'], batch_size=options['batch_size'], dry_run=options['dry_run'],
+            )
+        except ValueError as e:
+            raise CommandError(e)
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {moved} booking(s).'))
@@ -0,0 +1,144 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from bookings.benchmark import (
+    SCENARIOS, WSGI_SCENARIOS, Workload, run_client, run_hashers, run_templates, run_wsgi,
+)
+from bookings.seed import DEFAULT_SEED, seed_bookings, seed_halls, seed_users
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database with deterministic data, replay benchmark scenarios '
+            'through the test client and a concurrent WSGI server, and report latency percentiles')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--halls', type=int, default=10)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--bookings', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and driver')
+        parser.add_argument('--concurrency', type=int, default=8, help='WSGI driver worker threads')
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+        parser.add_argument('--skip-wsgi', action='store_true', help='Only run the test client driver')
+        parser.add_argument('--hashers', action='store_true', help='Also time each password hasher')
+        parser.add_argument('--templates', action='store_true',
+                            help='Also time rendering the largest templates with --template-size rows')
+        parser.add_argument('--template-size', type=int, default=200)
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Print the change against a previous results file')
+
+    def handle(self, *args, **options):
+        if options['halls'] < 1 or options['users'] < 1 or options['requests'] < 1:
+            raise CommandError('--halls, --users and --requests must be at least 1')
+        if options['bookings'] < 1:
+            raise CommandError('--bookings must be at least 1: the scenarios pick their dates from the bookings')
+        baseline = None
+        if options['compare']:
+            if not os.path.exists(options['compare']):
+                raise CommandError(f"No such file: {options['compare']}")
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        # Never touch the configured database: benchmark against a fresh test one
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1'],
+                METRICS_SAMPLE_RATE=1,
+                METRICS_SLOW_REQUEST_SECONDS=None,
+            ):
+                results = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self._report(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _run(self, options):
+        self.stdout.write(
+            f"Seeding {options['halls']} halls, {options['users']} users and "
+            f"{options['bookings']} bookings (seed {options['seed']})..."
+        )
+        seed_halls(options['halls'], seed=options['seed'])
+        users = seed_users(options['users'])
+        seed_bookings(options['bookings'], seed=options['seed'])
+        staff = User.objects.create_user('bench_staff', password=None, is_staff=True)
+        workload = Workload(staff, users, options['seed'])
+
+        scenarios = options['scenarios']
+        results = {
+            'meta': {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'git_commit': _git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'django_env': getattr(settings, 'DJANGO_ENV', None),
+                'template_loaders': settings.TEMPLATES[0].get('OPTIONS', {}).get('loaders'),
+                'session_engine': settings.SESSION_ENGINE,
+                'auth_backends': settings.AUTHENTICATION_BACKENDS,
+                'auth_user_cache_timeout': getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 0),
+                'password_hasher': settings.PASSWORD_HASHERS[0],
+                'halls': options['halls'],
+                'users': options['users'],
+                'bookings': options['bookings'],
+                'seed': options['seed'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+            },
+        }
+        self.stdout.write('Running the test client driver...')
+        results['client'] = run_client(workload, scenarios, options['requests'])
+        wsgi_scenarios = [s for s in scenarios if s in WSGI_SCENARIOS]
+        if not options['skip_wsgi'] and wsgi_scenarios:
+            self.stdout.write(f"Running the WSGI driver with {options['concurrency']} threads...")
+            results['wsgi'] = run_wsgi(workload, wsgi_scenarios, options['requests'], options['concurrency'])
+        if options['hashers']:
+            self.stdout.write('Timing password hashers...')
+            results['hashers'] = run_hashers()
+        if options['templates']:
+            self.stdout.write('Timing template rendering...')
+            results['templates'] = run_templates(size=options['template_size'])
+        return results
+
+    def _report(self, results, baseline):
+        header = f"{'driver':<7} {'scenario':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'req/s':>8} {'errors':>6}"
+        self.stdout.write(header)
+        for driver in ('client', 'wsgi'):
+            for scenario, row in results.get(driver, {}).items():
+                queries = '-' if row['queries_per_request'] is None else f"{row['queries_per_request']:g}"
+                line = (f"{driver:<7} {scenario:<20} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+                        f"{row['p99_ms']:>9.2f} {queries:>8} {row['throughput_rps']:>8} {row['errors']:>6}")
+                previous = (baseline or {}).get(driver, {}).get(scenario)
+                if previous and previous.get('p95_ms'):
+                    change = (row['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+                    line += f'   p95 {change:+.1f}%'
+                self.stdout.write(line)
+        for algorithm, row in results.get('hashers', {}).items():
+            self.stdout.write(f"hasher  {algorithm:<20} encode {row['encode_ms']:.1f} ms, verify {row['verify_ms']:.1f} ms")
+        for name, row in results.get('templates', {}).items():
+            self.stdout.write(f"render  {name:<28} p50 {row['p50_ms']:.2f} ms, p95 {row['p95_ms']:.2f} ms")
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from bookings import export
+
+
+def _date(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+class Command(BaseCommand):
+    help = 'Stream bookings to a CSV or JSON Lines file (or stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write; defaults to stdout')
+        parser.add_argument('--from', dest='date_from', type=_date, help='First booking date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=_date, help='Last booking date (YYYY-MM-DD)')
+        parser.add_argument('--hall', type=int, dest='hall_id')
+        parser.add_argument('--status')
+        parser.add_argument('--faculty')
+        parser.add_argument('--chunk-size', type=int, default=export.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        sources = export.filter_bookings(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            hall_id=options['hall_id'],
+            status=options['status'],
+            faculty=options['faculty'],
+        )
+        lines = export.export_lines(sources, options['format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            try:
+                with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                    count = self._write(lines, out.write)
+            except OSError as e:
+                raise CommandError(e)
+        else:
+            count = self._write(lines, lambda line: self.stdout.write(line, ending=''))
+        if options['format'] == 'csv':
+            count -= 1  # header
+        self.stderr.write(f'Exported {count} booking(s).')
+
+    def _write(self, lines, write):
+        count = 0
+        for line in lines:
+            write(line)
+            count += 1
+        return count
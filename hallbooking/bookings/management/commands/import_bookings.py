@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.importer import DEFAULT_BATCH_SIZE, BookingImporter, RejectWriter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk-import bookings from a CSV or JSON Lines file, writing invalid rows to a reject file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--rejects', help='Reject file; defaults to <path>.rejects.<format>')
+        parser.add_argument('--allow-past', action='store_true', help='Accept bookings dated before today')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, insert nothing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in ('csv', 'jsonl'):
+            raise CommandError('Cannot tell the file format; pass --format csv or --format jsonl')
+        if not os.path.exists(path):
+            raise CommandError(f'No such file: {path}')
+        rejects_path = options['rejects'] or f'{path}.rejects.{fmt}'
+
+        importer = BookingImporter(
+            batch_size=options['batch_size'],
+            allow_past=options['allow_past'],
+            dry_run=options['dry_run'],
+        )
+        with open(rejects_path, 'w', newline='', encoding='utf-8') as f:
+            rejects = RejectWriter(f, fmt)
+            created = importer.run(read_rows(path, fmt), rejects)
+        if not rejects.count:
+            os.remove(rejects_path)
+
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {created} booking(s).'))
+        if rejects.count:
+            self.stdout.write(self.style.WARNING(f'Rejected {rejects.count} row(s); see {rejects_path}'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.occupancy import repair_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Check the HallDayOccupancy table against the bookings and rewrite the rows that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report drift, and exit with an error if there is any')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        created, updated, deleted = repair_occupancy(dry_run=options['check'], chunk_size=options['chunk_size'])
+        drift = created + updated + deleted
+        summary = f'{created} missing, {updated} wrong and {deleted} stale occupancy row(s)'
+        if options['check']:
+            if drift:
+                raise CommandError(f'Occupancy has drifted: {summary}.')
+            self.stdout.write(self.style.SUCCESS('Occupancy matches the bookings.'))
+        elif drift:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {summary}.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Occupancy matches the bookings; nothing to repair.'))
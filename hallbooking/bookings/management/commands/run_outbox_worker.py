@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.outbox import DEFAULT_BATCH_SIZE, DEFAULT_THREADS, get_backend, process_batch
+
+
+class Command(BaseCommand):
+    help = 'Send queued booking notifications from the outbox, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--threads', type=int, default=DEFAULT_THREADS)
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to wait when nothing is due')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once nothing is due instead of polling')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        totals = [0, 0, 0]
+        while True:
+            counts = process_batch(backend, batch_size=options['batch_size'], threads=options['threads'])
+            if not any(counts):
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            totals = [total + count for total, count in zip(totals, counts)]
+            if not options['once']:
+                self.stdout.write(self._summary(counts))
+        if options['once']:
+            self.stdout.write(self.style.SUCCESS(self._summary(totals)))
+
+    def _summary(self, counts):
+        sent, retrying, failed = counts
+        return f'Sent {sent}, retrying {retrying}, failed {failed} message(s).'
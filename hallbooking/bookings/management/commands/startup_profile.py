@@ -0,0 +1,64 @@
+import json
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.startup import PHASES, profile_startup, summarize_imports
+
+
+TIMINGS = (
+    ('setup_ms', 'django.setup()'),
+    ('application_ms', 'WSGI application'),
+    ('first_request_ms', 'first request'),
+    ('first_response_ms', 'time to first response'),
+    ('process_ms', 'whole process'),
+    ('second_request_ms', 'second request'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Start fresh interpreters the way a new web worker starts and report the time to '
+            'the first response, with a -X importtime breakdown of what each step imports')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='Path of the first request')
+        parser.add_argument('--host', help='Host header (default: the first ALLOWED_HOSTS name)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed cold starts; the median is reported')
+        parser.add_argument('--top', type=int, default=15, help='Packages listed per step')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        try:
+            runs = [profile_startup(options['path'], options['host']) for _ in range(options['repeat'])]
+            # importtime slows imports down, so it gets a run of its own
+            imports = profile_startup(options['path'], options['host'], importtime=True)['imports']
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        results = {
+            'path': options['path'],
+            'status': runs[0]['status'],
+            'runs': len(runs),
+            'timings': {key: median(run[key] for run in runs) for key, _ in TIMINGS},
+            'imports': summarize_imports(imports, top=options['top']),
+        }
+        self._report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _report(self, results):
+        self.stdout.write(
+            f"Cold start, median of {results['runs']} run(s), GET {results['path']} -> {results['status']}"
+        )
+        for key, label in TIMINGS:
+            self.stdout.write(f"  {label:<24} {results['timings'][key]:>9.1f} ms")
+        self.stdout.write('Imports by step (python -X importtime, self time)')
+        for phase in PHASES:
+            row = results['imports'][phase]
+            self.stdout.write(f"  {phase:<24} {row['import_ms']:>9.1f} ms  {row['modules']} module(s)")
+            for package in row['packages']:
+                self.stdout.write(f"    {package['package']:<30} {package['self_ms']:>7.1f} ms")
@@ -0,0 +1,222 @@
+"""Per-view request and SQL metrics.
+
+``QueryMetricsMiddleware`` times a sample of requests (``METRICS_SAMPLE_RATE``)
+and, through ``connection.execute_wrapper``, the SQL they run. Results are
+aggregated in process memory per URL name and served in Prometheus text
+format by the ``metrics`` view. Requests slower than
+``METRICS_SLOW_REQUEST_SECONDS`` are logged together with their SQL.
+
+The middleware works under WSGI and ASGI. The per-request recorder lives in
+a context variable, which ``sync_to_async`` carries over to the thread that
+runs async ORM calls, so their statements are counted too.
+
+Unsampled requests only pay for one ``random()`` call.
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('bookings.metrics')
+
+WALL_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Slow-request log lines carry at most this many statements
+SLOW_LOG_MAX_QUERIES = 50
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def lines(self, name, labels):
+        for bound, count in zip(self.buckets, self.counts):
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum:g}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.wall = Histogram(WALL_BUCKETS)
+        self.db = Histogram(WALL_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.duplicate_queries = 0
+
+
+class Registry:
+    """Thread-safe in-memory store of ViewMetrics keyed by URL name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, wall, db, queries, duplicates):
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.wall.observe(wall)
+            metrics.db.observe(db)
+            metrics.queries.observe(queries)
+            metrics.duplicate_queries += duplicates
+
+    def get(self, view):
+        return self._views.get(view)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            views = sorted(self._views.items())
+            families = [
+                ('hallbooking_request_duration_seconds', 'histogram',
+                 'Wall time per request', lambda m: m.wall),
+                ('hallbooking_db_duration_seconds', 'histogram',
+                 'Time spent in SQL per request', lambda m: m.db),
+                ('hallbooking_queries_per_request', 'histogram',
+                 'SQL statements per request', lambda m: m.queries),
+            ]
+            lines = []
+            for name, kind, help_text, get in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for view, metrics in views:
+                    lines.extend(get(metrics).lines(name, f'view="{view}"'))
+            name = 'hallbooking_duplicate_queries_total'
+            lines.append(f'# HELP {name} Repeated identical SQL statements within a request')
+            lines.append(f'# TYPE {name} counter')
+            for view, metrics in views:
+                lines.append(f'{name}{{view="{view}"}} {metrics.duplicate_queries}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callable that times every statement"""
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.db_time += elapsed
+            self.queries.append((sql, elapsed))
+
+    def duplicates(self):
+        """Statements whose SQL text (parameters aside) ran more than once."""
+        counts = Counter(sql for sql, _ in self.queries)
+        return sum(n - 1 for n in counts.values())
+
+
+_current_recorder = ContextVar('bookings_query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_hook():
+    """Put the recorder hook on this thread's connections, once per connection."""
+    for connection in connections.all():
+        if _record_query not in connection.execute_wrappers:
+            # First in line, so other wrappers' push/pop pairs are unaffected
+            connection.execute_wrappers.insert(0, _record_query)
+
+
+def _sampled():
+    rate = getattr(settings, 'METRICS_SAMPLE_RATE', 0)
+    return rate and random.random() < rate
+
+
+class QueryMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _sampled():
+            return self.get_response(request)
+
+        install_query_hook()
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        self._record(request, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not _sampled():
+            return await self.get_response(request)
+
+        # Async ORM calls run on the thread-sensitive sync thread
+        await sync_to_async(install_query_hook)()
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        self._record(request, recorder, time.perf_counter() - start)
+        return response
+
+    def _record(self, request, recorder, wall):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unresolved'
+        registry.record(view, wall, recorder.db_time, len(recorder.queries), recorder.duplicates())
+
+        slow = getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS', None)
+        if slow is not None and wall >= slow:
+            logger.warning(
+                'Slow request %s %s (%s): %.3fs, %d queries in %.3fs\n%s',
+                request.method, request.path, view, wall, len(recorder.queries), recorder.db_time,
+                '\n'.join(
+                    f'  {elapsed * 1000:.1f}ms {sql}'
+                    for sql, elapsed in recorder.queries[:SLOW_LOG_MAX_QUERIES]
+                ),
+            )
@@ -0,0 +1,87 @@
+"""Async-capable wrappers for third-party middleware, and JSON compression.
+
+One sync-only middleware makes Django run the whole stack, and every async
+view, in a thread per request under ASGI. WhiteNoise 6.5 is sync-only, so
+``StaticFilesMiddleware`` adds the async half of its ``__call__``.
+
+WhiteNoise serves static files gzip- or Brotli-compressed;
+``JSONCompressionMiddleware`` does the same for the JSON APIs.
+"""
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+try:
+    import brotli
+except ImportError:
+    # Optional, as for WhiteNoise: without it JSON is only gzipped
+    brotli = None
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self._static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+    def _static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+
+class JSONCompressionMiddleware(MiddlewareMixin):
+    """Compresses JSON responses with Brotli or gzip, whichever the client accepts
+
+    HTML is left alone, since pages carry CSRF tokens (BREACH), and so are
+    streaming responses such as the event stream, which must not be buffered.
+    """
+
+    MIN_SIZE = 200
+    accepts_br = re.compile(r'\bbr\b')
+    accepts_gzip = re.compile(r'\bgzip\b')
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith('application/json')
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.MIN_SIZE:
+            return response
+        accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and self.accepts_br.search(accept):
+            encoding, compressed = 'br', brotli.compress(response.content)
+        elif self.accepts_gzip.search(accept):
+            encoding, compressed = 'gzip', compress_string(response.content)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # The compressed body is no longer byte-for-byte the tagged one
+        if response.has_header('ETag'):
+            response.headers['ETag'] = re.sub(r'^"', 'W/"', response.headers['ETag'])
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_alter_booking_faculty'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['hall', 'booking_date', 'status', 'start_time', 'end_time'], name='booking_conflict_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# PostgreSQL only: reject overlapping active bookings for a hall at the
+# database level. Other backends rely on HallDayLock alone.
+EXCLUSION_SQL = """
+ALTER TABLE bookings_booking ADD CONSTRAINT booking_no_overlap EXCLUDE USING gist (
+    hall_id WITH =,
+    tsrange(booking_date + start_time, booking_date + end_time) WITH &&
+) WHERE (status IN ('pending', 'approved'));
+"""
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        schema_editor.execute(EXCLUSION_SQL)
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS booking_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_conflict_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HallDayLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bookings.hall')),
+            ],
+            options={
+                'unique_together': {('hall', 'date')},
+            },
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
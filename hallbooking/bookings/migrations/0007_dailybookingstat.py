@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_stats(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    DailyBookingStat = apps.get_model('bookings', 'DailyBookingStat')
+    grouped = Booking.objects.order_by().values(
+        'hall_id', 'booking_date', 'status', 'faculty'
+    ).annotate(total=models.Count('id'))
+    DailyBookingStat.objects.bulk_create(
+        [
+            DailyBookingStat(
+                hall_id=row['hall_id'], date=row['booking_date'], status=row['status'],
+                faculty=row['faculty'], count=row['total'],
+            )
+            for row in grouped
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBookingStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending Approval'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('faculty', models.CharField(choices=[('Arts', 'Arts'), ('Commerce', 'Commerce'), ('Science', 'Science')], max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at'], name='booking_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailybookingstat',
+            name='hall',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bookings.hall'),
+        ),
+        migrations.AddIndex(
+            model_name='dailybookingstat',
+            index=models.Index(fields=['date', 'faculty'], name='dailystat_date_faculty_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailybookingstat',
+            unique_together={('hall', 'date', 'status', 'faculty')},
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
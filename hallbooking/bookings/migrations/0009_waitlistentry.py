@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0008_recurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('purpose', models.CharField(max_length=200)),
+                ('expected_attendees', models.IntegerField()),
+                ('faculty', models.CharField(choices=[('Arts', 'Arts'), ('Commerce', 'Commerce'), ('Science', 'Science')], default='Science', max_length=50)),
+                ('priority', models.PositiveSmallIntegerField(default=0)),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('promoted', 'Promoted'), ('withdrawn', 'Withdrawn')], default='waiting', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['priority', 'created_at', 'id'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='booking',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'approved'])), fields=('hall', 'booking_date', 'start_time'), name='booking_active_slot_uniq'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='booking',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='bookings.booking'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='hall',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bookings.hall'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['hall', 'booking_date', 'status', 'priority', 'created_at', 'id'], name='waitlist_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:02
+
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Migrations must not import app code, which keeps changing after them;
+# this is the occupancy fold (bookings.occupancy) as it was at this point
+SLOT_MINUTES = 15
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def occupancy_from_rows(rows):
+    """Fold ``(hall_id, date, start, end)`` rows into ``{(hall_id, date): (minutes, busy_hex)}``."""
+    intervals = defaultdict(list)
+    for hall_id, day, start, end in rows:
+        if start < end:
+            intervals[hall_id, day].append((_minutes(start), _minutes(end)))
+    occupancy = {}
+    for key, blocks in intervals.items():
+        minutes, bitmap, merged_end = 0, 0, 0
+        for start, end in sorted(blocks):
+            # Count only the part not already covered by an earlier block
+            minutes += max(0, end - max(start, merged_end))
+            merged_end = max(merged_end, end)
+            first, last = start // SLOT_MINUTES, -(-end // SLOT_MINUTES)
+            bitmap |= ((1 << (last - first)) - 1) << first
+        occupancy[key] = (minutes, format(bitmap, '024x'))
+    return occupancy
+
+
+def populate_occupancy(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    HallDayOccupancy = apps.get_model('bookings', 'HallDayOccupancy')
+    rows = Booking.objects.filter(status__in=['pending', 'approved']).order_by().values_list(
+        'hall_id', 'booking_date', 'start_time', 'end_time'
+    )
+    HallDayOccupancy.objects.bulk_create(
+        [
+            HallDayOccupancy(hall_id=hall_id, date=day, booked_minutes=minutes, busy=busy)
+            for (hall_id, day), (minutes, busy) in occupancy_from_rows(rows.iterator()).items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HallDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked_minutes', models.PositiveIntegerField(default=0)),
+                ('busy', models.CharField(max_length=24)),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bookings.hall')),
+            ],
+            options={
+                'unique_together': {('hall', 'date')},
+            },
+        ),
+        migrations.RunPython(populate_occupancy, migrations.RunPython.noop),
+    ]
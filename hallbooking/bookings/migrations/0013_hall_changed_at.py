@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hall',
+            name='changed_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_hall_changed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HallBookingsVersion',
+            fields=[
+                ('hall', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='bookings_version', serialize=False, to='bookings.hall')),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+def withdraw_duplicates(apps, schema_editor):
+    # Keep each user's earliest wait per slot; the later ones could never be served first
+    WaitlistEntry = apps.get_model('bookings', 'WaitlistEntry')
+    seen, duplicates = set(), []
+    waiting = WaitlistEntry.objects.filter(status='waiting').order_by('created_at', 'id').values_list(
+        'id', 'user_id', 'hall_id', 'booking_date', 'start_time'
+    )
+    for entry_id, *slot in waiting.iterator():
+        if tuple(slot) in seen:
+            duplicates.append(entry_id)
+        else:
+            seen.add(tuple(slot))
+    for start in range(0, len(duplicates), 500):
+        WaitlistEntry.objects.filter(id__in=duplicates[start:start + 500]).update(status='withdrawn')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0014_hallbookingsversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(withdraw_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('user', 'hall', 'booking_date', 'start_time'), name='waitlist_waiting_uniq'),
+        ),
+    ]
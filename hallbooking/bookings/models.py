@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.functional import cached_property
 from datetime import datetime, timedelta
+from .conflicts import ACTIVE_STATUSES, has_conflict
 
 
 class Hall(models.Model):
@@ -21,6 +24,8 @@ class Hall(models.Model):
     image = models.CharField(max_length=200, default='hall-placeholder.jpg')
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Moved on by any write to the hall; booking writes move HallBookingsVersion (see http_cache)
+    changed_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['name']
@@ -28,24 +33,48 @@ class Hall(models.Model):
     def __str__(self):
         return f"{self.name} ({self.capacity} capacity)"
     
-    @property
+    @cached_property
     def amenities_list(self):
-        """Return amenities as a list of trimmed strings."""
+        """Return amenities as a list of trimmed strings (parsed once per instance)."""
         if not self.amenities:
             return []
         return [a.strip() for a in self.amenities.split(',') if a.strip()]
     
     def is_available_on_date(self, date):
         """Check if hall is available on a specific date"""
-        bookings = self.booking_set.filter(
-            booking_date=date,
-            status__in=['pending', 'approved']
-        )
-        return not bookings.exists()
+        # Only days with active bookings have an occupancy row
+        return not HallDayOccupancy.objects.filter(hall=self, date=date).exists()
+
+    async def ais_available_on_date(self, date):
+        """Async version of is_available_on_date"""
+        return not await HallDayOccupancy.objects.filter(hall=self, date=date).aexists()
+
+
+class Recurrence(models.Model):
+    """RRULE-style repeat pattern shared by the bookings of a series"""
+    rule = models.CharField(max_length=200, help_text="RFC 5545 RRULE, e.g. FREQ=WEEKLY;UNTIL=20270301")
+    dtstart = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.rule} from {self.dtstart}"
+    
+    def occurrences(self, after=None, before=None):
+        """Lazily yield the dates of the series, optionally within [after, before]."""
+        from dateutil.rrule import rrulestr
+        
+        rule = rrulestr(self.rule, dtstart=datetime.combine(self.dtstart, datetime.min.time()))
+        for occurrence in rule:
+            day = occurrence.date()
+            if before is not None and day > before:
+                return
+            if after is None or day >= after:
+                yield day
 
 
 class Booking(models.Model):
     """Model for hall bookings"""
+    FACULTY_CHOICES = [('Arts', 'Arts'), ('Commerce', 'Commerce'), ('Science', 'Science')]
     STATUS_CHOICES = [
         ('pending', 'Pending Approval'),
         ('approved', 'Approved'),
@@ -60,7 +89,7 @@ class Booking(models.Model):
     end_time = models.TimeField()
     purpose = models.CharField(max_length=200)
     expected_attendees = models.IntegerField()
-    faculty = models.CharField(max_length=50, choices=[('Arts', 'Arts'), ('Commerce', 'Commerce'), ('Science', 'Science')], default='Science')
+    faculty = models.CharField(max_length=50, choices=FACULTY_CHOICES, default='Science')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     approved_by = models.ForeignKey(
@@ -71,16 +100,71 @@ class Booking(models.Model):
         related_name='approved_bookings'
     )
     rejection_reason = models.TextField(blank=True, null=True)
+    recurrence = models.ForeignKey(
+        Recurrence,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='bookings'
+    )
     
     class Meta:
         ordering = ['-booking_date']
-        unique_together = ('hall', 'booking_date', 'start_time')
+        constraints = [
+            # Cancelled and rejected rows must not block rebooking their slot
+            models.UniqueConstraint(
+                fields=['hall', 'booking_date', 'start_time'],
+                condition=models.Q(status__in=['pending', 'approved']),
+                name='booking_active_slot_uniq',
+            ),
+        ]
+        indexes = [
+            # Covers the overlap lookup in conflicts.has_conflict()
+            models.Index(
+                fields=['hall', 'booking_date', 'status', 'start_time', 'end_time'],
+                name='booking_conflict_idx',
+            ),
+            # Keyset pagination for my_bookings and pending_bookings
+            models.Index(
+                fields=['user', 'booking_date', 'start_time', 'id'],
+                name='booking_user_keyset_idx',
+            ),
+            models.Index(
+                fields=['status', 'booking_date', 'start_time', 'id'],
+                name='booking_status_keyset_idx',
+            ),
+            # Recent activity on admin_reports
+            models.Index(fields=['-created_at'], name='booking_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.hall.name} - {self.booking_date} ({self.status})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(f in instance.__dict__ for f in ('hall_id', 'booking_date', 'status', 'faculty')):
+            instance._loaded_stat_key = instance.stat_key()
+        return instance
+    
+    def stat_key(self):
+        """Return the DailyBookingStat row this booking is counted in."""
+        booking_date = self._meta.get_field('booking_date').to_python(self.booking_date)
+        return (self.hall_id, booking_date, self.status, self.faculty)
+    
     def clean(self):
         """Validate booking data"""
+        self.validate_request()
+        
+        # Check for conflicting bookings
+        if self.status in ACTIVE_STATUSES and has_conflict(
+            self.hall_id, self.booking_date, self.start_time, self.end_time,
+            exclude_id=self.id,
+        ):
+            raise ValidationError("Time slot conflicts with existing booking")
+    
+    def validate_request(self):
+        """Date, capacity and time-order checks, without the conflict query"""
         if self.booking_date < datetime.now().date():
             raise ValidationError("Booking date cannot be in the past")
         
@@ -89,18 +173,215 @@ class Booking(models.Model):
         
         if self.start_time >= self.end_time:
             raise ValidationError("Start time must be before end time")
-        
-        # Check for conflicting bookings
-        conflicting = Booking.objects.filter(
-            hall=self.hall,
-            booking_date=self.booking_date,
-            status__in=['pending', 'approved']
-        ).exclude(id=self.id)
-        
-        for booking in conflicting:
-            if not (self.end_time <= booking.start_time or self.start_time >= booking.end_time):
-                raise ValidationError("Time slot conflicts with existing booking")
     
-    def save(self, *args, **kwargs):
-        self.clean()
+    def save(self, *args, validate=True, **kwargs):
+        """Save the booking, running clean() unless the caller already did."""
+        if validate:
+            self.clean()
         super().save(*args, **kwargs)
+
+
+class ArchivedBooking(models.Model):
+    """A closed booking moved out of the live table by ``manage.py archive_bookings``"""
+    # The id the booking had in the live table
+    id = models.BigIntegerField(primary_key=True)
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name='archived_bookings')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings')
+    booking_date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    purpose = models.CharField(max_length=200)
+    expected_attendees = models.IntegerField()
+    faculty = models.CharField(max_length=50, choices=Booking.FACULTY_CHOICES, default='Science')
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    approved_by = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='approved_archived_bookings'
+    )
+    rejection_reason = models.TextField(blank=True, null=True)
+    recurrence = models.ForeignKey(
+        Recurrence,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_bookings'
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    # Copied from the live row when a booking is archived
+    COPIED_FIELDS = [
+        'id', 'hall_id', 'user_id', 'booking_date', 'start_time', 'end_time', 'purpose',
+        'expected_attendees', 'faculty', 'status', 'created_at', 'approved_by_id',
+        'rejection_reason', 'recurrence_id',
+    ]
+
+    class Meta:
+        ordering = ['-booking_date']
+        indexes = [
+            # Date-ordered reads by export
+            models.Index(fields=['booking_date', 'start_time', 'id'], name='archived_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hall_id} - {self.booking_date} ({self.status}, archived)"
+
+    @classmethod
+    def from_booking(cls, booking):
+        """Return the (unsaved) archive copy of ``booking``."""
+        return cls(**{field: getattr(booking, field) for field in cls.COPIED_FIELDS})
+
+
+class WaitlistEntry(models.Model):
+    """A request for a taken slot, promoted to a pending Booking once the slot frees up"""
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+        ('withdrawn', 'Withdrawn'),
+    ]
+
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    booking_date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    purpose = models.CharField(max_length=200)
+    expected_attendees = models.IntegerField()
+    faculty = models.CharField(max_length=50, choices=Booking.FACULTY_CHOICES, default='Science')
+    # Lower is served first; derived from the faculty (see waitlist.faculty_priority)
+    priority = models.PositiveSmallIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    created_at = models.DateTimeField(auto_now_add=True)
+    booking = models.OneToOneField(
+        Booking,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='waitlist_entry'
+    )
+
+    class Meta:
+        ordering = ['priority', 'created_at', 'id']
+        constraints = [
+            # Promoted and withdrawn entries may be followed by a new wait
+            models.UniqueConstraint(
+                fields=['user', 'hall', 'booking_date', 'start_time'],
+                condition=models.Q(status='waiting'),
+                name='waitlist_waiting_uniq',
+            ),
+        ]
+        indexes = [
+            # The queue of one hall-day, read in promotion order
+            models.Index(
+                fields=['hall', 'booking_date', 'status', 'priority', 'created_at', 'id'],
+                name='waitlist_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.hall_id} - {self.booking_date} {self.start_time} ({self.status})"
+
+    def to_booking(self):
+        """Return the pending (unsaved) Booking this entry asks for."""
+        return Booking(
+            hall=self.hall,
+            user_id=self.user_id,
+            booking_date=self.booking_date,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            purpose=self.purpose,
+            expected_attendees=self.expected_attendees,
+            faculty=self.faculty,
+            status='pending',
+        )
+
+
+class HallDayLock(models.Model):
+    """One row per (hall, date), locked while a booking for that day is admitted"""
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE)
+    date = models.DateField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hall', 'date')
+
+    def __str__(self):
+        return f"{self.hall_id} - {self.date}"
+
+
+class HallBookingsVersion(models.Model):
+    """When the bookings of a hall last changed, written after each booking write commits"""
+    hall = models.OneToOneField(Hall, on_delete=models.CASCADE, primary_key=True, related_name='bookings_version')
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.hall_id}: {self.changed_at}"
+
+
+class DailyBookingStat(models.Model):
+    """Booking counts per hall, day, status and faculty, kept in step with Booking for reports"""
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE)
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    faculty = models.CharField(max_length=50, choices=Booking.FACULTY_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hall', 'date', 'status', 'faculty')
+        indexes = [
+            models.Index(fields=['date', 'faculty'], name='dailystat_date_faculty_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hall_id} {self.date} {self.status}/{self.faculty}: {self.count}"
+
+
+class HallDayOccupancy(models.Model):
+    """Booked minutes and busy-slot bitmap of one hall-day, kept in step with active bookings"""
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE)
+    date = models.DateField()
+    booked_minutes = models.PositiveIntegerField(default=0)
+    # availability.to_hex() of the day's slot bitmap
+    busy = models.CharField(max_length=24)
+
+    class Meta:
+        unique_together = ('hall', 'date')
+
+    def __str__(self):
+        return f"{self.hall_id} {self.date}: {self.booked_minutes} min"
+
+
+class OutboxMessage(models.Model):
+    """A notification for ``run_outbox_worker``, written in the transaction that caused it"""
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('webhook', 'Webhook'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    # An email address or a webhook URL
+    recipient = models.CharField(max_length=500)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's "what is due" scan
+            models.Index(fields=['status', 'next_attempt_at', 'id'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
@@ -0,0 +1,139 @@
+"""Batch approval and rejection of bookings.
+
+A batch is validated in memory, per hall-day, against one query's worth of
+existing bookings, and then written with a single UPDATE per outcome
+instead of one ``save()`` (and one conflict scan) per row. Notifications
+are queued in the outbox (see ``outbox``) in the same transaction.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import transaction
+
+from .conflicts import ACTIVE_STATUSES, IntervalSet
+from .models import Booking
+from .events import publish_booking_changes
+from .http_cache import touch_halls
+from .occupancy import refresh_occupancy
+from .outbox import enqueue_status_changes
+from .reporting import apply_deltas, status_change_deltas
+from .waitlist import promote_waitlist
+
+
+APPROVE = 'approve'
+REJECT = 'reject'
+
+# Statuses each action may move a booking out of
+ALLOWED_FROM = {
+    APPROVE: ('pending',),
+    REJECT: ('pending', 'approved'),
+}
+
+# Keeps "id IN (...)" under SQLite's bound-parameter limit
+UPDATE_CHUNK_SIZE = 500
+
+
+class ModerationResult:
+    """Outcome of a batch: ids that changed and per-row failure messages"""
+
+    def __init__(self, action):
+        self.action = action
+        self.updated = []
+        self.failures = {}
+
+    def __bool__(self):
+        return bool(self.updated)
+
+    def summary(self):
+        verb = 'approved' if self.action == APPROVE else 'rejected'
+        text = f'{len(self.updated)} booking(s) {verb}.'
+        if self.failures:
+            text += f' {len(self.failures)} could not be {verb}.'
+        return text
+
+
+def moderate_bookings(bookings, action, staff_user, reason=''):
+    """Approve or reject ``bookings`` (a queryset or iterable of ids).
+
+    Returns a ModerationResult. Rows that are in the wrong state, in the
+    past, or (when approving) overlap another active booking are left
+    untouched and reported in ``failures``.
+    """
+    if action not in ALLOWED_FROM:
+        raise ValueError(f'Unknown moderation action: {action}')
+    if hasattr(bookings, 'model'):
+        bookings = Booking.objects.filter(id__in=bookings.values('id'))
+    else:
+        bookings = Booking.objects.filter(id__in=list(bookings))
+
+    result = ModerationResult(action)
+    with transaction.atomic():
+        # Hall and owner feed the notifications; only the booking rows are locked
+        batch = list(
+            bookings.select_related('hall', 'user').select_for_update(of=('self',))
+            .order_by('booking_date', 'start_time', 'created_at', 'id')
+        )
+        candidates = []
+        for booking in batch:
+            if booking.status not in ALLOWED_FROM[action]:
+                result.failures[booking.id] = f'Booking is {booking.get_status_display().lower()}'
+            else:
+                candidates.append(booking)
+
+        if action == APPROVE:
+            candidates = _without_conflicts(candidates, result)
+
+        result.updated = [booking.id for booking in candidates]
+        if action == APPROVE:
+            changes = {'status': 'approved', 'approved_by': staff_user, 'rejection_reason': ''}
+        else:
+            changes = {'status': 'rejected', 'approved_by': staff_user, 'rejection_reason': reason}
+        for i in range(0, len(result.updated), UPDATE_CHUNK_SIZE):
+            Booking.objects.filter(id__in=result.updated[i:i + UPDATE_CHUNK_SIZE]).update(**changes)
+        # update() skips the post_save signal, so keep the report stats in step here
+        apply_deltas(status_change_deltas(candidates, changes['status']))
+        publish_booking_changes(candidates)
+        touch_halls(booking.hall_id for booking in candidates)
+        enqueue_status_changes(candidates, changes['status'], changes['rejection_reason'])
+        if action == REJECT:
+            # Approval keeps the slot taken; rejection frees it
+            hall_days = {booking.stat_key()[:2] for booking in candidates}
+            refresh_occupancy(hall_days)
+            promote_waitlist(hall_days)
+    return result
+
+
+def _without_conflicts(candidates, result):
+    """Drop candidates that are in the past or overlap another active booking."""
+    today = datetime.now().date()
+    by_day = defaultdict(list)
+    for booking in candidates:
+        if booking.booking_date < today:
+            result.failures[booking.id] = 'Booking date is in the past'
+        else:
+            by_day[booking.hall_id, booking.booking_date].append(booking)
+    if not by_day:
+        return []
+
+    # One query for every other active booking on the affected hall-days
+    taken = defaultdict(IntervalSet)
+    candidate_ids = {b.id for group in by_day.values() for b in group}
+    days = [day for _, day in by_day]
+    others = Booking.objects.filter(
+        hall_id__in={hall_id for hall_id, _ in by_day},
+        booking_date__range=(min(days), max(days)),
+        status__in=ACTIVE_STATUSES,
+    ).order_by().values_list('id', 'hall_id', 'booking_date', 'start_time', 'end_time')
+    for pk, hall_id, day, start, end in others:
+        if pk not in candidate_ids and (hall_id, day) in by_day:
+            taken[hall_id, day].add(start, end)
+
+    accepted = []
+    for key, group in by_day.items():
+        slots = taken[key]
+        for booking in group:
+            if slots.try_add(booking.start_time, booking.end_time):
+                accepted.append(booking)
+            else:
+                result.failures[booking.id] = 'Time slot conflicts with existing booking'
+    return accepted
@@ -0,0 +1,115 @@
+"""Denormalized per-day hall occupancy.
+
+``HallDayOccupancy`` holds one row per (hall, date) with active bookings:
+the booked minutes and the busy-slot bitmap (see ``availability``). Days
+without active bookings have no row. Availability checks, the range API,
+live events and the free-slot search read it by key instead of scanning
+bookings.
+
+Whenever a write touches a hall-day, its row is recomputed from the
+Booking table in the same transaction, under the hall-day lock (see
+``admission``). Single saves and deletes do this through signals (see
+``signals.py``). Bulk paths that bypass signals call ``refresh_occupancy``
+themselves. ``manage.py repair_occupancy`` compares the table with the
+bookings and rewrites the rows that drifted.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .admission import lock_hall_days
+from .availability import slot_mask, to_hex
+from .conflicts import ACTIVE_STATUSES, IntervalSet
+from .models import Booking, HallDayOccupancy
+
+
+# Keeps "id IN (...)" and bulk writes under SQLite's bound-parameter limit
+WRITE_BATCH_SIZE = 500
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def occupancy_from_rows(rows):
+    """Fold ``(hall_id, date, start, end)`` rows into ``{(hall_id, date): (minutes, busy_hex)}``."""
+    intervals = defaultdict(IntervalSet)
+    bitmaps = defaultdict(int)
+    for hall_id, day, start, end in rows:
+        if start < end:
+            intervals[hall_id, day].add(_minutes(start), _minutes(end))
+            bitmaps[hall_id, day] |= slot_mask(start, end)
+    return {
+        key: (sum(end - start for start, end in merged), to_hex(bitmaps[key]))
+        for key, merged in intervals.items()
+    }
+
+
+def _active_rows(bookings):
+    return bookings.filter(status__in=ACTIVE_STATUSES).order_by().values_list(
+        'hall_id', 'booking_date', 'start_time', 'end_time'
+    )
+
+
+def refresh_occupancy(hall_days):
+    """Recompute the occupancy rows of the given ``(hall_id, date)`` pairs."""
+    days_by_hall = defaultdict(set)
+    for hall_id, day in hall_days:
+        days_by_hall[hall_id].add(day)
+    # Callers are usually inside a transaction already; a savepoint buys nothing
+    with transaction.atomic(savepoint=False):
+        for hall_id, days in sorted(days_by_hall.items()):
+            lock_hall_days(hall_id, days)
+            date_range = (min(days), max(days))
+            expected = occupancy_from_rows(_active_rows(
+                Booking.objects.filter(hall_id=hall_id, booking_date__range=date_range)
+            ))
+            stored = {
+                (row.hall_id, row.date): row
+                for row in HallDayOccupancy.objects.filter(hall_id=hall_id, date__range=date_range)
+            }
+            _write({(hall_id, day) for day in days}, expected, stored)
+
+
+def _write(keys, expected, stored):
+    """Make the stored rows for ``keys`` match ``expected``; return ``(created, updated, deleted)``."""
+    to_create, to_update, to_delete = [], [], []
+    for key in keys:
+        row, value = stored.get(key), expected.get(key)
+        if value is None:
+            if row is not None:
+                to_delete.append(row.pk)
+        elif row is None:
+            hall_id, day = key
+            to_create.append(HallDayOccupancy(hall_id=hall_id, date=day, booked_minutes=value[0], busy=value[1]))
+        elif (row.booked_minutes, row.busy) != value:
+            row.booked_minutes, row.busy = value
+            to_update.append(row)
+    HallDayOccupancy.objects.bulk_create(to_create, batch_size=WRITE_BATCH_SIZE)
+    HallDayOccupancy.objects.bulk_update(to_update, ['booked_minutes', 'busy'], batch_size=WRITE_BATCH_SIZE)
+    for i in range(0, len(to_delete), WRITE_BATCH_SIZE):
+        HallDayOccupancy.objects.filter(pk__in=to_delete[i:i + WRITE_BATCH_SIZE]).delete()
+    return len(to_create), len(to_update), len(to_delete)
+
+
+def repair_occupancy(dry_run=False, chunk_size=2000):
+    """Check every occupancy row against the bookings and fix the ones that drifted.
+
+    Returns ``(created, updated, deleted)`` row counts; with ``dry_run``
+    nothing is written and the counts say what would change.
+    """
+    with transaction.atomic():
+        expected = occupancy_from_rows(_active_rows(Booking.objects.all()).iterator(chunk_size=chunk_size))
+        stored = {
+            (row.hall_id, row.date): row
+            for row in HallDayOccupancy.objects.select_for_update().iterator(chunk_size=chunk_size)
+        }
+        drifted = {
+            key for key in expected.keys() | stored.keys()
+            if key not in stored or expected.get(key) != (stored[key].booked_minutes, stored[key].busy)
+        }
+        if dry_run:
+            created = len(drifted - stored.keys())
+            deleted = len(drifted - expected.keys())
+            return created, len(drifted) - created - deleted, deleted
+        return _write(drifted, expected, stored)
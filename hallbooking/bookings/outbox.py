@@ -0,0 +1,202 @@
+"""Booking status notifications through a database outbox.
+
+When a booking is approved, rejected or cancelled, or a waitlist entry is
+promoted to a booking, ``enqueue_status_changes`` writes ``OutboxMessage``
+rows in the same transaction as the change:
+one email to the booking's owner, if they have an address, and one per
+``NOTIFICATION_WEBHOOK_URLS`` entry. Nothing is sent inline, so moderation
+never waits on SMTP, and a rolled-back change never notifies anyone.
+
+``manage.py run_outbox_worker`` drains the table. Each batch is leased
+(``attempts`` goes up and ``next_attempt_at`` moves past the lease) in a
+short transaction, so concurrent workers do not pick the same rows.
+Messages to the same recipient are grouped into one digest and the
+digests are sent from a thread pool. A failed digest is retried with
+exponential backoff until ``NOTIFICATION_MAX_ATTEMPTS``, then marked
+failed.
+
+``NOTIFICATION_BACKEND`` does the sending. ``DeliveryBackend`` sends
+email through Django's ``EMAIL_BACKEND`` and POSTs JSON to webhooks.
+``FileBackend`` writes every digest to a file or stdout instead, for
+local runs and tests.
+"""
+import json
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxMessage
+
+
+# 'promoted' is the waitlist event; the booking it creates is pending
+NOTIFIED_STATUSES = {'approved', 'rejected', 'cancelled', 'promoted'}
+
+DEFAULT_BACKEND = 'bookings.outbox.DeliveryBackend'
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_THREADS = 4
+DEFAULT_MAX_ATTEMPTS = 6
+
+# A leased message goes back to the queue if its worker has not reported by then
+LEASE = timedelta(minutes=5)
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+WEBHOOK_TIMEOUT_SECONDS = 10
+
+
+def booking_payload(booking, status, reason=''):
+    return {
+        'event': f'booking.{status}',
+        'booking_id': booking.id,
+        'hall_id': booking.hall_id,
+        'hall_name': booking.hall.name,
+        'booking_date': booking.booking_date.isoformat(),
+        'start_time': booking.start_time.strftime('%H:%M'),
+        'end_time': booking.end_time.strftime('%H:%M'),
+        'purpose': booking.purpose,
+        'status': status,
+        'reason': reason or '',
+    }
+
+
+def enqueue_status_changes(bookings, status, reason=''):
+    """Queue notifications of ``bookings`` (with hall and user loaded) moving to ``status``."""
+    if status not in NOTIFIED_STATUSES:
+        return []
+    webhooks = getattr(settings, 'NOTIFICATION_WEBHOOK_URLS', ())
+    messages = []
+    for booking in bookings:
+        payload = booking_payload(booking, status, reason)
+        if booking.user.email:
+            messages.append(OutboxMessage(channel='email', recipient=booking.user.email, payload=payload))
+        messages.extend(OutboxMessage(channel='webhook', recipient=url, payload=payload) for url in webhooks)
+    return OutboxMessage.objects.bulk_create(messages, batch_size=500)
+
+
+def render_digest(payloads):
+    """Return the ``(subject, body)`` of an email covering ``payloads``."""
+    if len(payloads) == 1:
+        subject = f"Booking #{payloads[0]['booking_id']} {payloads[0]['status']}"
+    else:
+        subject = f'{len(payloads)} booking updates'
+    lines = []
+    for p in payloads:
+        line = (
+            f"Booking #{p['booking_id']} for {p['hall_name']} on {p['booking_date']} "
+            f"{p['start_time']}-{p['end_time']} ({p['purpose']}): {p['status']}"
+        )
+        if p['reason']:
+            line += f". Reason: {p['reason']}"
+        lines.append(line)
+    return subject, '\n'.join(lines)
+
+
+class DeliveryBackend:
+    """Email through EMAIL_BACKEND, webhooks as a JSON POST"""
+
+    def send(self, channel, recipient, payloads):
+        if channel == 'email':
+            subject, body = render_digest(payloads)
+            send_mail(subject, body, None, [recipient])
+            return
+        # Only the outbox worker sends; web workers import this module at startup
+        import urllib.request
+
+        request = urllib.request.Request(
+            recipient,
+            data=json.dumps({'events': payloads}).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        # Error statuses raise HTTPError
+        with urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT_SECONDS) as response:
+            response.read()
+
+
+class FileBackend:
+    """Writes each digest as a JSON line to NOTIFICATION_FILE_PATH, or stdout when unset"""
+
+    def __init__(self):
+        self.path = getattr(settings, 'NOTIFICATION_FILE_PATH', '')
+        self.lock = threading.Lock()
+
+    def send(self, channel, recipient, payloads):
+        line = json.dumps({'channel': channel, 'recipient': recipient, 'events': payloads}) + '\n'
+        with self.lock:
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            else:
+                sys.stdout.write(line)
+
+
+def get_backend():
+    return import_string(getattr(settings, 'NOTIFICATION_BACKEND', DEFAULT_BACKEND))()
+
+
+def backoff(attempts):
+    """Delay before retrying a message that has failed ``attempts`` times."""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """Lease up to ``batch_size`` due messages to this worker and return them."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        OutboxMessage.objects.filter(id__in=[m.id for m in batch]).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + LEASE,
+        )
+    for message in batch:
+        message.attempts += 1
+    return batch
+
+
+def process_batch(backend=None, batch_size=DEFAULT_BATCH_SIZE, threads=DEFAULT_THREADS):
+    """Send one batch of due messages; return ``(sent, retrying, failed)`` message counts."""
+    backend = backend or get_backend()
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0, 0
+    digests = defaultdict(list)
+    for message in batch:
+        digests[message.channel, message.recipient].append(message)
+
+    # Only the sending runs in the pool; the database work stays on this thread
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            (messages, pool.submit(backend.send, channel, recipient, [m.payload for m in messages]))
+            for (channel, recipient), messages in digests.items()
+        ]
+    now = timezone.now()
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    sent, unsent = [], []
+    for messages, future in futures:
+        error = future.exception()
+        if error is None:
+            sent.extend(m.id for m in messages)
+            continue
+        for message in messages:
+            message.last_error = f'{type(error).__name__}: {error}'
+            if message.attempts >= max_attempts:
+                message.status = 'failed'
+            else:
+                message.next_attempt_at = now + backoff(message.attempts)
+            unsent.append(message)
+    with transaction.atomic():
+        OutboxMessage.objects.filter(id__in=sent).update(status='sent', sent_at=now, last_error='')
+        OutboxMessage.objects.bulk_update(unsent, ['status', 'next_attempt_at', 'last_error'])
+    failed = sum(1 for m in unsent if m.status == 'failed')
+    return len(sent), len(unsent) - failed, failed
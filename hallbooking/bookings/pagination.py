@@ -0,0 +1,74 @@
+"""Keyset (seek) pagination for booking lists.
+
+Pages are ordered on (booking_date, start_time, id) and the next page is
+found by seeking past the last row of the current one, so the cost of a
+page does not depend on how far into the list it is. The position is
+passed around as an opaque ``after`` cursor.
+"""
+import base64
+from datetime import date, time
+
+from django.db.models import Q
+
+
+PAGE_SIZE = 25
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(booking):
+    raw = f"{booking.booking_date.isoformat()}|{booking.start_time.isoformat()}|{booking.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (booking_date, start_time, id) key encoded in ``cursor``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        day, start, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return date.fromisoformat(day), time.fromisoformat(start), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def _page_queryset(queryset, after, size, descending):
+    if descending:
+        ordering = ('-booking_date', '-start_time', '-id')
+        op = 'lt'
+    else:
+        ordering = ('booking_date', 'start_time', 'id')
+        op = 'gt'
+
+    if after:
+        day, start, pk = decode_cursor(after)
+        queryset = queryset.filter(
+            Q(**{f'booking_date__{op}': day})
+            | Q(booking_date=day, **{f'start_time__{op}': start})
+            | Q(booking_date=day, start_time=start, **{f'id__{op}': pk})
+        )
+
+    return queryset.order_by(*ordering)[:size + 1]
+
+
+def _split_page(rows, size):
+    if len(rows) > size:
+        rows = rows[:size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def keyset_page(queryset, after=None, size=PAGE_SIZE, descending=False):
+    """Return ``(rows, next_cursor)`` for the page following ``after``.
+
+    ``next_cursor`` is None on the last page. Raises InvalidCursor if
+    ``after`` cannot be decoded.
+    """
+    return _split_page(list(_page_queryset(queryset, after, size, descending)), size)
+
+
+async def akeyset_page(queryset, after=None, size=PAGE_SIZE, descending=False):
+    """Async version of ``keyset_page``."""
+    page = _page_queryset(queryset, after, size, descending)
+    return _split_page([row async for row in page], size)
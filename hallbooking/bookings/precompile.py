@@ -0,0 +1,77 @@
+"""Template compilation at startup.
+
+The cached template loader parses each template once per process, on its
+first render. ``precompile_templates`` does that parse for every template
+under ``bookings/templates/bookings/`` (and the templates they extend or
+include by name) when a WSGI or ASGI worker starts, so the first requests
+do not pay for it and a template with a syntax error stops the worker
+from starting instead of failing one page at a time. It runs when
+``TEMPLATE_PRECOMPILE`` is on, which it is whenever DEBUG is off.
+
+The same parse is the ``bookings.E001`` system check, so ``manage.py
+check`` and ``runserver`` report broken templates too.
+"""
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, loader
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+
+def template_names():
+    """Names of the templates under ``bookings/templates/bookings/``, sorted."""
+    directory = Path(apps.get_app_config('bookings').path) / 'templates' / 'bookings'
+    return sorted(f'bookings/{path.name}' for path in directory.glob('*.html'))
+
+
+def _referenced(template):
+    """Names that ``template`` extends or includes as a constant string."""
+    nodelist = template.template.nodelist
+    for node in nodelist.get_nodes_by_type(ExtendsNode):
+        yield node.parent_name.var
+    for node in nodelist.get_nodes_by_type(IncludeNode):
+        yield node.template.var
+
+
+def compile_errors(names=None):
+    """Load ``names`` (default: every bookings template); return ``{name: error}``."""
+    pending = list(template_names() if names is None else names)
+    seen, errors = set(pending), {}
+    while pending:
+        name = pending.pop()
+        try:
+            template = loader.get_template(name)
+        except (TemplateSyntaxError, TemplateDoesNotExist) as e:
+            errors[name] = f'{type(e).__name__}: {e}'
+            continue
+        for parent in _referenced(template):
+            # Names computed from a variable are only known when rendering
+            if isinstance(parent, str) and parent not in seen:
+                seen.add(parent)
+                pending.append(parent)
+    return errors
+
+
+def precompile_templates():
+    """Compile every bookings template when TEMPLATE_PRECOMPILE is on.
+
+    Raises ImproperlyConfigured listing the templates that do not compile.
+    """
+    if not getattr(settings, 'TEMPLATE_PRECOMPILE', False):
+        return
+    errors = compile_errors()
+    if errors:
+        raise ImproperlyConfigured(
+            'Templates failed to compile: ' + '; '.join(f'{name}: {error}' for name, error in sorted(errors.items()))
+        )
+
+
+@checks.register(checks.Tags.templates)
+def check_templates(app_configs, **kwargs):
+    return [
+        checks.Error(f'Template {name} does not compile', hint=error, obj=name, id='bookings.E001')
+        for name, error in sorted(compile_errors().items())
+    ]
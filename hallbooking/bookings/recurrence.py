@@ -0,0 +1,119 @@
+"""Recurring booking series.
+
+A series is one template booking plus an RRULE. Creating it expands every
+occurrence up front, checks them all against existing bookings with one
+range query and an in-memory pass per day, and then either inserts the
+whole series or raises ``SeriesConflict`` naming the dates that collide.
+"""
+from collections import Counter, defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .admission import lock_hall_days
+from .conflicts import ACTIVE_STATUSES, IntervalSet
+from .models import Booking, Recurrence
+from .events import publish_booking_changes
+from .http_cache import touch_halls
+from .occupancy import refresh_occupancy
+from .reporting import apply_deltas
+
+
+MAX_OCCURRENCES = 200
+
+FREQUENCIES = {
+    'daily': 'DAILY',
+    'weekly': 'WEEKLY',
+    'monthly': 'MONTHLY',
+}
+
+
+class SeriesConflict(ValidationError):
+    """Raised when some occurrences of a series cannot be booked"""
+
+    def __init__(self, dates):
+        self.dates = sorted(dates)
+        super().__init__(
+            "Time slot conflicts with existing bookings on "
+            + ", ".join(day.isoformat() for day in self.dates)
+        )
+
+
+def build_rule(frequency, until, interval=1):
+    """Return an RRULE string, e.g. ``FREQ=WEEKLY;INTERVAL=1;UNTIL=20270301``."""
+    if frequency not in FREQUENCIES:
+        raise ValidationError(f"Unknown repeat frequency: {frequency}")
+    return f"FREQ={FREQUENCIES[frequency]};INTERVAL={int(interval)};UNTIL={until:%Y%m%d}"
+
+
+def expand(rule, dtstart):
+    """Return every occurrence date of ``rule`` from ``dtstart``, bounded."""
+    recurrence = Recurrence(rule=rule, dtstart=dtstart)
+    dates = []
+    try:
+        for day in recurrence.occurrences():
+            dates.append(day)
+            if len(dates) > MAX_OCCURRENCES:
+                raise ValidationError(f"A series can have at most {MAX_OCCURRENCES} occurrences")
+    except ValueError as e:
+        raise ValidationError(f"Invalid repeat rule: {e}")
+    return dates
+
+
+def colliding_dates(template, dates):
+    """Return the dates on which ``template``'s slot is unavailable.
+
+    One query loads the hall's bookings over the whole span; each date is
+    then checked against that day's intervals and start times.
+    """
+    taken = defaultdict(IntervalSet)
+    starts = defaultdict(set)
+    existing = Booking.objects.filter(
+        hall_id=template.hall_id,
+        booking_date__range=(min(dates), max(dates)),
+    ).order_by().values_list('booking_date', 'start_time', 'end_time', 'status')
+    for day, start, end, status in existing:
+        # booking_active_slot_uniq only covers active rows
+        if status in ACTIVE_STATUSES:
+            starts[day].add(start)
+            taken[day].add(start, end)
+    return [
+        day for day in dates
+        if template.start_time in starts[day]
+        or taken[day].overlaps(template.start_time, template.end_time)
+    ]
+
+
+def create_series(template, rule):
+    """Book ``template`` (an unsaved Booking) on every date of ``rule``.
+
+    ``template.booking_date`` is the first occurrence. Returns the saved
+    bookings, or raises ValidationError / SeriesConflict and saves nothing.
+    """
+    template.clean_fields(exclude=['recurrence'])
+    template.validate_request()
+    dates = expand(rule, template.booking_date)
+    if not dates:
+        raise ValidationError("The repeat rule produces no dates")
+
+    with transaction.atomic():
+        lock_hall_days(template.hall_id, dates)
+        collisions = colliding_dates(template, dates)
+        if collisions:
+            raise SeriesConflict(collisions)
+
+        recurrence = Recurrence.objects.create(rule=rule, dtstart=dates[0])
+        fields = {
+            f.attname: getattr(template, f.attname)
+            for f in Booking._meta.concrete_fields
+            if f.attname not in ('id', 'booking_date', 'recurrence_id', 'created_at')
+        }
+        bookings = Booking.objects.bulk_create([
+            Booking(booking_date=day, recurrence=recurrence, **fields) for day in dates
+        ])
+        # bulk_create skips post_save, so update the report stats and occupancy here
+        apply_deltas(Counter(b.stat_key() for b in bookings))
+        refresh_occupancy(b.stat_key()[:2] for b in bookings)
+        publish_booking_changes(bookings)
+        touch_halls([template.hall_id])
+    return bookings
@@ -0,0 +1,113 @@
+"""Incrementally maintained booking statistics for admin_reports.
+
+``DailyBookingStat`` holds one count per (hall, date, status, faculty).
+Single saves and deletes adjust it through signals (see ``signals.py``);
+bulk paths that bypass signals call ``apply_deltas`` themselves.
+``manage.py rebuild_booking_stats`` recomputes the table from scratch.
+Archived bookings stay counted (see ``archive``).
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import ArchivedBooking, Booking, DailyBookingStat
+
+
+# Above this many keys, deltas are applied with bulk_update/bulk_create
+BULK_DELTA_THRESHOLD = 4
+
+
+def apply_deltas(deltas):
+    """Add ``{(hall_id, date, status, faculty): delta}`` to the stats table."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if len(deltas) > BULK_DELTA_THRESHOLD:
+        _apply_deltas_bulk(deltas)
+        return
+    for (hall_id, day, status, faculty), delta in deltas.items():
+        key = {'hall_id': hall_id, 'date': day, 'status': status, 'faculty': faculty}
+        if DailyBookingStat.objects.filter(**key).update(count=F('count') + delta):
+            continue
+        if delta < 0:
+            # Nothing to take from, e.g. the hall and its stats are being deleted
+            continue
+        try:
+            with transaction.atomic():
+                DailyBookingStat.objects.create(count=delta, **key)
+        except IntegrityError:
+            # Created concurrently; the row exists now
+            DailyBookingStat.objects.filter(**key).update(count=F('count') + delta)
+
+
+def _apply_deltas_bulk(deltas, batch_size=500):
+    days = [day for _, day, _, _ in deltas]
+    with transaction.atomic():
+        existing = {
+            (row.hall_id, row.date, row.status, row.faculty): row
+            for row in DailyBookingStat.objects.select_for_update().filter(
+                hall_id__in={hall_id for hall_id, _, _, _ in deltas},
+                date__range=(min(days), max(days)),
+            )
+        }
+        to_update, to_create = [], []
+        for key, delta in deltas.items():
+            row = existing.get(key)
+            if row is not None:
+                row.count += delta
+                to_update.append(row)
+            elif delta > 0:
+                hall_id, day, status, faculty = key
+                to_create.append(DailyBookingStat(
+                    hall_id=hall_id, date=day, status=status, faculty=faculty, count=delta,
+                ))
+        DailyBookingStat.objects.bulk_update(to_update, ['count'], batch_size=batch_size)
+        DailyBookingStat.objects.bulk_create(to_create, batch_size=batch_size)
+
+
+def status_change_deltas(rows, new_status):
+    """Deltas for moving ``rows`` (Booking instances) to ``new_status``."""
+    deltas = Counter()
+    for booking in rows:
+        hall_id, day, status, faculty = booking.stat_key()
+        deltas[hall_id, day, status, faculty] -= 1
+        deltas[hall_id, day, new_status, faculty] += 1
+    return deltas
+
+
+def rebuild_daily_stats(batch_size=1000):
+    """Recompute every DailyBookingStat row from the live and archived bookings; return the row count."""
+    with transaction.atomic():
+        counts = Counter()
+        for model in (Booking, ArchivedBooking):
+            grouped = model.objects.order_by().values_list(
+                'hall_id', 'booking_date', 'status', 'faculty'
+            ).annotate(total=Count('id'))
+            for hall_id, day, status, faculty, total in grouped.iterator():
+                counts[hall_id, day, status, faculty] += total
+        DailyBookingStat.objects.all().delete()
+        stats = DailyBookingStat.objects.bulk_create(
+            (
+                DailyBookingStat(hall_id=hall_id, date=day, status=status, faculty=faculty, count=total)
+                for (hall_id, day, status, faculty), total in counts.items()
+            ),
+            batch_size=batch_size,
+        )
+    return len(stats)
+
+
+def report_stats(date_from=None, date_to=None, faculty=None):
+    """Return ``(total, status_counts, hall_stats)`` from the stats table."""
+    stats = DailyBookingStat.objects.filter(count__gt=0)
+    if date_from:
+        stats = stats.filter(date__gte=date_from)
+    if date_to:
+        stats = stats.filter(date__lte=date_to)
+    if faculty:
+        stats = stats.filter(faculty=faculty)
+
+    status_counts = list(
+        stats.values('status').annotate(count=Sum('count')).order_by('status')
+    )
+    hall_stats = stats.values('hall__name').annotate(count=Sum('count')).order_by('-count')
+    total = sum(stat['count'] for stat in status_counts)
+    return total, status_counts, hall_stats
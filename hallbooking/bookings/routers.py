@@ -0,0 +1,184 @@
+"""Read-replica routing.
+
+Replica aliases are listed in ``DATABASE_REPLICAS`` (built from
+``DATABASE_REPLICA_URLS`` in settings). Reads stay on the primary unless
+they run inside ``replica_reads()`` or a view decorated with
+``read_only_view``, and only models of the ``bookings`` app move: sessions
+and users always come from the primary, so a fresh login or password
+change is never lost to replication lag. Reads inside a transaction on
+the primary stay there too.
+
+Read-your-writes: ``ReplicaPinningMiddleware`` notices when a request
+wrote to a ``bookings`` model and sets a cookie that keeps that browser's
+reads on the primary for ``REPLICA_PIN_SECONDS``, which should be longer
+than the replicas ever lag. Later reads in the writing request itself
+stay on the primary as well. A write is noticed by ``note_writes``, an
+``execute_wrapper`` on every primary connection (installed from
+``signals.py`` when the connection opens) that watches for INSERT, UPDATE
+and DELETE statements on ``bookings`` tables. Asking the router for a
+write alias is not a write: the catalog and ``get_or_create`` do that
+for reads too.
+"""
+import random
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache, wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+REPLICA_APPS = {'bookings'}
+PIN_COOKIE = 'db_pin'
+DEFAULT_PIN_SECONDS = 15
+
+WRITE_SQL = re.compile(r'\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM)\s+["`]?(\w+)', re.IGNORECASE)
+
+
+class RoutingState:
+    """Per-request routing decisions, shared with ORM calls in other threads"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+
+
+_state = ContextVar('bookings_routing_state', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+@cache
+def _replicated_tables():
+    return frozenset(
+        model._meta.db_table for label in REPLICA_APPS for model in apps.get_app_config(label).get_models()
+    )
+
+
+def note_writes(execute, sql, params, many, context):
+    """``execute_wrapper`` that flags the request once it writes a ``bookings`` table."""
+    state = _state.get()
+    if state is not None and not state.wrote:
+        match = WRITE_SQL.match(sql)
+        if match and match.group(1) in _replicated_tables():
+            state.wrote = True
+    return execute(sql, params, many, context)
+
+
+def install_write_hook(connection):
+    if connection.alias == DEFAULT_DB_ALIAS and note_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(note_writes)
+
+
+@contextmanager
+def replica_reads():
+    """Send ``bookings`` reads in this block to one replica, if any is configured."""
+    state = _state.get()
+    if not replicas() or (state is not None and state.pinned):
+        yield
+        return
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _state.set(state)
+    previous = state.replica
+    # One replica per request, so its reads see a single consistent snapshot
+    state.replica = previous or random.choice(replicas())
+    try:
+        yield
+    finally:
+        state.replica = previous
+        if token is not None:
+            _state.reset(token)
+
+
+def read_only_view(view):
+    """Serve ``view``'s ``bookings`` reads from a replica."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or state.replica is None or state.wrote
+            or model._meta.app_label not in REPLICA_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Keeps a browser on the primary for a while after it writes bookings"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(state, response)
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(state, response)
+
+    def _pin(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS),
+                httponly=True, samesite='Lax',
+            )
+        return response
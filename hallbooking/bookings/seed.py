@@ -0,0 +1,95 @@
+"""Deterministic synthetic data for benchmarks and demos.
+
+The same ``seed`` always produces the same halls, users and bookings, so
+benchmark runs against different code are comparable. Used by the
+``benchmark`` command and by ``create_halls.py --synthetic`` /
+``create_test_users.py --synthetic``.
+"""
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+
+from .http_cache import touch_halls
+from .models import Booking, Hall
+from .occupancy import repair_occupancy
+from .reporting import rebuild_daily_stats
+
+
+DEFAULT_SEED = 1234
+
+AMENITIES = [
+    'Projector', 'Sound System', 'Stage', 'WiFi', 'AC', 'Parking', 'Whiteboard',
+    'Video Conferencing', 'Catering Kitchen', 'Discussion Tables',
+]
+CAPACITIES = [c for c, _ in Hall.CAPACITY_CHOICES]
+FACULTIES = [f for f, _ in Booking.FACULTY_CHOICES]
+STATUSES = ['pending', 'approved', 'approved', 'approved', 'rejected', 'cancelled']
+
+FIRST_HOUR = 8
+SLOTS_PER_DAY = 10
+# Share of hall-day slots that end up booked
+DENSITY = 0.5
+
+
+def seed_halls(count, seed=DEFAULT_SEED):
+    rng = random.Random(seed)
+    return Hall.objects.bulk_create([
+        Hall(
+            name=f'Benchmark Hall {i:03d}',
+            capacity=rng.choice(CAPACITIES),
+            location=f'Block {chr(65 + i % 26)}, Floor {i % 4}',
+            description='Synthetic hall for benchmarking.',
+            amenities=', '.join(rng.sample(AMENITIES, 4)),
+        )
+        for i in range(count)
+    ])
+
+
+def seed_users(count, prefix='bench_user'):
+    return User.objects.bulk_create([
+        User(username=f'{prefix}{i:05d}', first_name='Bench', last_name=str(i), password='!')
+        for i in range(count)
+    ], batch_size=1000)
+
+
+def seed_bookings(count, halls=None, users=None, seed=DEFAULT_SEED, batch_size=1000):
+    """Create ``count`` non-overlapping one-hour bookings spread over the halls.
+
+    A quarter of the covered days lie in the past. Returns the bookings.
+    """
+    rng = random.Random(seed)
+    halls = list(halls if halls is not None else Hall.objects.order_by('id'))
+    users = list(users if users is not None else User.objects.filter(is_staff=False).order_by('id'))
+    if not halls or not users:
+        raise ValueError('Seeding bookings needs at least one hall and one user')
+
+    days = max(1, int(count / (len(halls) * SLOTS_PER_DAY * DENSITY)) + 1)
+    first_day = datetime.now().date() - timedelta(days=days // 4)
+    capacity = days * len(halls) * SLOTS_PER_DAY
+    taken = set()
+    bookings = []
+    while len(bookings) < min(count, capacity):
+        key = (rng.randrange(len(halls)), rng.randrange(days), rng.randrange(SLOTS_PER_DAY))
+        if key in taken:
+            continue
+        taken.add(key)
+        hall_index, day, slot = key
+        hall = halls[hall_index]
+        bookings.append(Booking(
+            hall=hall,
+            user=rng.choice(users),
+            booking_date=first_day + timedelta(days=day),
+            start_time=time(FIRST_HOUR + slot),
+            end_time=time(FIRST_HOUR + slot + 1),
+            purpose=f'Synthetic event {len(bookings)}',
+            expected_attendees=rng.randint(10, hall.capacity),
+            faculty=rng.choice(FACULTIES),
+            status=rng.choice(STATUSES),
+        ))
+    created = Booking.objects.bulk_create(bookings, batch_size=batch_size)
+    # bulk_create skips the signals that maintain the report stats, occupancy and hall timestamps
+    rebuild_daily_stats()
+    repair_occupancy()
+    touch_halls(hall.id for hall in halls)
+    return created
@@ -0,0 +1,98 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .auth import forget_user
+from .catalog import invalidate_catalog
+from .conflicts import ACTIVE_STATUSES
+from .events import publish_hall_days
+from .http_cache import touch_halls
+from .models import Booking, Hall
+from .occupancy import refresh_occupancy
+from .outbox import enqueue_status_changes
+from .reporting import apply_deltas
+from .routers import install_write_hook
+from .waitlist import promote_waitlist
+
+
+@receiver(post_save, sender=Hall)
+@receiver(post_delete, sender=Hall)
+def hall_changed(sender, **kwargs):
+    """Any hall add/edit/delete, from the views or the admin, invalidates the catalog"""
+    # After commit: a miss before then would cache the old rows under the new version
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(connection_created)
+def watch_primary_writes(sender, connection, **kwargs):
+    """Let replica pinning see the writes on this connection (see routers.py)"""
+    install_write_hook(connection)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    """Drop the cached request.user copy (see auth.py)"""
+    forget_user(instance.pk)
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_stat_key(sender, instance, raw=False, **kwargs):
+    """Look up the stored key of bookings that were not loaded with it"""
+    if raw or instance._state.adding or hasattr(instance, '_loaded_stat_key'):
+        return
+    row = Booking.objects.filter(pk=instance.pk).values_list(
+        'hall_id', 'booking_date', 'status', 'faculty'
+    ).first()
+    instance._loaded_stat_key = row
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, raw=False, **kwargs):
+    """Bring everything derived from a booking up to date after a single save.
+
+    ``old`` is the booking's stat key as loaded (or looked up by
+    ``remember_booking_stat_key``), None for a new booking. One receiver
+    handles every step so they all see the same ``old``, which is replaced
+    with the new key only at the end.
+    """
+    if raw:
+        return
+    old = None if created else getattr(instance, '_loaded_stat_key', None)
+    new = instance.stat_key()
+    hall_days = {new[:2]} if old is None else {new[:2], old[:2]}
+    was_active = old is not None and old[2] in ACTIVE_STATUSES
+
+    # Push the new availability of the booking's day, and of its old day if it moved
+    publish_hall_days(hall_days)
+    # A booking that neither was nor is active never held a slot
+    if instance.status in ACTIVE_STATUSES or was_active:
+        refresh_occupancy(hall_days)
+    # Give a slot given up by cancellation, rejection or a move to the waitlist
+    if was_active and (instance.status not in ACTIVE_STATUSES or new[:2] != old[:2]):
+        promote_waitlist([old[:2]])
+    touch_halls([new[0]] if old is None else [new[0], old[0]])
+    if old is not None and old[2] != instance.status:
+        enqueue_status_changes([instance], instance.status, instance.rejection_reason)
+    # Move the booking between DailyBookingStat rows when its key changes
+    if old != new:
+        deltas = Counter({new: 1})
+        if old is not None:
+            deltas[old] -= 1
+        apply_deltas(deltas)
+    instance._loaded_stat_key = new
+
+
+@receiver(post_delete, sender=Booking)
+def uncount_booking(sender, instance, **kwargs):
+    key = getattr(instance, '_loaded_stat_key', None) or instance.stat_key()
+    apply_deltas({key: -1})
+    publish_hall_days([key[:2]])
+    touch_halls([key[0]])
+    if key[2] in ACTIVE_STATUSES:
+        refresh_occupancy([key[:2]])
+        promote_waitlist([key[:2]])
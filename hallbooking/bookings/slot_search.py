@@ -0,0 +1,157 @@
+"""Free-slot search across halls.
+
+``find_free_slots`` answers "which hall can hold N people for D minutes
+between these times on one of these days?". Halls come from the caller
+(normally the cached catalog) and are filtered on ``available`` and
+``capacity``. The busy-slot bitmaps of the remaining halls over the date
+range come from one query on the occupancy table (see ``occupancy``),
+ordered by date, and each becomes an ``IntervalSet`` of busy runs; every
+gap long enough for the event gives one candidate at its earliest start.
+
+Candidates are ranked by date, then by how closely the hall's capacity
+fits the attendee count, so large halls stay free for large events, then
+by start time and hall name. Because the date ranks first, the search stops
+reading rows as soon as a day fills the limit.
+"""
+import heapq
+from datetime import date, datetime, time
+
+from .availability import SLOT_MINUTES, busy_runs, date_range, from_hex
+from .conflicts import IntervalSet
+
+
+MAX_RANGE_DAYS = 31
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+DURATIONS = (30, 60, 90, 120, 180, 240)
+DEFAULT_WINDOW = (time(8, 0), time(20, 0))
+ROW_CHUNK_SIZE = 2000
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def _time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+class SlotQuery:
+    def __init__(self, date_from, date_to, duration, window_start, window_end, attendees, limit=DEFAULT_LIMIT):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.duration = duration
+        self.window_start = window_start
+        self.window_end = window_end
+        self.attendees = attendees
+        self.limit = limit
+
+    def to_dict(self):
+        return {
+            'from': self.date_from.isoformat(),
+            'to': self.date_to.isoformat(),
+            'duration': self.duration,
+            'window_start': self.window_start.strftime('%H:%M'),
+            'window_end': self.window_end.strftime('%H:%M'),
+            'attendees': self.attendees,
+            'limit': self.limit,
+        }
+
+
+class SlotCandidate:
+    def __init__(self, hall, day, start, end, free_until):
+        self.hall = hall
+        self.date = day
+        self.start = start
+        self.end = end
+        self.free_until = free_until
+
+    def to_dict(self):
+        return {
+            'hall_id': self.hall.id,
+            'hall_name': self.hall.name,
+            'capacity': self.hall.capacity,
+            'location': self.hall.location,
+            'date': self.date.isoformat(),
+            'start_time': self.start.strftime('%H:%M'),
+            'end_time': self.end.strftime('%H:%M'),
+            'free_until': self.free_until.strftime('%H:%M'),
+        }
+
+
+def parse_slot_query(params, today=None):
+    """Build a SlotQuery from request parameters, or raise ValueError."""
+    today = today or datetime.now().date()
+    try:
+        date_from = date.fromisoformat(params.get('from') or params.get('date') or today.isoformat())
+        date_to = date.fromisoformat(params.get('to') or date_from.isoformat())
+        window_start = time.fromisoformat(params.get('window_start') or DEFAULT_WINDOW[0].isoformat())
+        window_end = time.fromisoformat(params.get('window_end') or DEFAULT_WINDOW[1].isoformat())
+    except ValueError:
+        raise ValueError('Invalid date or time')
+    try:
+        duration = int(params.get('duration') or 60)
+        attendees = int(params.get('attendees') or 1)
+        limit = int(params.get('limit') or DEFAULT_LIMIT)
+    except ValueError:
+        raise ValueError('Duration, attendees and limit must be whole numbers')
+
+    if date_from < today:
+        raise ValueError('The search cannot start in the past')
+    if date_to < date_from or (date_to - date_from).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'The date range must cover 1 to {MAX_RANGE_DAYS} days')
+    if window_end <= window_start:
+        raise ValueError('The time window must end after it starts')
+    if duration < SLOT_MINUTES or duration > _minutes(window_end) - _minutes(window_start):
+        raise ValueError(f'The duration must be at least {SLOT_MINUTES} minutes and fit in the time window')
+    if attendees < 1:
+        raise ValueError('Expected attendees must be at least 1')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'The limit must be between 1 and {MAX_LIMIT}')
+    return SlotQuery(date_from, date_to, duration, window_start, window_end, attendees, limit)
+
+
+def find_free_slots(query, halls, now=None):
+    """Return up to ``query.limit`` ranked SlotCandidates among ``halls``."""
+    from .models import HallDayOccupancy
+
+    halls = {hall.id: hall for hall in halls if hall.available and hall.capacity >= query.attendees}
+    if not halls:
+        return []
+
+    rows = HallDayOccupancy.objects.filter(
+        hall_id__in=list(halls),
+        date__range=(query.date_from, query.date_to),
+    ).order_by('date').values_list('date', 'hall_id', 'busy')
+    # Rows arrive a day at a time; days after the last one needed are never fetched
+    rows = iter(rows.iterator(chunk_size=ROW_CHUNK_SIZE))
+    pending = next(rows, None)
+
+    now = now or datetime.now()
+    results = []
+    empty = IntervalSet()
+    for day in date_range(query.date_from, query.date_to):
+        busy = {}
+        while pending is not None and pending[0] == day:
+            _, hall_id, bitmap = pending
+            busy[hall_id] = IntervalSet(busy_runs(from_hex(bitmap)))
+            pending = next(rows, None)
+
+        window_start, window_end = _minutes(query.window_start), _minutes(query.window_end)
+        if day == now.date():
+            window_start = max(window_start, now.hour * 60 + now.minute)
+        ranked = []
+        for hall_id, hall in halls.items():
+            for gap_start, gap_end in busy.get(hall_id, empty).gaps(window_start, window_end):
+                # Start on the booking-slot grid
+                start = -(-gap_start // SLOT_MINUTES) * SLOT_MINUTES
+                if start + query.duration <= gap_end:
+                    ranked.append((hall.capacity - query.attendees, start, hall.name, hall_id, gap_end))
+        for _, start, _, hall_id, gap_end in heapq.nsmallest(query.limit - len(results), ranked):
+            results.append(SlotCandidate(
+                halls[hall_id], day, _time(start), _time(start + query.duration), _time(gap_end),
+            ))
+        # Dates rank first, so once a day fills the limit later days cannot beat it
+        if len(results) >= query.limit:
+            break
+    return results
@@ -0,0 +1,216 @@
+"""Staff pages: moderation, hall management, reports, export and metrics.
+
+Only staff and metric scrapers reach these views, so ``urls`` loads this
+module (and the moderation, reporting, export and form code it pulls in)
+through ``lazy_view`` on the first request for one of them instead of
+with the public pages.
+"""
+import hmac
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_http_methods, require_POST
+
+from . import export
+from .forms import HallForm
+from .metrics import registry as metrics_registry
+from .models import Booking, Hall
+from .moderation import APPROVE, REJECT, moderate_bookings
+from .pagination import InvalidCursor, keyset_page
+from .reporting import report_stats
+from .routers import read_only_view
+
+
+@staff_member_required
+def pending_bookings(request):
+    """List all pending bookings for staff to review."""
+    try:
+        bookings, next_cursor = keyset_page(
+            Booking.objects.filter(status='pending').select_related('hall', 'user'),
+            after=request.GET.get('after'),
+        )
+    except InvalidCursor:
+        return redirect('pending_bookings')
+    context = {'bookings': bookings, 'next_cursor': next_cursor}
+    return render(request, 'bookings/pending_bookings.html', context)
+
+
+@staff_member_required
+@require_POST
+def approve_booking(request, booking_id):
+    booking = get_object_or_404(Booking, id=booking_id)
+    result = moderate_bookings([booking.id], APPROVE, request.user)
+    if result:
+        messages.success(request, f'Booking #{booking.id} approved.')
+    else:
+        messages.error(request, f'Booking #{booking.id} not approved: {result.failures[booking.id]}')
+    return redirect('pending_bookings')
+
+
+@staff_member_required
+@require_POST
+def reject_booking(request, booking_id):
+    booking = get_object_or_404(Booking, id=booking_id)
+    reason = request.POST.get('rejection_reason', '')
+    result = moderate_bookings([booking.id], REJECT, request.user, reason=reason)
+    if result:
+        messages.success(request, f'Booking #{booking.id} rejected.')
+    else:
+        messages.error(request, f'Booking #{booking.id} not rejected: {result.failures[booking.id]}')
+    return redirect('pending_bookings')
+
+
+@staff_member_required
+@require_POST
+def moderate_bookings_bulk(request):
+    """Approve or reject every selected booking in one batch"""
+    action = request.POST.get('action')
+    booking_ids = [pk for pk in request.POST.getlist('booking_ids') if pk.isdigit()]
+    if action not in (APPROVE, REJECT) or not booking_ids:
+        messages.error(request, 'Select at least one booking and an action.')
+        return redirect('pending_bookings')
+
+    result = moderate_bookings(
+        booking_ids, action, request.user, reason=request.POST.get('rejection_reason', '')
+    )
+    if result.failures:
+        messages.warning(request, result.summary())
+        for booking_id, reason in result.failures.items():
+            messages.warning(request, f'Booking #{booking_id}: {reason}')
+    else:
+        messages.success(request, result.summary())
+    return redirect('pending_bookings')
+
+
+@staff_member_required
+def admin_dashboard(request):
+    """Admin dashboard to manage bookings and halls"""
+    context = {
+        'pending_count': Booking.objects.filter(status='pending').count(),
+        'total_halls': Hall.objects.count(),
+    }
+    return render(request, 'bookings/admin_dashboard.html', context)
+
+
+@staff_member_required
+def manage_halls(request):
+    """List and manage halls"""
+    halls = Hall.objects.all()
+    return render(request, 'bookings/manage_halls.html', {'halls': halls})
+
+@staff_member_required
+def add_hall(request):
+    """Add a new hall"""
+    if request.method == 'POST':
+        form = HallForm(request.POST)
+        if form.is_valid():
+            form.save()
+            messages.success(request, 'New hall added successfully!')
+            return redirect('manage_halls')
+    else:
+        form = HallForm()
+    return render(request, 'bookings/hall_form.html', {'form': form})
+
+@staff_member_required
+def edit_hall(request, hall_id):
+    """Edit an existing hall"""
+    hall = get_object_or_404(Hall, id=hall_id)
+    if request.method == 'POST':
+        form = HallForm(request.POST, instance=hall)
+        if form.is_valid():
+            form.save()
+            messages.success(request, 'Hall updated successfully!')
+            return redirect('manage_halls')
+    else:
+        form = HallForm(instance=hall)
+    return render(request, 'bookings/hall_form.html', {'form': form})
+
+@staff_member_required
+def delete_hall(request, hall_id):
+    """Delete a hall"""
+    hall = get_object_or_404(Hall, id=hall_id)
+    if request.method == 'POST':
+        hall.delete()
+        messages.success(request, 'Hall deleted successfully!')
+        return redirect('manage_halls')
+    return render(request, 'bookings/hall_confirm_delete.html', {'hall': hall})
+
+
+@staff_member_required
+@read_only_view
+def admin_reports(request):
+    """View booking reports"""
+    date_from = _date_param(request, 'from')
+    date_to = _date_param(request, 'to')
+    faculty = request.GET.get('faculty', '')
+    if faculty not in dict(Booking.FACULTY_CHOICES):
+        faculty = ''
+
+    # Summary stats and hall popularity come from the DailyBookingStat table
+    total_bookings, status_counts, hall_stats = report_stats(date_from, date_to, faculty)
+    
+    # Recent activity
+    recent_bookings = Booking.objects.select_related('user', 'hall').order_by('-created_at')[:10]
+    
+    context = {
+        'total_bookings': total_bookings,
+        'status_counts': status_counts,
+        'hall_stats': hall_stats,
+        'recent_bookings': recent_bookings,
+        'date_from': date_from,
+        'date_to': date_to,
+        'faculty': faculty,
+        'faculty_choices': Booking.FACULTY_CHOICES,
+    }
+    return render(request, 'bookings/admin_reports.html', context)
+
+
+@staff_member_required
+@read_only_view
+def export_bookings(request):
+    """Stream bookings as CSV or JSON Lines, filtered like admin_reports"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return JsonResponse({'error': 'Unknown format'}, status=400)
+    hall_id = request.GET.get('hall_id', '')
+    sources = export.filter_bookings(
+        date_from=_date_param(request, 'from'),
+        date_to=_date_param(request, 'to'),
+        hall_id=hall_id if hall_id.isdigit() else None,
+        status=request.GET.get('status') or None,
+        faculty=request.GET.get('faculty') or None,
+    )
+    # Rows stream after the view returns, outside read_only_view: pin the database now
+    sources = [bookings.using(bookings.db) for bookings in sources]
+    response = StreamingHttpResponse(
+        export.export_lines(sources, fmt), content_type=export.FORMATS[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="bookings.{fmt}"'
+    return response
+
+
+def _date_param(request, name):
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Request and SQL metrics in Prometheus text format.
+
+    Open to staff sessions, or to scrapers sending ``Authorization: Bearer
+    <METRICS_TOKEN>`` when that setting is configured.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    bearer = request.headers.get('Authorization', '')
+    if not (request.user.is_staff or (token and hmac.compare_digest(bearer, f'Bearer {token}'))):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(
+        metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
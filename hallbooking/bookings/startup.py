@@ -0,0 +1,164 @@
+"""Cold-start profiles of the project.
+
+``profile_startup`` starts a fresh interpreter that runs the same steps
+as a new web worker: ``django.setup()``, loading ``WSGI_APPLICATION``
+(which compiles the templates, see ``precompile``), then one request and
+a second one for comparison. The probe reports how long each step took
+and which modules were loaded at the end.
+
+With ``importtime=True`` the probe runs under ``python -X importtime``,
+and ``parse_importtime`` splits the module timings it prints into those
+steps. ``-X importtime`` slows imports down, so time a run without it.
+``manage.py startup_profile`` reports both.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+
+PHASES = ('setup', 'application', 'first_request')
+PHASE_MARKER = 'startup-profile-phase:'
+
+PROBE = f'''
+import io, json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+path, host = sys.argv[1:3]
+timings = {{}}
+
+def phase(name):
+    sys.stderr.write({PHASE_MARKER!r} + name + '\\n')
+    sys.stderr.flush()
+
+def request():
+    environ = {{'HTTP_HOST': host, 'wsgi.input': io.BytesIO()}}
+    environ['PATH_INFO'], _, environ['QUERY_STRING'] = path.partition('?')
+    setup_testing_defaults(environ)
+    status = []
+    response = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        b''.join(response)
+    finally:
+        getattr(response, 'close', lambda: None)()
+    return int(status[0].split()[0])
+
+start = time.perf_counter()
+phase('setup')
+import django
+django.setup()
+timings['setup_ms'] = time.perf_counter() - start
+
+step = time.perf_counter()
+phase('application')
+from django.conf import settings
+from django.utils.module_loading import import_string
+application = import_string(settings.WSGI_APPLICATION)
+timings['application_ms'] = time.perf_counter() - step
+
+step = time.perf_counter()
+phase('first_request')
+first_status = request()
+timings['first_request_ms'] = time.perf_counter() - step
+timings['first_response_ms'] = time.perf_counter() - start
+
+step = time.perf_counter()
+phase('done')
+second_status = request()
+timings['second_request_ms'] = time.perf_counter() - step
+
+result = {{name: round(seconds * 1000, 1) for name, seconds in timings.items()}}
+result.update(status=first_status, second_status=second_status, modules=sorted(sys.modules))
+sys.stdout.write(json.dumps(result))
+'''
+
+
+def default_host():
+    """A host name the settings accept, for the probe's requests."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def profile_startup(path='/', host=None, importtime=False, env=None):
+    """Run the probe in a new interpreter; return its report.
+
+    ``imports`` holds the ``parse_importtime`` entries when ``importtime``
+    is on. Raises RuntimeError if the probe fails.
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', PROBE, path, host or default_host()]
+    environ = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, **(env or {})}
+    start = time.perf_counter()
+    done = subprocess.run(command, capture_output=True, text=True, cwd=settings.BASE_DIR, env=environ)
+    elapsed = time.perf_counter() - start
+    if done.returncode:
+        raise RuntimeError(f'Startup probe failed:\n{done.stderr[-2000:]}')
+    report = json.loads(done.stdout)
+    # Interpreter start and exit included
+    report['process_ms'] = round(elapsed * 1000, 1)
+    if importtime:
+        report['imports'] = parse_importtime(done.stderr)
+    return report
+
+
+def parse_importtime(output):
+    """Parse ``-X importtime`` output into dicts, tagging each import with its phase.
+
+    Each entry has ``module``, ``self_us``, ``cumulative_us``, ``depth``
+    (0 for an import the probe's own code triggered) and ``phase``.
+    """
+    entries, phase = [], None
+    for line in output.splitlines():
+        if line.startswith(PHASE_MARKER):
+            phase = line[len(PHASE_MARKER):]
+            continue
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            # The column header
+            continue
+        module = name.lstrip()
+        entries.append({
+            'module': module,
+            'self_us': int(own),
+            'cumulative_us': int(cumulative),
+            'depth': (len(name) - len(module) - 1) // 2,
+            'phase': phase,
+        })
+    return entries
+
+
+def package_of(module):
+    """The group a module is reported under: ``django.db``, ``django.contrib.admin``, ``bookings.views``..."""
+    parts = module.split('.')
+    if parts[0] == 'django':
+        return '.'.join(parts[:3] if parts[1:2] == ['contrib'] else parts[:2])
+    if parts[0] in ('bookings', 'hallbooking'):
+        return '.'.join(parts[:2])
+    return parts[0]
+
+
+def summarize_imports(entries, top=15):
+    """Per phase: total import time, module count and the slowest packages by self time."""
+    phases = {}
+    for phase in PHASES:
+        rows = [e for e in entries if e['phase'] == phase]
+        packages = defaultdict(int)
+        for e in rows:
+            packages[package_of(e['module'])] += e['self_us']
+        slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        phases[phase] = {
+            'modules': len(rows),
+            'import_ms': round(sum(e['self_us'] for e in rows) / 1000, 1),
+            'packages': [{'package': name, 'self_ms': round(us / 1000, 1)} for name, us in slowest],
+        }
+    return phases
@@ -1,9 +1,57 @@
 # Hall Booking System Tests
 
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from wsgiref.util import setup_testing_defaults
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from datetime import datetime, timedelta
-from .models import Hall, Booking
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management.base import CommandError
+from datetime import datetime, time, timedelta
+from .models import Hall, Booking, ArchivedBooking, HallDayOccupancy, OutboxMessage, WaitlistEntry
+from .conflicts import IntervalSet, sweep_conflicts
+from .admission import admit_booking
+from .availability import from_hex, is_free, slot_mask
+from .moderation import APPROVE, REJECT, moderate_bookings
+from .models import DailyBookingStat, HallBookingsVersion
+from .http_cache import touch_halls
+from .reporting import rebuild_daily_stats, report_stats
+from .occupancy import repair_occupancy
+from .outbox import process_batch
+from .recurrence import SeriesConflict, build_rule, create_series
+from .metrics import QueryRecorder, registry as metrics_registry
+from .slot_search import find_free_slots, parse_slot_query
+from .routers import PIN_COOKIE, ReplicaRouter, replica_reads
+from .waitlist import join_waitlist, queue_position
+from .catalog import catalog_version
+from .benchmark import TEMPLATE_SCENARIOS, Workload, percentile, run_client, run_templates, run_wsgi
+from .precompile import check_templates, compile_errors, template_names
+from .lazy import LazyView
+from .startup import parse_importtime, profile_startup, summarize_imports
+from .seed import seed_bookings, seed_halls, seed_users
+from . import events
 
 
 class HallModelTest(TestCase):
@@ -52,6 +100,1654 @@ class BookingModelTest(TestCase):
         self.assertEqual(booking.status, 'pending')
         self.assertEqual(booking.expected_attendees, 50)
 
+
+class ConflictEngineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.hall = Hall.objects.create(
+            name='Test Hall', capacity=100, location='Loc', description='Desc'
+        )
+        self.day = datetime.now().date() + timedelta(days=1)
+
+    def make_booking(self, start, end, **kwargs):
+        return Booking.objects.create(
+            hall=self.hall, user=self.user, booking_date=self.day,
+            start_time=start, end_time=end, purpose='Event',
+            expected_attendees=10, **kwargs
+        )
+
+    def test_overlap_rejected(self):
+        self.make_booking(time(10), time(12))
+        with self.assertRaises(ValidationError):
+            self.make_booking(time(11), time(13))
+
+    def test_adjacent_and_inactive_allowed(self):
+        self.make_booking(time(10), time(12))
+        self.make_booking(time(12), time(13))
+        self.make_booking(time(8), time(10), status='cancelled')
+        self.make_booking(time(9), time(11), status='rejected')
+        self.assertEqual(Booking.objects.count(), 4)
+
+    def test_conflict_check_is_single_query(self):
+        for hour in range(0, 20):
+            self.make_booking(time(hour), time(hour, 30))
+        booking = Booking(
+            hall=self.hall, user=self.user, booking_date=self.day,
+            start_time=time(20), end_time=time(21), purpose='Event',
+            expected_attendees=10,
+        )
+        with self.assertNumQueries(1):
+            booking.clean()
+
+    def test_interval_set(self):
+        slots = IntervalSet([(time(9), time(10)), (time(12), time(14))])
+        self.assertTrue(slots.overlaps(time(9, 30), time(11)))
+        self.assertFalse(slots.overlaps(time(10), time(12)))
+        self.assertTrue(slots.try_add(time(10), time(12)))
+        self.assertEqual(list(slots), [(time(9), time(14))])
+        self.assertFalse(slots.try_add(time(13), time(15)))
+
+    def test_sweep_conflicts(self):
+        pairs = sweep_conflicts([
+            (time(9), time(11), 'a'),
+            (time(10), time(12), 'b'),
+            (time(11), time(12), 'c'),
+            (time(13), time(14), 'd'),
+        ])
+        self.assertEqual(pairs, {('a', 'b'), ('b', 'c')})
+
+
+class ConcurrentAdmissionTest(TransactionTestCase):
+    def setUp(self):
+        self.hall = Hall.objects.create(
+            name='Test Hall', capacity=100, location='Loc', description='Desc'
+        )
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='x') for i in range(8)
+        ]
+        self.day = datetime.now().date() + timedelta(days=1)
+
+    def test_no_double_booking_under_concurrency(self):
+        # Every thread asks for a different start time inside the same two
+        # hours, so the unique_together guard alone would admit them all.
+        barrier = threading.Barrier(len(self.users))
+        errors = []
+
+        def attempt(i, user):
+            booking = Booking(
+                hall=self.hall, user=user, booking_date=self.day,
+                start_time=time(10, i), end_time=time(12, i),
+                purpose='Rush', expected_attendees=10,
+            )
+            try:
+                barrier.wait()
+                admit_booking(booking)
+            except ValidationError:
+                pass
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=attempt, args=(i, user))
+            for i, user in enumerate(self.users)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Booking.objects.filter(status='pending').count(), 1)
+
+
+class AvailabilityRangeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.hall = Hall.objects.create(
+            name='Test Hall', capacity=100, location='Loc', description='Desc'
+        )
+        self.other = Hall.objects.create(
+            name='Other Hall', capacity=100, location='Loc', description='Desc'
+        )
+        self.day = datetime.now().date() + timedelta(days=1)
+        for start, end, status in [(time(9), time(10, 10), 'approved'),
+                                   (time(14), time(15), 'pending'),
+                                   (time(16), time(17), 'cancelled')]:
+            Booking.objects.create(
+                hall=self.hall, user=self.user, booking_date=self.day,
+                start_time=start, end_time=end, purpose='Event',
+                expected_attendees=10, status=status,
+            )
+
+    def test_slot_mask(self):
+        self.assertEqual(slot_mask(time(0), time(0, 15)), 1)
+        self.assertEqual(slot_mask(time(0, 10), time(0, 20)), 0b11)
+        self.assertEqual(bin(slot_mask(time(9), time(10, 10))).count('1'), 5)
+
+    def test_range_for_one_hall(self):
+        to = self.day + timedelta(days=29)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/availability/', {
+                'hall_id': self.hall.id, 'from': self.day.isoformat(), 'to': to.isoformat(),
+            })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['halls']), 1)
+        days = data['halls'][0]['days']
+        self.assertEqual(len(days), 30)
+        busy = from_hex(days[self.day.isoformat()])
+        self.assertFalse(is_free(busy, time(10), time(11)))
+        self.assertFalse(is_free(busy, time(14, 30), time(14, 45)))
+        self.assertTrue(is_free(busy, time(10, 15), time(14)))
+        self.assertTrue(is_free(busy, time(16), time(17)))
+        self.assertEqual(from_hex(days[to.isoformat()]), 0)
+
+    def test_range_for_all_halls(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/availability/', {'from': self.day.isoformat()})
+        self.assertEqual([h['name'] for h in response.json()['halls']], ['Other Hall', 'Test Hall'])
+
+    def test_invalid_range(self):
+        response = self.client.get('/api/availability/', {'from': '2030-01-10', 'to': '2030-01-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/availability/', {'hall_id': 999999})
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_dates(self):
+        for params in ({'from': 'tomorrow'}, {'from': '2026-02-30'}, {'to': '2030-13-01'}):
+            response = self.client.get('/api/availability/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'Invalid date'})
+
+
+class QueryBudgetTestCase(TestCase):
+    """Base class for query-count regression tests over a large dataset.
+
+    The dataset is seeded once per class with bulk_create; subclasses call
+    assertQueryBudget() so that a view whose query count grows with the
+    number of rows fails instead of silently getting slower.
+    """
+    HALLS = 10
+    USERS = 50
+    BOOKINGS = 10000
+    SLOTS_PER_DAY = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.halls = Hall.objects.bulk_create([
+            Hall(name=f'Budget Hall {i:02d}', capacity=500, location='Campus',
+                 description='Seeded', amenities='WiFi, AC, Projector')
+            for i in range(cls.HALLS)
+        ])
+        cls.users = User.objects.bulk_create([
+            User(username=f'budget{i}', first_name='Budget', last_name=str(i))
+            for i in range(cls.USERS)
+        ])
+        cls.staff = User.objects.create_user(username='budget-staff', password='x', is_staff=True, is_superuser=True)
+        # A quarter of the seeded days lie in the past
+        first_day = datetime.now().date() - timedelta(
+            days=cls.BOOKINGS // (cls.HALLS * cls.SLOTS_PER_DAY) // 4
+        )
+        statuses = ['approved', 'rejected', 'cancelled', 'approved']
+        bookings = []
+        for i in range(cls.BOOKINGS):
+            slot = i // cls.HALLS
+            bookings.append(Booking(
+                hall=cls.halls[i % cls.HALLS],
+                user=cls.users[i % cls.USERS],
+                booking_date=first_day + timedelta(days=slot // cls.SLOTS_PER_DAY),
+                start_time=time(8 + slot % cls.SLOTS_PER_DAY),
+                end_time=time(9 + slot % cls.SLOTS_PER_DAY),
+                purpose=f'Seeded event {i}',
+                expected_attendees=50,
+                status='pending' if i % 20 == 0 else statuses[i % 4],
+            ))
+        Booking.objects.bulk_create(bookings, batch_size=1000)
+        # bulk_create bypasses signals, as a real import would
+        rebuild_daily_stats()
+        repair_occupancy()
+
+    def assertQueryBudget(self, url, budget, user=None, data=None):
+        """GET ``url`` and fail if it issues more than ``budget`` queries."""
+        if user is not None:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(ctx), budget,
+            f'{url} issued {len(ctx)} queries (budget {budget}):\n'
+            + '\n'.join(q['sql'] for q in ctx.captured_queries)
+        )
+        return response
+
+
+class ListingQueryBudgetTest(QueryBudgetTestCase):
+    def test_index(self):
+        self.assertQueryBudget('/', 1)
+
+    def test_hall_detail(self):
+        self.assertQueryBudget(f'/hall/{self.halls[0].id}/', 2)
+
+    def test_my_bookings(self):
+        response = self.assertQueryBudget('/my-bookings/', 4, user=self.users[0])
+        self.assertEqual(response.context['total_count'], self.BOOKINGS // self.USERS)
+
+    def test_pending_bookings(self):
+        self.assertQueryBudget('/pending-bookings/', 3, user=self.staff)
+
+    def test_admin_reports(self):
+        response = self.assertQueryBudget('/admin-reports/', 5, user=self.staff)
+        self.assertEqual(response.context['total_bookings'], self.BOOKINGS)
+
+    def test_admin_changelist(self):
+        self.assertQueryBudget('/admin/bookings/booking/', 8, user=self.staff)
+
+
+class KeysetPaginationTest(QueryBudgetTestCase):
+    BOOKINGS = 1000
+
+    def walk(self, params, user=None):
+        if user is not None:
+            self.client.force_login(user)
+        ids, after = [], None
+        while True:
+            data = self.client.get('/api/bookings/', {**params, **({'after': after} if after else {})}).json()
+            ids.extend(row['id'] for row in data['results'])
+            after = data['next']
+            if not after:
+                return ids
+
+    def test_hall_pages_cover_upcoming_bookings_once(self):
+        hall = self.halls[0]
+        expected = list(Booking.objects.filter(
+            hall=hall, status__in=['pending', 'approved'],
+            booking_date__gte=datetime.now().date(),
+        ).order_by('booking_date', 'start_time', 'id').values_list('id', flat=True))
+        self.assertGreater(len(expected), 25)
+        self.assertEqual(self.walk({'hall_id': hall.id}), expected)
+
+    def test_my_bookings_pages_descend(self):
+        user = self.users[0]
+        expected = list(Booking.objects.filter(user=user).order_by(
+            '-booking_date', '-start_time', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk({'scope': 'mine'}, user=user), expected)
+
+    def test_pending_scope_requires_staff(self):
+        self.client.force_login(self.users[0])
+        self.assertEqual(self.client.get('/api/bookings/', {'scope': 'pending'}).status_code, 403)
+        self.assertEqual(len(self.walk({'scope': 'pending'}, user=self.staff)), self.BOOKINGS // 20)
+
+    def test_html_page_query_count_is_constant(self):
+        first = self.assertQueryBudget('/pending-bookings/', 3, user=self.staff)
+        cursor = first.context['next_cursor']
+        self.assertIsNotNone(cursor)
+        self.assertQueryBudget('/pending-bookings/', 3, data={'after': cursor})
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/bookings/', {'hall_id': self.halls[0].id, 'after': '!!'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(f'/hall/{self.halls[0].id}/', {'after': 'garbage'})
+        self.assertEqual(response.status_code, 302)
+
+
+class BulkModerationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.day = datetime.now().date() + timedelta(days=1)
+        # bulk_create skips clean(), mimicking legacy rows that overlap
+        self.bookings = Booking.objects.bulk_create([
+            Booking(hall=self.hall, user=self.user, booking_date=self.day + timedelta(days=i // 4),
+                    start_time=time(8 + 2 * (i % 4)), end_time=time(10 + 2 * (i % 4)),
+                    purpose='Event', expected_attendees=10)
+            for i in range(40)
+        ])
+        self.overlapping = Booking.objects.create(
+            hall=self.hall, user=self.user, booking_date=self.day,
+            start_time=time(7), end_time=time(7, 30), purpose='Event', expected_attendees=10,
+        )
+        Booking.objects.filter(id=self.overlapping.id).update(start_time=time(9), end_time=time(11))
+
+    def test_bulk_approve_uses_fixed_queries(self):
+        ids = [b.id for b in self.bookings]
+        # Includes the DailyBookingStat upkeep (savepoint, select, update, insert)
+        with self.assertNumQueries(10):
+            result = moderate_bookings(ids, APPROVE, self.staff)
+        # The legacy 09:00-11:00 row overlaps the first two slots of day one
+        self.assertEqual(len(result.updated), 38)
+        self.assertEqual(Booking.objects.filter(status='approved', approved_by=self.staff).count(), 38)
+        self.assertEqual(set(result.failures), {self.bookings[0].id, self.bookings[1].id})
+        self.assertIn('conflicts', result.failures[self.bookings[0].id])
+
+    def test_wrong_state_is_reported(self):
+        Booking.objects.filter(id=self.bookings[0].id).update(status='cancelled')
+        result = moderate_bookings([self.bookings[0].id, self.bookings[1].id], REJECT, self.staff, reason='Full')
+        self.assertEqual(result.updated, [self.bookings[1].id])
+        self.assertEqual(result.failures, {self.bookings[0].id: 'Booking is cancelled'})
+        self.assertEqual(Booking.objects.get(id=self.bookings[1].id).rejection_reason, 'Full')
+
+    def test_bulk_endpoint_and_admin_action(self):
+        self.client.login(username='staff', password='password')
+        response = self.client.post('/bookings/moderate/', {
+            'action': 'approve', 'booking_ids': [self.bookings[4].id, self.bookings[5].id],
+        })
+        self.assertRedirects(response, '/pending-bookings/')
+        self.assertEqual(Booking.objects.filter(status='approved').count(), 2)
+
+        self.staff.is_superuser = True
+        self.staff.save()
+        response = self.client.post('/admin/bookings/booking/', {
+            'action': 'reject_bookings', '_selected_action': [self.bookings[6].id],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Booking.objects.get(id=self.bookings[6].id).status, 'rejected')
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.hall = Hall.objects.create(
+            name='Hall 1', capacity=100, location='Loc', description='Desc', amenities='WiFi, AC'
+        )
+
+    def test_warm_index_and_hall_detail_skip_hall_queries(self):
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/')
+        self.assertContains(response, 'Hall 1')
+        self.assertContains(response, 'WiFi')
+        # The hall's change timestamp (for the ETag) and the bookings page
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/hall/{self.hall.id}/')
+        self.assertEqual(response.context['amenities'], ['WiFi', 'AC'])
+        self.assertEqual(self.client.get('/hall/999999/').status_code, 404)
+
+    def test_hall_changes_invalidate_catalog(self):
+        self.client.get('/')
+        self.client.login(username='admin', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/edit-hall/{self.hall.id}/', {
+                'name': 'Renamed Hall', 'capacity': 100, 'location': 'Loc',
+                'description': 'Desc', 'amenities': 'Stage', 'image': 'x.jpg', 'available': True,
+            })
+        response = self.client.get('/')
+        self.assertContains(response, 'Renamed Hall')
+        self.assertContains(response, 'Stage')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/delete-hall/{self.hall.id}/')
+        response = self.client.get('/')
+        self.assertNotContains(response, 'Renamed Hall')
+        self.assertEqual(response.context['total_halls'], 0)
+
+    def test_catalog_version_moves_after_commit(self):
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hall.name = 'Renamed Hall'
+            self.hall.save()
+            # A miss now would cache the old rows under the new version
+            self.assertEqual(catalog_version(), version)
+        self.assertNotEqual(catalog_version(), version)
+
+
+class ReportingStatsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password')
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.day = datetime.now().date() + timedelta(days=1)
+        self.bookings = [
+            Booking.objects.create(
+                hall=self.hall, user=self.user, booking_date=self.day + timedelta(days=i % 2),
+                start_time=time(8 + i), end_time=time(9 + i), purpose='Event',
+                expected_attendees=10, faculty=['Arts', 'Science'][i % 2],
+            )
+            for i in range(6)
+        ]
+
+    def snapshot(self):
+        return sorted(DailyBookingStat.objects.filter(count__gt=0).values_list(
+            'hall_id', 'date', 'status', 'faculty', 'count'))
+
+    def test_signals_and_bulk_moderation_match_rebuild(self):
+        self.client.login(username='student', password='password')
+        self.client.get(f'/booking/{self.bookings[0].id}/cancel/')
+        moderate_bookings([b.id for b in self.bookings[1:4]], APPROVE, self.staff)
+        moderate_bookings([self.bookings[4].id], REJECT, self.staff)
+        self.bookings[5].delete()
+
+        maintained = self.snapshot()
+        rebuild_daily_stats()
+        self.assertEqual(maintained, self.snapshot())
+        total, status_counts, _ = report_stats()
+        self.assertEqual(total, 5)
+        self.assertEqual(
+            {s['status']: s['count'] for s in status_counts},
+            {'cancelled': 1, 'approved': 3, 'rejected': 1},
+        )
+
+    def test_report_filters(self):
+        self.assertEqual(report_stats(faculty='Arts')[0], 3)
+        self.assertEqual(report_stats(date_from=self.day + timedelta(days=1))[0], 3)
+        self.assertEqual(report_stats(date_to=self.day - timedelta(days=1))[0], 0)
+
+        self.client.login(username='staff', password='password')
+        response = self.client.get('/admin-reports/', {'faculty': 'Science', 'from': self.day.isoformat()})
+        self.assertEqual(response.context['total_bookings'], 3)
+        self.assertEqual(list(response.context['hall_stats']), [{'hall__name': 'Hall 1', 'count': 3}])
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password', first_name='Stu')
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.halls = [
+            Hall.objects.create(name=f'Hall {i}', capacity=100, location='Loc', description='Desc')
+            for i in range(2)
+        ]
+        self.day = datetime.now().date() + timedelta(days=1)
+        Booking.objects.bulk_create([
+            Booking(hall=self.halls[i % 2], user=self.user, booking_date=self.day + timedelta(days=i // 10),
+                    start_time=time(8 + i % 10), end_time=time(9 + i % 10), purpose=f'Event, "{i}"',
+                    expected_attendees=10, faculty=['Arts', 'Science'][i % 2],
+                    status='approved' if i % 3 else 'pending', approved_by=self.staff if i % 3 else None)
+            for i in range(60)
+        ])
+
+    def test_csv_stream(self):
+        self.client.login(username='staff', password='password')
+        response = self.client.get('/export-bookings/', {'hall_id': self.halls[0].id, 'status': 'approved'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        # One query per table: live and archived bookings
+        with self.assertNumQueries(2):
+            body = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 20)
+        self.assertTrue(all(r['hall_name'] == 'Hall 0' and r['approved_by'] == 'staff' for r in rows))
+        self.assertIn('"Event, ""', body)
+
+    def test_export_requires_staff(self):
+        self.client.login(username='student', password='password')
+        self.assertEqual(self.client.get('/export-bookings/').status_code, 302)
+
+    def test_jsonl_command(self):
+        out, err = io.StringIO(), io.StringIO()
+        call_command(
+            'export_bookings', '--format', 'jsonl', '--faculty', 'Arts', '--chunk-size', '7',
+            '--from', (self.day + timedelta(days=1)).isoformat(), stdout=out, stderr=err,
+        )
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows, sorted(rows, key=lambda r: (r['booking_date'], r['start_time'], r['id'])))
+        self.assertIn('Exported 25 booking(s).', err.getvalue())
+
+
+class ImportBookingsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lecturer', password='password')
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.day = datetime.now().date() + timedelta(days=1)
+        Booking.objects.create(
+            hall=self.hall, user=self.user, booking_date=self.day,
+            start_time=time(9), end_time=time(10), purpose='Existing', expected_attendees=10,
+        )
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.tmp):
+            os.remove(os.path.join(self.tmp, name))
+        os.rmdir(self.tmp)
+
+    def write_csv(self, rows, extra_columns=()):
+        path = os.path.join(self.tmp, 'bookings.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['hall_name', 'username', 'booking_date', 'start_time', 'end_time',
+                             'purpose', 'expected_attendees', 'faculty', *extra_columns])
+            writer.writerows(rows)
+        return path
+
+    def test_import_validates_in_batches(self):
+        d = self.day.isoformat()
+        path = self.write_csv(
+            [['Hall 1', 'lecturer', (self.day + timedelta(days=7 * i)).isoformat(), '14:00', '15:00',
+              'Lecture', 40, 'Arts'] for i in range(10)]
+            + [
+                ['Hall 1', 'lecturer', d, '09:30', '10:30', 'Overlaps existing', 10, 'Arts'],
+                ['Hall 1', 'lecturer', d, '11:00', '12:00', 'First wins', 10, 'Arts'],
+                ['Hall 1', 'lecturer', d, '11:30', '12:30', 'Overlaps batch', 10, 'Arts'],
+                ['Hall 1', 'lecturer', d, '13:00', '12:00', 'Backwards', 10, 'Arts'],
+                ['Hall 1', 'lecturer', d, '16:00', '17:00', 'Too big', 500, 'Arts'],
+                ['Hall 9', 'lecturer', d, '16:00', '17:00', 'No hall', 10, 'Arts'],
+                ['Hall 1', 'nobody', d, '16:00', '17:00', 'No user', 10, 'Arts'],
+            ]
+        )
+        out = io.StringIO()
+        call_command('import_bookings', path, '--batch-size', '4', stdout=out)
+        self.assertIn('Imported 11 booking(s).', out.getvalue())
+        self.assertEqual(Booking.objects.count(), 12)
+        self.assertEqual(report_stats()[0], 12)
+
+        with open(path + '.rejects.csv') as f:
+            rejects = {r['purpose']: r['error'] for r in csv.DictReader(f)}
+        self.assertEqual(set(rejects), {
+            'Overlaps existing', 'Overlaps batch', 'Backwards', 'Too big', 'No hall', 'No user',
+        })
+        self.assertIn('capacity', rejects['Too big'])
+
+    def test_attendees_are_required_and_not_negative(self):
+        d = self.day.isoformat()
+        path = self.write_csv([
+            ['Hall 1', 'lecturer', d, '14:00', '15:00', 'Missing', '', 'Arts'],
+            ['Hall 1', 'lecturer', d, '15:00', '16:00', 'Negative', -5, 'Arts'],
+        ])
+        call_command('import_bookings', path, stdout=io.StringIO())
+        with open(path + '.rejects.csv') as f:
+            rejects = {r['purpose']: r['error'] for r in csv.DictReader(f)}
+        self.assertEqual(rejects, {
+            'Missing': 'Expected attendees is required',
+            'Negative': 'Expected attendees cannot be negative',
+        })
+
+    def test_jsonl_values_of_any_type_are_rejected_not_raised(self):
+        d = self.day.isoformat()
+        rows = [
+            {'hall_name': 'Hall 1', 'username': 'lecturer', 'booking_date': d, 'start_time': '14:00',
+             'end_time': '15:00', 'purpose': 'Lecture', 'expected_attendees': 40, 'faculty': 'Arts'},
+            {'hall_name': 1, 'username': 'lecturer', 'booking_date': d, 'start_time': '15:00',
+             'end_time': '16:00', 'purpose': 'Numeric hall', 'expected_attendees': 40},
+            {'hall_name': 'Hall 1', 'username': 'lecturer', 'booking_date': d, 'start_time': '16:00',
+             'end_time': '17:00', 'purpose': 'Numeric faculty', 'expected_attendees': 40, 'faculty': 7},
+            {'hall_name': 'Hall 1', 'username': None, 'booking_date': d, 'start_time': '17:00',
+             'end_time': '18:00', 'purpose': 12, 'expected_attendees': 40},
+        ]
+        path = os.path.join(self.tmp, 'bookings.jsonl')
+        with open(path, 'w') as f:
+            f.writelines(json.dumps(row) + '\n' for row in rows)
+            f.write('5\n[1]\n')
+        out = io.StringIO()
+        call_command('import_bookings', path, stdout=out)
+        self.assertIn('Imported 1 booking(s).', out.getvalue())
+        with open(path + '.rejects.jsonl') as f:
+            rejects = [json.loads(line) for line in f]
+        self.assertEqual([r['error'] for r in rejects], [
+            'Unknown hall', 'Unknown faculty', 'Unknown user', 'Malformed line', 'Malformed line',
+        ])
+        self.assertEqual(rejects[-1]['_raw'], '[1]')
+
+    def test_inactive_rows_may_share_an_active_start_time(self):
+        path = self.write_csv([
+            ['Hall 1', 'lecturer', self.day.isoformat(), '09:00', '10:00', 'Called off', 10, 'Arts', 'cancelled'],
+        ], extra_columns=['status'])
+        out = io.StringIO()
+        call_command('import_bookings', path, stdout=out)
+        self.assertIn('Imported 1 booking(s).', out.getvalue())
+        self.assertTrue(Booking.objects.filter(purpose='Called off', status='cancelled').exists())
+
+    def test_import_locks_its_hall_days(self):
+        later = self.day + timedelta(days=7)
+        path = self.write_csv([
+            ['Hall 1', 'lecturer', later.isoformat(), '14:00', '15:00', 'Lecture', 40, 'Arts'],
+        ])
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('import_bookings', path, stdout=io.StringIO())
+        statements = [q['sql'] for q in ctx.captured_queries]
+        first_lock = next(i for i, sql in enumerate(statements) if 'bookings_halldaylock' in sql)
+        first_read = next(i for i, sql in enumerate(statements) if '"bookings_booking"."start_time"' in sql)
+        # The conflict check reads existing bookings only once the hall-day is held
+        self.assertLess(first_lock, first_read)
+
+    def test_cancelled_slot_can_be_rebooked(self):
+        existing = Booking.objects.get(purpose='Existing')
+        existing.status = 'cancelled'
+        existing.save()
+        path = self.write_csv([
+            ['Hall 1', 'lecturer', self.day.isoformat(), '09:00', '10:00', 'Rebooked', 10, 'Arts'],
+            ['Hall 1', 'lecturer', self.day.isoformat(), '09:00', '09:30', 'Same start', 10, 'Arts'],
+        ])
+        out = io.StringIO()
+        call_command('import_bookings', path, stdout=out)
+        self.assertIn('Imported 1 booking(s).', out.getvalue())
+        self.assertTrue(Booking.objects.filter(purpose='Rebooked', status='pending').exists())
+
+    def test_dry_run_inserts_nothing(self):
+        path = self.write_csv([['Hall 1', 'lecturer', self.day.isoformat(), '14:00', '15:00', 'Lecture', 40, 'Arts']])
+        out = io.StringIO()
+        call_command('import_bookings', path, '--dry-run', stdout=out)
+        self.assertIn('Would import 1 booking(s).', out.getvalue())
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertFalse(os.path.exists(path + '.rejects.csv'))
+
+
+class RecurringBookingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lecturer', password='password')
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.first = datetime.now().date() + timedelta(days=1)
+        self.until = self.first + timedelta(weeks=14)
+
+    def template(self, start=time(10), end=time(11)):
+        return Booking(
+            hall=self.hall, user=self.user, booking_date=self.first, start_time=start,
+            end_time=end, purpose='Weekly lecture', expected_attendees=40, faculty='Arts',
+        )
+
+    def test_weekly_series_in_constant_queries(self):
+        # Same count for 15 or 150 occurrences, occupancy refresh included
+        with self.assertNumQueries(16):
+            series = create_series(self.template(), build_rule('weekly', self.until))
+        self.assertEqual(len(series), 15)
+        self.assertEqual(len({b.recurrence_id for b in series}), 1)
+        self.assertEqual(series[-1].booking_date, self.until)
+        self.assertEqual(report_stats()[0], 15)
+        self.assertEqual(list(series[0].recurrence.occurrences())[:2],
+                         [self.first, self.first + timedelta(weeks=1)])
+
+    def test_conflicts_name_every_date_and_insert_nothing(self):
+        clashes = [self.first + timedelta(weeks=3), self.first + timedelta(weeks=9)]
+        for day in clashes:
+            Booking.objects.create(
+                hall=self.hall, user=self.user, booking_date=day, start_time=time(10, 30),
+                end_time=time(12), purpose='One-off', expected_attendees=10,
+            )
+        with self.assertRaises(SeriesConflict) as ctx:
+            create_series(self.template(), build_rule('weekly', self.until))
+        self.assertEqual(ctx.exception.dates, clashes)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_series_can_reuse_cancelled_slots(self):
+        cancelled = Booking.objects.create(
+            hall=self.hall, user=self.user, booking_date=self.first + timedelta(weeks=2),
+            start_time=time(10), end_time=time(11), purpose='Called off', expected_attendees=10,
+        )
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        series = create_series(self.template(), build_rule('weekly', self.until))
+        self.assertEqual(len(series), 15)
+
+    def test_book_hall_with_repeat(self):
+        self.client.login(username='lecturer', password='password')
+        response = self.client.post(f'/hall/{self.hall.id}/book/', {
+            'booking_date': self.first.isoformat(), 'start_time': '10:00', 'end_time': '11:00',
+            'purpose': 'Weekly lecture', 'expected_attendees': 40, 'faculty': 'Arts',
+            'repeat': 'weekly', 'repeat_until': self.until.isoformat(),
+        })
+        self.assertEqual(Booking.objects.filter(recurrence__isnull=False).count(), 15)
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.context['occurrence_count'], 15)
+        self.assertEqual(len(response.context['occurrences']), 10)
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_SLOW_REQUEST_SECONDS=None, METRICS_TOKEN='s3cret')
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        cache.clear()
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+
+    def test_records_per_view_histograms(self):
+        self.client.get(f'/hall/{self.hall.id}/')
+        self.client.get(f'/hall/{self.hall.id}/')
+        metrics = metrics_registry.get('hall_detail')
+        self.assertEqual(metrics.wall.count, 2)
+        # Cold catalog then warm catalog, each after the change-timestamp lookup
+        self.assertEqual(metrics.queries.sum, 5)
+
+        self.client.login(username='staff', password='password')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE hallbooking_request_duration_seconds histogram', body)
+        self.assertIn('hallbooking_queries_per_request_count{view="hall_detail"} 2', body)
+        self.assertIn('hallbooking_duplicate_queries_total{view="hall_detail"} 0', body)
+
+    def test_metrics_access(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer nope').status_code, 403)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_sampling_off_records_nothing(self):
+        self.client.get('/')
+        self.assertIsNone(metrics_registry.get('index'))
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs('bookings.metrics', 'WARNING') as logs:
+            self.client.get(f'/hall/{self.hall.id}/')
+        self.assertIn('Slow request GET', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_duplicate_detection(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for _ in range(3):
+                list(Hall.objects.filter(id=self.hall.id))
+            list(Booking.objects.all())
+        self.assertEqual(len(recorder.queries), 4)
+        self.assertEqual(recorder.duplicates(), 2)
+
+
+class BenchmarkTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        seed_halls(3)
+        self.users = seed_users(5)
+        self.staff = User.objects.create_user(username='staff', password=None, is_staff=True)
+
+    def test_seed_is_deterministic(self):
+        first = [(b.hall_id, b.booking_date, b.start_time, b.status) for b in seed_bookings(60)]
+        Booking.objects.all().delete()
+        second = [(b.hall_id, b.booking_date, b.start_time, b.status) for b in seed_bookings(60)]
+        self.assertEqual(first, second)
+        self.assertEqual(DailyBookingStat.objects.aggregate(n=Sum('count'))['n'], 60)
+
+    def test_benchmark_needs_bookings(self):
+        with self.assertRaisesMessage(CommandError, '--bookings must be at least 1'):
+            call_command('benchmark', '--bookings', '0', stdout=io.StringIO())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    @override_settings(METRICS_SAMPLE_RATE=1, ALLOWED_HOSTS=['testserver', '127.0.0.1'])
+    def test_drivers_report_every_scenario(self):
+        seed_bookings(60)
+        workload = Workload(self.staff, self.users, seed=1)
+        client = run_client(workload, ['index', 'my_bookings', 'book_hall'], 5)
+        self.assertEqual(client['book_hall']['errors'], 0)
+        self.assertEqual(Booking.objects.count(), 65)
+        self.assertEqual(client['my_bookings']['requests'], 5)
+
+        wsgi = run_wsgi(workload, ['check_availability', 'admin_reports'], 6, concurrency=3)
+        self.assertEqual(wsgi['admin_reports']['errors'], 0)
+        self.assertEqual(wsgi['check_availability']['queries_per_request'], 3)
+        self.assertGreater(wsgi['check_availability']['p99_ms'], 0)
+
+
+class ConnectionAgeTest(TestCase):
+    def conn_max_age(self, module, **env):
+        code = (f'import {module}; from django.conf import settings; '
+                "print(settings.DATABASES['default']['CONN_MAX_AGE'])")
+        environ = {k: v for k, v in os.environ.items() if k != 'DB_CONN_MAX_AGE'}
+        done = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                              cwd=settings.BASE_DIR, env={**environ, **env})
+        return int(done.stdout.split()[-1])
+
+    def test_asgi_closes_connections_after_each_request(self):
+        self.assertEqual(self.conn_max_age('hallbooking.wsgi'), 600)
+        self.assertEqual(self.conn_max_age('hallbooking.asgi'), 0)
+        self.assertEqual(self.conn_max_age('hallbooking.asgi', DB_CONN_MAX_AGE='60'), 60)
+
+
+class AsyncViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics_registry.reset()
+        self.user = User.objects.create_user(username='user', password='password')
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.day = datetime.now().date() + timedelta(days=3)
+        Booking.objects.create(
+            hall=self.hall, user=self.user, booking_date=self.day,
+            start_time=time(10, 0), end_time=time(11, 0),
+            purpose='Booked', expected_attendees=10, status='approved',
+        )
+
+    @override_settings(DEBUG=True)
+    def test_asgi_stack_is_not_adapted_to_sync(self):
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    async def test_check_availability(self):
+        url = f'/api/check-availability/?hall_id={self.hall.id}&date='
+        response = await self.async_client.get(url + self.day.isoformat())
+        self.assertEqual(response.json(), {'available': False})
+        response = await self.async_client.get(url + (self.day + timedelta(days=1)).isoformat())
+        self.assertEqual(response.json(), {'available': True})
+        response = await self.async_client.post(url + self.day.isoformat())
+        self.assertEqual(response.status_code, 405)
+        # The metrics hook follows async ORM calls into the sync thread; each
+        # GET also looks up the hall's change timestamp for its ETag
+        self.assertEqual(metrics_registry.get('check_availability').queries.sum, 6)
+
+    async def test_check_availability_rejects_bad_input(self):
+        for query, error in ((f'hall_id={self.hall.id}&date=bad', 'Invalid date'),
+                             (f'hall_id={self.hall.id}&date=2026-02-30', 'Invalid date'),
+                             (f'hall_id=abc&date={self.day}', 'Invalid hall_id')):
+            response = await self.async_client.get(f'/api/check-availability/?{query}')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': error})
+
+    async def test_availability_range(self):
+        response = await self.async_client.get(
+            f'/api/availability/?hall_id={self.hall.id}&from={self.day}&to={self.day}'
+        )
+        bitmap = from_hex(response.json()['halls'][0]['days'][self.day.isoformat()])
+        self.assertFalse(is_free(bitmap, time(10, 30), time(12, 0)))
+        self.assertTrue(is_free(bitmap, time(11, 0), time(12, 0)))
+
+    async def test_hall_detail(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(f'/hall/{self.hall.id}/')
+        self.assertContains(response, 'Book This Hall')
+        self.assertContains(response, 'Booked')
+        response = await self.async_client.get('/hall/999/')
+        self.assertEqual(response.status_code, 404)
+
+
+class HallEventsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        events.reset_backend()
+        self.user = User.objects.create_user(username='user', password='password')
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.channel = events.hall_channel(self.hall.id)
+        self.day = datetime.now().date() + timedelta(days=3)
+
+    def tearDown(self):
+        events.reset_backend()
+
+    def test_replay_reports_gaps(self):
+        backend = events.InProcessBackend(replay=2)
+        first, second, third = [backend.publish(self.channel, 'availability', {'n': n}) for n in range(3)]
+        self.assertEqual(backend.replay(self.channel, second.id), ([third], True))
+        # The first event was evicted, but everything after it is still held
+        self.assertEqual(backend.replay(self.channel, first.id)[1], True)
+        self.assertEqual(backend.replay(self.channel, first.id - 1)[1], False)
+        self.assertEqual(backend.replay('hall:other', first.id), ([], True))
+
+    def test_booking_changes_publish_day_bitmaps(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                hall=self.hall, user=self.user, booking_date=self.day,
+                start_time=time(10, 0), end_time=time(11, 0),
+                purpose='Booked', expected_attendees=10,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            moderate_bookings([booking.id], REJECT, self.staff)
+        history, _ = events.get_backend().replay(self.channel, 0)
+        self.assertEqual([e.data['date'] for e in history], [self.day.isoformat()] * 2)
+        self.assertEqual(from_hex(history[0].data['busy']), slot_mask(time(10, 0), time(11, 0)))
+        self.assertEqual(from_hex(history[1].data['busy']), 0)
+
+    @override_settings(BOOKING_EVENTS_STREAM_SECONDS=0.2, BOOKING_EVENTS_HEARTBEAT_SECONDS=0.05)
+    async def test_stream_resumes_after_last_event_id(self):
+        backend = events.get_backend()
+        first = backend.publish(self.channel, 'availability', {'date': 'first'})
+        second = backend.publish(self.channel, 'availability', {'date': 'second'})
+        response = await self.async_client.get(
+            f'/api/halls/{self.hall.id}/events/', headers={'Last-Event-ID': str(first.id)}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertNotIn('first', body)
+        self.assertIn(f'id: {second.id}\nevent: availability\n', body)
+        self.assertIn(': keepalive', body)
+
+        response = await self.async_client.get(f'/api/halls/{self.hall.id}/events/?last_event_id=1')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertIn('event: reset', body)
+        self.assertNotIn('second', body)
+
+    async def test_stream_delivers_events_from_other_threads(self):
+        stream = events.stream(self.channel)
+        self.assertTrue((await stream.__anext__()).startswith('retry:'))
+        publish = sync_to_async(events.get_backend().publish, thread_sensitive=False)
+        event = await publish(self.channel, 'availability', {'date': 'live'})
+        self.assertEqual(await stream.__anext__(), event.encode())
+        await stream.aclose()
+        self.assertFalse(events.get_backend()._subscribers[self.channel])
+
+
+class HallEventsWsgiTest(TransactionTestCase):
+    """The event stream under the WSGI handler, which cannot stream it"""
+
+    def setUp(self):
+        cache.clear()
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+
+    def wsgi_get(self, path):
+        environ = {'PATH_INFO': path, 'HTTP_HOST': 'testserver', 'wsgi.input': io.BytesIO()}
+        setup_testing_defaults(environ)
+        status = []
+        response = WSGIHandler()(environ, lambda s, headers, exc_info=None: status.append(s))
+        try:
+            return status[0], b''.join(response).decode()
+        finally:
+            response.close()
+
+    @override_settings(BOOKING_EVENTS_STREAM_SECONDS=30)
+    def test_stream_is_refused_at_once(self):
+        start = timezone.now()
+        status, body = self.wsgi_get(f'/api/halls/{self.hall.id}/events/')
+        self.assertEqual((status, body), ('204 No Content', ''))
+        self.assertLess((timezone.now() - start).total_seconds(), 5)
+
+    def test_pages_do_not_open_a_stream(self):
+        status, body = self.wsgi_get(f'/hall/{self.hall.id}/')
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('watchHallAvailability(', body)
+
+    async def test_asgi_pages_open_a_stream(self):
+        response = await self.async_client.get(f'/hall/{self.hall.id}/')
+        self.assertContains(response, 'watchHallAvailability(')
+
+
+class SessionAuthProfileTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user', password='password')
+
+    def test_logged_in_requests_skip_session_and_user_queries(self):
+        self.client.login(username='user', password='password')
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            self.client.get('/')
+        # Only the view's own aggregate and page queries remain
+        with self.assertNumQueries(2):
+            self.client.get('/my-bookings/')
+
+    def test_user_changes_apply_on_next_request(self):
+        self.client.login(username='user', password='password')
+        self.assertEqual(self.client.get('/my-bookings/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertRedirects(self.client.get('/my-bookings/'), '/login/?next=/my-bookings/')
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        self.client.login(username='user', password='password')
+        self.client.get('/my-bookings/')
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/my-bookings/').status_code, 200)
+
+    def test_failed_login_checks_the_password_once(self):
+        # One user lookup per configured backend
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(username='user', password='wrong'))
+
+    def test_old_hashes_are_upgraded_on_login(self):
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+        self.user.password = make_password('password', hasher='pbkdf2_sha256')
+        self.user.save()
+        self.assertTrue(self.client.login(username='user', password='password'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+
+class SlotSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user', password='password')
+        self.small = Hall.objects.create(name='Small', capacity=100, location='A', description='D')
+        self.large = Hall.objects.create(name='Large', capacity=300, location='B', description='D')
+        Hall.objects.create(name='Closed', capacity=500, location='C', description='D', available=False)
+        self.day = datetime.now().date() + timedelta(days=5)
+        self.book(self.small, time(9, 0), time(10, 10))
+        self.book(self.small, time(11, 0), time(12, 0), status='rejected')
+        self.halls = list(Hall.objects.all())
+
+    def book(self, hall, start, end, status='approved', day=None):
+        return Booking.objects.create(
+            hall=hall, user=self.user, booking_date=day or self.day, start_time=start, end_time=end,
+            purpose='Event', expected_attendees=10, status=status,
+        )
+
+    def search(self, **params):
+        params = {'from': self.day.isoformat(), 'window_start': '08:00', 'window_end': '12:00', **params}
+        return find_free_slots(parse_slot_query(params), self.halls)
+
+    def test_interval_set_gaps(self):
+        busy = IntervalSet([(9, 10), (12, 13), (13, 14)])
+        self.assertEqual(list(busy.gaps(8, 15)), [(8, 9), (10, 12), (14, 15)])
+        self.assertEqual(list(busy.gaps(9, 10)), [])
+        self.assertEqual(list(busy.gaps(10, 11)), [(10, 11)])
+
+    def test_ranks_by_date_then_capacity_fit(self):
+        with self.assertNumQueries(1):
+            results = self.search(attendees='80', duration='60')
+        self.assertEqual(
+            [(c.hall.name, c.start, c.free_until) for c in results],
+            [
+                ('Small', time(8, 0), time(9, 0)),
+                # Gap starts are rounded up to the 15-minute grid
+                ('Small', time(10, 15), time(12, 0)),
+                ('Large', time(8, 0), time(12, 0)),
+            ],
+        )
+
+    def test_filters_capacity_duration_and_range(self):
+        self.assertEqual({c.hall.name for c in self.search(attendees='150')}, {'Large'})
+        self.assertEqual([c.start for c in self.search(duration='120') if c.hall == self.small], [])
+        self.book(self.large, time(8, 0), time(12, 0))
+        tomorrow = self.day + timedelta(days=1)
+        results = self.search(to=tomorrow.isoformat(), attendees='150', duration='240')
+        self.assertEqual([(c.hall.name, c.date) for c in results], [('Large', tomorrow)])
+        with self.assertRaises(ValueError):
+            parse_slot_query({'from': self.day.isoformat(), 'window_start': '12:00', 'window_end': '08:00'})
+
+    def test_api_and_page(self):
+        response = self.client.get('/api/free-slots/', {'from': self.day.isoformat(), 'attendees': 250})
+        self.assertEqual(response.json()['results'][0]['hall_name'], 'Large')
+        self.assertEqual(self.client.get('/api/free-slots/', {'duration': 'x'}).status_code, 400)
+
+        response = self.client.get('/find-slot/', {'from': self.day.isoformat(), 'attendees': 250})
+        self.assertContains(response, f'/hall/{self.large.id}/book/?booking_date={self.day.isoformat()}')
+        self.assertContains(self.client.get('/find-slot/', {'from': '2000-01-01'}), 'cannot start in the past')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(TransactionTestCase):
+    """The test database is the primary; a second SQLite file is a replica that lags.
+
+    A TransactionTestCase: inside TestCase's transaction every read would
+    stay on the primary.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = {
+            **connections.settings['default'], 'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3'),
+        }
+        with override_settings(DATABASE_REPLICAS=[]):
+            call_command('migrate', database='replica', verbosity=0)
+        # Replicated up to here
+        User.objects.using('replica').create(id=1, username='user')
+        Hall.objects.using('replica').create(id=1, name='Hall 1', capacity=100, location='Loc', description='Desc')
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(id=1, username='user', password='password')
+        self.hall = Hall.objects.create(id=1, name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.day = datetime.now().date() + timedelta(days=3)
+        Booking.objects.create(
+            hall=self.hall, user=self.user, booking_date=self.day,
+            start_time=time(10, 0), end_time=time(11, 0),
+            purpose='Not replicated yet', expected_attendees=10, status='approved',
+        )
+
+    def availability(self, client, day):
+        response = client.get(f'/api/check-availability/?hall_id={self.hall.id}&date={day.isoformat()}')
+        return response.json()['available']
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Hall))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Booking), 'replica')
+            self.assertIsNone(router.db_for_read(User))
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(Booking))
+        self.assertIsNone(router.db_for_read(Booking))
+        self.assertFalse(router.allow_migrate('replica', 'bookings'))
+
+    def test_only_real_writes_leave_the_replica(self):
+        router = ReplicaRouter()
+        with replica_reads():
+            # An alias lookup is not a write
+            self.assertEqual(router.db_for_write(Booking), 'default')
+            User.objects.filter(id=1).update(first_name='Sam')
+            self.assertEqual(router.db_for_read(Booking), 'replica')
+            Booking.objects.filter(id=0).update(purpose='Moved')
+            self.assertIsNone(router.db_for_read(Booking))
+        self.assertIsNone(router.allow_migrate('default', 'bookings'))
+
+    def test_read_only_views_use_the_replica(self):
+        self.assertTrue(self.availability(self.client, self.day))
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertFalse(self.availability(self.client, self.day))
+
+    def test_catalog_miss_does_not_pin(self):
+        for url in ('/', f'/hall/{self.hall.id}/'):
+            cache.clear()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_own_booking_pins_reads_to_primary(self):
+        self.client.force_login(self.user)
+        day = self.day + timedelta(days=1)
+        response = self.client.post(f'/hall/{self.hall.id}/book/', {
+            'booking_date': day.isoformat(), 'start_time': '09:00', 'end_time': '10:00',
+            'purpose': 'Meeting', 'expected_attendees': 10, 'faculty': 'Science',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # The writer reads its own booking, everyone else the replica until it catches up
+        self.assertFalse(self.availability(self.client, day))
+        self.assertTrue(self.availability(Client(), day))
+
+
+class WaitlistTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='password')
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.day = datetime.now().date() + timedelta(days=2)
+        self.booking = Booking.objects.create(
+            hall=self.hall, user=self.owner, booking_date=self.day,
+            start_time=time(9, 0), end_time=time(12, 0),
+            purpose='Taken', expected_attendees=10, status='approved',
+        )
+
+    def queue(self, username, start, end, faculty='Science'):
+        return join_waitlist(Booking(
+            hall=self.hall, user=User.objects.create_user(username=username), booking_date=self.day,
+            start_time=start, end_time=end, purpose='Waiting', expected_attendees=10, faculty=faculty,
+        ))
+
+    def test_conflicting_request_can_join_waitlist(self):
+        user = User.objects.create_user(username='user', password='password')
+        self.client.force_login(user)
+        data = {
+            'booking_date': self.day.isoformat(), 'start_time': '10:00', 'end_time': '11:00',
+            'purpose': 'Meeting', 'expected_attendees': 10, 'faculty': 'Arts',
+        }
+        self.client.post(f'/hall/{self.hall.id}/book/', data)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+        response = self.client.post(f'/hall/{self.hall.id}/book/', {**data, 'waitlist': '1'})
+        self.assertRedirects(response, '/my-waitlist/')
+        entry = WaitlistEntry.objects.get()
+        self.assertEqual((entry.user, entry.status, entry.start_time), (user, 'waiting', time(10, 0)))
+        self.assertContains(self.client.get('/my-waitlist/'), 'Leave Waitlist')
+
+        self.client.post(f'/waitlist/{entry.id}/leave/')
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'withdrawn')
+
+    @override_settings(WAITLIST_FACULTY_PRIORITY=['Science'])
+    def test_cancellation_promotes_by_faculty_then_request_time(self):
+        first = self.queue('arts', time(10, 0), time(11, 0), faculty='Arts')
+        second = self.queue('science', time(10, 0), time(11, 0), faculty='Science')
+        self.assertEqual((queue_position(second), queue_position(first)), (1, 2))
+
+        self.client.force_login(self.owner)
+        self.client.get(f'/booking/{self.booking.id}/cancel/')
+
+        second.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual(second.status, 'promoted')
+        self.assertEqual(
+            (second.booking.user, second.booking.status, second.booking.start_time),
+            (second.user, 'pending', time(10, 0)),
+        )
+        self.assertEqual(first.status, 'waiting')
+        self.assertEqual(queue_position(first), 1)
+
+    def test_promotion_notifies_the_new_owner(self):
+        entry = self.queue('waiting', time(10, 0), time(11, 0))
+        entry.user.email = 'waiting@example.com'
+        entry.user.save()
+        moderate_bookings([self.booking.id], REJECT, self.staff)
+        message = OutboxMessage.objects.get(recipient='waiting@example.com')
+        entry.refresh_from_db()
+        self.assertEqual(
+            (message.payload['event'], message.payload['booking_id']), ('booking.promoted', entry.booking_id)
+        )
+
+    def test_cannot_wait_twice_for_one_slot(self):
+        entry = self.queue('twice', time(10, 0), time(11, 0))
+        again = Booking(
+            hall=self.hall, user=entry.user, booking_date=self.day, start_time=time(10, 0),
+            end_time=time(11, 30), purpose='Waiting', expected_attendees=10,
+        )
+        with self.assertRaisesMessage(ValidationError, 'already on the waitlist'):
+            join_waitlist(again)
+        entry.status = 'withdrawn'
+        entry.save()
+        self.assertEqual(join_waitlist(again).status, 'waiting')
+
+    def test_rejection_promotes_every_entry_that_fits(self):
+        entries = [
+            self.queue('a', time(9, 0), time(10, 0)),
+            self.queue('b', time(9, 30), time(10, 30)),
+            self.queue('c', time(10, 0), time(12, 0)),
+        ]
+        moderate_bookings([self.booking.id], REJECT, self.staff)
+        for entry in entries:
+            entry.refresh_from_db()
+        self.assertEqual([e.status for e in entries], ['promoted', 'waiting', 'promoted'])
+        # The rejected booking no longer holds its start time
+        self.assertEqual(entries[0].booking.start_time, self.booking.start_time)
+        self.assertEqual(DailyBookingStat.objects.get(status='pending').count, 2)
+
+
+class OccupancyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='password')
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.day = datetime.now().date() + timedelta(days=2)
+
+    def book(self, start, end, day=None, status='pending'):
+        return Booking.objects.create(
+            hall=self.hall, user=self.user, booking_date=day or self.day, start_time=start, end_time=end,
+            purpose='Event', expected_attendees=10, status=status,
+        )
+
+    def occupancy(self, day=None):
+        row = HallDayOccupancy.objects.filter(hall=self.hall, date=day or self.day).first()
+        return row and (row.booked_minutes, from_hex(row.busy))
+
+    def test_kept_in_step_with_bookings(self):
+        first = self.book(time(9, 0), time(10, 10))
+        second = self.book(time(11, 0), time(12, 0), status='approved')
+        self.assertEqual(self.occupancy(), (130, slot_mask(time(9), time(10, 10)) | slot_mask(time(11), time(12))))
+
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(self.occupancy(), (60, slot_mask(time(11), time(12))))
+
+        moved_to = self.day + timedelta(days=1)
+        second.booking_date = moved_to
+        second.save()
+        self.assertIsNone(self.occupancy())
+        self.assertEqual(self.occupancy(moved_to)[0], 60)
+
+        moderate_bookings([second.id], REJECT, self.staff)
+        self.assertIsNone(self.occupancy(moved_to))
+
+        create_series(Booking(
+            hall=self.hall, user=self.user, booking_date=self.day, start_time=time(14), end_time=time(15),
+            purpose='Weekly', expected_attendees=10,
+        ), build_rule('weekly', self.day + timedelta(weeks=3)))
+        self.assertEqual(HallDayOccupancy.objects.count(), 4)
+        self.assertEqual(repair_occupancy(dry_run=True), (0, 0, 0))
+
+    def test_availability_is_one_key_lookup(self):
+        self.book(time(9, 0), time(10, 0))
+        with self.assertNumQueries(1):
+            self.assertFalse(self.hall.is_available_on_date(self.day))
+        with self.assertNumQueries(1):
+            self.assertTrue(self.hall.is_available_on_date(self.day + timedelta(days=1)))
+
+    def test_repair_command(self):
+        self.book(time(9, 0), time(10, 0))
+        other = self.book(time(9, 0), time(10, 0), day=self.day + timedelta(days=1))
+        HallDayOccupancy.objects.filter(date=self.day).update(booked_minutes=5)
+        HallDayOccupancy.objects.filter(date=other.booking_date).delete()
+        HallDayOccupancy.objects.create(hall=self.hall, date=self.day - timedelta(days=1), busy='0' * 24)
+
+        with self.assertRaisesMessage(CommandError, '1 missing, 1 wrong and 1 stale'):
+            call_command('repair_occupancy', '--check', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('repair_occupancy', stdout=out)
+        self.assertIn('Repaired 1 missing, 1 wrong and 1 stale', out.getvalue())
+        call_command('repair_occupancy', '--check', stdout=io.StringIO())
+        self.assertEqual(self.occupancy(), (60, slot_mask(time(9), time(10))))
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='password')
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.today = datetime.now().date()
+        self.old = [
+            self.book(self.today - timedelta(days=30 - i), status)
+            for i, status in enumerate(['approved', 'cancelled', 'pending', 'rejected', 'approved'])
+        ]
+        self.current = self.book(self.today + timedelta(days=1), 'approved')
+
+    def book(self, day, status):
+        booking = Booking(
+            hall=self.hall, user=self.user, booking_date=day, start_time=time(9), end_time=time(10),
+            purpose='Event', expected_attendees=10, status=status,
+        )
+        booking.save(validate=False)
+        return booking
+
+    def test_moves_past_bookings_in_batches(self):
+        stats_before = report_stats()[0]
+        WaitlistEntry.objects.create(
+            hall=self.hall, user=self.user, booking_date=self.old[0].booking_date, start_time=time(9),
+            end_time=time(10), purpose='Event', expected_attendees=10, status='promoted', booking=self.old[0],
+        )
+        out = io.StringIO()
+        call_command('archive_bookings', '--before', self.today.isoformat(), '--batch-size', '2', stdout=out)
+        self.assertIn('Archived 4 booking(s).', out.getvalue())
+
+        # The pending one waits for moderation
+        pending = self.old[2]
+        self.assertEqual(list(Booking.objects.order_by('id')), [pending, self.current])
+        self.assertEqual(
+            sorted(ArchivedBooking.objects.values_list('id', 'status')),
+            sorted((b.id, b.status) for b in self.old if b != pending),
+        )
+        self.assertIsNone(WaitlistEntry.objects.get().booking)
+        self.assertEqual(repair_occupancy(dry_run=True), (0, 0, 0))
+
+        # Reports still count archived bookings, also after a rebuild
+        self.assertEqual(report_stats()[0], stats_before)
+        rebuild_daily_stats()
+        self.assertEqual(report_stats()[0], 6)
+
+        out = io.StringIO()
+        call_command('export_bookings', '--format', 'jsonl', '--chunk-size', '2', stdout=out, stderr=io.StringIO())
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r['id'] for r in rows], [b.id for b in self.old] + [self.current.id])
+
+    def test_cutoff_and_dry_run(self):
+        tomorrow = (self.today + timedelta(days=1)).isoformat()
+        with self.assertRaisesMessage(CommandError, 'cannot be in the future'):
+            call_command('archive_bookings', '--before', tomorrow, stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('archive_bookings', '--before', self.old[2].booking_date.isoformat(), '--dry-run', stdout=out)
+        # Both closed ones before the cutoff, and the rejected one after it
+        self.assertIn('Would archive 3 booking(s).', out.getvalue())
+        self.assertEqual(Booking.objects.count(), 6)
+        self.assertFalse(ArchivedBooking.objects.exists())
+
+    def test_closed_future_bookings_are_archived(self):
+        cancelled = self.book(self.today + timedelta(days=5), 'cancelled')
+        rejected = self.book(self.today + timedelta(days=6), 'rejected')
+        call_command('archive_bookings', '--before', self.old[0].booking_date.isoformat(), stdout=io.StringIO())
+        self.assertEqual(
+            sorted(ArchivedBooking.objects.values_list('id', flat=True)),
+            sorted([self.old[1].id, self.old[3].id, cancelled.id, rejected.id]),
+        )
+        self.assertTrue(Booking.objects.filter(id=self.current.id).exists())
+
+
+class FailingBackend:
+    def send(self, channel, recipient, payloads):
+        raise ConnectionError('SMTP is down')
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='password', email='user@example.com')
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        day = datetime.now().date() + timedelta(days=1)
+        self.bookings = [
+            Booking.objects.create(
+                hall=self.hall, user=self.user, booking_date=day, start_time=time(8 + 2 * i),
+                end_time=time(9 + 2 * i), purpose='Event', expected_attendees=10,
+            )
+            for i in range(3)
+        ]
+
+    def payloads(self):
+        return [(m.channel, m.recipient, m.payload['booking_id'], m.payload['status'])
+                for m in OutboxMessage.objects.order_by('id')]
+
+    def test_status_changes_are_queued_with_the_change(self):
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.client.login(username='staff', password='password')
+        self.client.post(f'/booking/{self.bookings[0].id}/approve/')
+        self.client.login(username='user', password='password')
+        self.client.get(f'/booking/{self.bookings[1].id}/cancel/')
+        with self.settings(NOTIFICATION_WEBHOOK_URLS=['https://hooks.example.com/bookings']):
+            moderate_bookings([self.bookings[2].id], REJECT, self.staff, reason='Exams')
+        self.assertEqual(self.payloads(), [
+            ('email', 'user@example.com', self.bookings[0].id, 'approved'),
+            ('email', 'user@example.com', self.bookings[1].id, 'cancelled'),
+            ('email', 'user@example.com', self.bookings[2].id, 'rejected'),
+            ('webhook', 'https://hooks.example.com/bookings', self.bookings[2].id, 'rejected'),
+        ])
+        self.assertEqual(OutboxMessage.objects.last().payload['reason'], 'Exams')
+
+        # A rolled-back change notifies nobody
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            moderate_bookings([self.bookings[0].id], REJECT, self.staff)
+            raise RuntimeError
+        self.assertEqual(OutboxMessage.objects.count(), 4)
+
+    def test_worker_sends_digests(self):
+        moderate_bookings([b.id for b in self.bookings], APPROVE, self.staff)
+        out = io.StringIO()
+        call_command('run_outbox_worker', '--once', '--batch-size', '2', stdout=out)
+        self.assertIn('Sent 3, retrying 0, failed 0', out.getvalue())
+        # Batches of two: one digest of two approvals, then a single one
+        self.assertEqual([m.subject for m in mail.outbox], ['2 booking updates', f'Booking #{self.bookings[2].id} approved'])
+        self.assertIn('Hall 1', mail.outbox[0].body)
+        self.assertFalse(OutboxMessage.objects.exclude(status='sent').exists())
+
+    @override_settings(NOTIFICATION_BACKEND='bookings.tests.FailingBackend', NOTIFICATION_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        moderate_bookings([self.bookings[0].id], APPROVE, self.staff)
+        self.assertEqual(process_batch(), (0, 1, 0))
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('SMTP is down', message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+
+        self.assertEqual(process_batch(), (0, 0, 0))
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(process_batch(), (0, 0, 1))
+        self.assertEqual(OutboxMessage.objects.get().status, 'failed')
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'outbox.jsonl')
+            with self.settings(NOTIFICATION_BACKEND='bookings.outbox.FileBackend', NOTIFICATION_FILE_PATH=path,
+                               NOTIFICATION_WEBHOOK_URLS=['https://hooks.example.com/bookings']):
+                moderate_bookings([b.id for b in self.bookings[:2]], APPROVE, self.staff)
+                self.assertEqual(process_batch(), (4, 0, 0))
+            with open(path) as f:
+                digests = sorted((d['channel'], len(d['events'])) for d in map(json.loads, f))
+        self.assertEqual(digests, [('email', 2), ('webhook', 2)])
+        self.assertEqual(mail.outbox, [])
+
+
+class HttpCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user', password='password')
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.hall = Hall.objects.create(name='Hall 1', capacity=100, location='Loc', description='Desc')
+        self.day = datetime.now().date() + timedelta(days=2)
+
+    def book(self):
+        return Booking.objects.create(
+            hall=self.hall, user=self.user, booking_date=self.day, start_time=time(9), end_time=time(10),
+            purpose='Event', expected_attendees=10,
+        )
+
+    def test_hall_detail_revalidates_with_one_lookup(self):
+        url = f'/hall/{self.hall.id}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self.book()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            moderate_bookings([booking.id], APPROVE, self.staff)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # The version is in the database, not in this process's cache
+        etag = self.client.get(url)['ETag']
+        cache.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_booking_writes_leave_the_hall_row_alone(self):
+        changed_at = Hall.objects.get(id=self.hall.id).changed_at
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            self.book()
+        self.assertFalse([q for q in ctx.captured_queries if 'UPDATE "bookings_hall"' in q['sql']])
+        self.assertEqual(Hall.objects.get(id=self.hall.id).changed_at, changed_at)
+
+    def test_signed_in_pages_are_private_and_per_user(self):
+        anonymous = self.client.get('/')['ETag']
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=anonymous).status_code, 304)
+        self.client.login(username='user', password='password')
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        # A pending flash message is always rendered
+        self.client.get(f'/booking/{self.book().id}/cancel/')
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Booking cancelled successfully!')
+        self.assertFalse(response.has_header('ETag'))
+
+        self.client.logout()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hall.name = 'Renamed Hall'
+            self.hall.save()
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=anonymous).status_code, 200)
+
+    def test_availability_api(self):
+        url = f'/api/check-availability/?hall_id={self.hall.id}&date={self.day}'
+        response = self.client.get(url)
+        self.assertEqual(response.json(), {'available': True})
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json(), {'available': False})
+
+    def test_json_is_compressed(self):
+        url = f'/api/availability/?hall_id={self.hall.id}'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content))['halls'][0]['id'], self.hall.id)
+        self.assertFalse(self.client.get(url).has_header('Content-Encoding'))
+        # Pages are never compressed
+        self.assertFalse(self.client.get('/', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+
+
+class HallBookingsVersionTest(TransactionTestCase):
+    def test_deleted_hall_does_not_lose_the_other_versions(self):
+        hall, other = [
+            Hall.objects.create(name=f'Hall {i}', capacity=100, location='Loc', description='Desc')
+            for i in (1, 2)
+        ]
+        with transaction.atomic():
+            touch_halls([hall.id, other.id])
+            # Deleted by someone else before the callback runs
+            Hall.objects.filter(id=other.id).delete()
+        self.assertEqual(list(HallBookingsVersion.objects.values_list('hall_id', flat=True)), [hall.id])
+
+
+class TemplatePrecompileTest(TestCase):
+    def test_templates_are_cached_and_compile(self):
+        loaders = settings.TEMPLATES[0]['OPTIONS']['loaders']
+        self.assertEqual(loaders[0][0], 'django.template.loaders.cached.Loader')
+        self.assertIn('bookings/index.html', template_names())
+        self.assertEqual(compile_errors(), {})
+        self.assertEqual(check_templates(None), [])
+
+    def test_broken_template_is_reported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'broken.html'), 'w') as f:
+                f.write("{% extends 'base.html' %}{% block content %}{% if %}{% endblock %}")
+            with open(os.path.join(directory, 'orphan.html'), 'w') as f:
+                f.write("{% extends 'missing_base.html' %}")
+            templates = [{**settings.TEMPLATES[0], 'DIRS': [directory, *settings.TEMPLATES[0]['DIRS']]}]
+            with override_settings(TEMPLATES=templates):
+                errors = compile_errors(['broken.html', 'orphan.html'])
+        self.assertEqual(sorted(errors), ['broken.html', 'missing_base.html'])
+        self.assertIn('TemplateSyntaxError', errors['broken.html'])
+
+    def test_render_benchmark(self):
+        with self.assertNumQueries(0):
+            results = run_templates(rounds=2, size=5)
+        self.assertEqual(list(results), list(TEMPLATE_SCENARIOS))
+        for row in results.values():
+            self.assertEqual(row['rounds'], 2)
+            self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+
+
+# Import time of django.setup() plus the first request, under -X importtime.
+# Around 250 ms on a laptop; the margin is for slow CI machines.
+STARTUP_IMPORT_BUDGET_MS = 1500
+
+
+class StartupProfileTest(TestCase):
+    def test_cold_start_imports(self):
+        with tempfile.TemporaryDirectory() as directory:
+            report = profile_startup('/login/', importtime=True, env={
+                'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'startup.sqlite3')}",
+            })
+        self.assertEqual((report['status'], report['second_status']), (200, 200))
+        self.assertIn('bookings.views', report['modules'])
+        # Staff code and admin autodiscovery stay out of a public page's cold start
+        for module in ('bookings.staff_views', 'bookings.export', 'bookings.forms', 'django.contrib.auth.admin'):
+            self.assertNotIn(module, report['modules'])
+        summary = summarize_imports(report['imports'])
+        self.assertGreater(summary['setup']['modules'], 0)
+        self.assertLess(summary['setup']['import_ms'] + summary['first_request']['import_ms'],
+                        STARTUP_IMPORT_BUDGET_MS)
+
+    def test_parse_importtime(self):
+        entries = parse_importtime(
+            'import time: self [us] | cumulative | imported package\n'
+            'startup-profile-phase:setup\n'
+            'import time:       120 |        120 |     bookings.conflicts\n'
+            'import time:       300 |        420 |   bookings.models\n'
+            'startup-profile-phase:first_request\n'
+            'import time:        50 |         50 | bookings.views\n'
+        )
+        self.assertEqual(
+            [(e['module'], e['depth'], e['phase']) for e in entries],
+            [('bookings.conflicts', 2, 'setup'), ('bookings.models', 1, 'setup'), ('bookings.views', 0, 'first_request')],
+        )
+        summary = summarize_imports(entries)
+        self.assertEqual(summary['setup']['import_ms'], 0.4)
+        self.assertEqual(summary['first_request']['packages'], [{'package': 'bookings.views', 'self_ms': 0.1}])
+
+    def test_staff_views_are_lazy(self):
+        match = resolve('/admin-dashboard/')
+        self.assertIsInstance(match.func, LazyView)
+        self.assertEqual(match._func_path, 'bookings.staff_views.admin_dashboard')
+        with self.assertRaises(ImproperlyConfigured):
+            LazyView('bookings.views.check_availability').load()
+
+    def test_startup_profile_command(self):
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'startup.json')
+            call_command('startup_profile', '--path', '/login/', '--repeat', '1', '--output', path, stdout=out)
+            with open(path) as f:
+                results = json.load(f)
+        self.assertEqual(results['status'], 200)
+        self.assertGreater(results['timings']['first_response_ms'], 0)
+        self.assertIn('time to first response', out.getvalue())
+        self.assertIn('first_request', out.getvalue())
+
+
 class ViewTest(TestCase):
     def setUp(self):
         self.client.login(username='testuser', password='testpassword')
@@ -1,6 +1,13 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
+from .lazy import lazy_view
+
+
+def staff(name):
+    # Staff views load on first use (see staff_views)
+    return lazy_view(f'bookings.staff_views.{name}')
+
 
 urlpatterns = [
     path('', views.index, name='index'),
@@ -9,7 +16,14 @@ urlpatterns = [
     path('booking/<int:booking_id>/confirmation/', views.booking_confirmation, name='booking_confirmation'),
     path('my-bookings/', views.my_bookings, name='my_bookings'),
     path('booking/<int:booking_id>/cancel/', views.cancel_booking, name='cancel_booking'),
+    path('my-waitlist/', views.my_waitlist, name='my_waitlist'),
+    path('waitlist/<int:entry_id>/leave/', views.leave_waitlist, name='leave_waitlist'),
     path('api/check-availability/', views.check_availability, name='check_availability'),
+    path('api/availability/', views.availability_range, name='availability_range'),
+    path('api/bookings/', views.bookings_page_api, name='bookings_page_api'),
+    path('api/halls/<int:hall_id>/events/', views.hall_events, name='hall_events'),
+    path('api/free-slots/', views.free_slots_api, name='free_slots_api'),
+    path('find-slot/', views.find_slot, name='find_slot'),
     
     # Authentication URLs
     path('login/', auth_views.LoginView.as_view(template_name='bookings/login.html'), name='login'),
@@ -18,14 +32,17 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     
     # Admin Panel URLs
-    path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
-    path('manage-halls/', views.manage_halls, name='manage_halls'),
-    path('add-hall/', views.add_hall, name='add_hall'),
-    path('edit-hall/<int:hall_id>/', views.edit_hall, name='edit_hall'),
-    path('delete-hall/<int:hall_id>/', views.delete_hall, name='delete_hall'),
-    path('admin-reports/', views.admin_reports, name='admin_reports'),
+    path('admin-dashboard/', staff('admin_dashboard'), name='admin_dashboard'),
+    path('manage-halls/', staff('manage_halls'), name='manage_halls'),
+    path('add-hall/', staff('add_hall'), name='add_hall'),
+    path('edit-hall/<int:hall_id>/', staff('edit_hall'), name='edit_hall'),
+    path('delete-hall/<int:hall_id>/', staff('delete_hall'), name='delete_hall'),
+    path('admin-reports/', staff('admin_reports'), name='admin_reports'),
+    path('export-bookings/', staff('export_bookings'), name='export_bookings'),
+    path('metrics', staff('metrics'), name='metrics'),
 
-    path('pending-bookings/', views.pending_bookings, name='pending_bookings'),
-    path('booking/<int:booking_id>/approve/', views.approve_booking, name='approve_booking'),
-    path('booking/<int:booking_id>/reject/', views.reject_booking, name='reject_booking'),
+    path('pending-bookings/', staff('pending_bookings'), name='pending_bookings'),
+    path('booking/<int:booking_id>/approve/', staff('approve_booking'), name='approve_booking'),
+    path('booking/<int:booking_id>/reject/', staff('reject_booking'), name='reject_booking'),
+    path('bookings/moderate/', staff('moderate_bookings_bulk'), name='moderate_bookings_bulk'),
 ]
@@ -1,22 +1,38 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q
 from django.views.decorators.http import require_http_methods
-from datetime import datetime
-from .models import Hall, Booking
+from asgiref.sync import sync_to_async
+from datetime import date, datetime, timedelta
+from itertools import islice
+from django.utils.dateparse import parse_date
+from .models import Hall, Booking, WaitlistEntry
+from .admission import CONFLICT_MESSAGE, admit_booking
+from .availability import MAX_RANGE_DAYS, aavailability_payload
+from .pagination import InvalidCursor, akeyset_page, keyset_page
+from .catalog import aget_hall, available_halls, catalog_version
+from .recurrence import build_rule, create_series
+from .slot_search import DURATIONS, MAX_RANGE_DAYS as SLOT_SEARCH_MAX_DAYS, find_free_slots, parse_slot_query
+from . import events
+from .http_cache import conditional_view, hall_changed_at, start_of_today
+from .routers import read_only_view
+from .waitlist import join_waitlist, queue_position
 from django.contrib.auth import logout
 from django.shortcuts import redirect
 from django.views.decorators.http import require_POST
-from django.contrib.admin.views.decorators import staff_member_required
-from django.views.decorators.csrf import csrf_exempt
 
 
 from django.contrib.auth import login
-from django.contrib.auth.forms import UserCreationForm
 
 def register(request):
     """User registration view"""
+    # Only sign-ups need the auth forms; keep them out of the public pages' imports
+    from django.contrib.auth.forms import UserCreationForm
+
     if request.user.is_authenticated:
         return redirect('index')
         
@@ -32,32 +48,77 @@ def register(request):
     
     return render(request, 'bookings/register.html', {'form': form})
 
+def _catalog_validators(request):
+    return f'catalog-{catalog_version()}', None
+
+
+def _hall_validators(request, hall_id):
+    changed_at = hall_changed_at(hall_id)
+    if changed_at is None:
+        return None
+    # Past bookings drop off the page at midnight without any write
+    today = start_of_today()
+    return f'hall-{hall_id}-{changed_at:%Y%m%d%H%M%S%f}-{today:%Y%m%d}', max(changed_at, today)
+
+
+def _availability_validators(request):
+    hall_id = request.GET.get('hall_id')
+    changed_at = hall_changed_at(hall_id) if hall_id else None
+    if changed_at is None:
+        return None
+    return f'availability-{changed_at:%Y%m%d%H%M%S%f}', changed_at
+
+
+@conditional_view(_catalog_validators)
 def index(request):
     """Home page with hall listing"""
-    halls = Hall.objects.filter(available=True)
+    catalog_version, halls = available_halls()
     context = {
         'halls': halls,
-        'total_halls': halls.count(),
+        'total_halls': len(halls),
+        'catalog_version': catalog_version,
     }
     return render(request, 'bookings/index.html', context)
 
 
-def hall_detail(request, hall_id):
-    """Display hall details and bookings"""
-    hall = get_object_or_404(Hall, id=hall_id)
-    bookings = Booking.objects.filter(
-        hall=hall,
-        status__in=['approved', 'pending']
-    ).order_by('booking_date', 'start_time')
+@read_only_view
+@conditional_view(_hall_validators)
+async def hall_detail(request, hall_id):
+    """Display hall details and upcoming bookings"""
+    catalog_version, hall = await aget_hall(hall_id)
+    if hall is None:
+        raise Http404('No Hall matches the given query.')
+    try:
+        bookings, next_cursor = await akeyset_page(
+            _upcoming_hall_bookings(hall), after=request.GET.get('after')
+        )
+    except InvalidCursor:
+        return redirect('hall_detail', hall_id=hall.id)
     
     context = {
         'hall': hall,
         'bookings': bookings,
         'amenities': hall.amenities_list,
+        'next_cursor': next_cursor,
+        'catalog_version': catalog_version,
     }
+    await _load_user(request)
     return render(request, 'bookings/hall_detail.html', context)
 
 
+async def _load_user(request):
+    """Resolve the lazy request.user (and the session) before rendering in an async view"""
+    await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+def _upcoming_hall_bookings(hall):
+    return Booking.objects.filter(
+        hall=hall,
+        status__in=['approved', 'pending'],
+        booking_date__gte=datetime.now().date(),
+    )
+
+
 @login_required(login_url='login')
 def book_hall(request, hall_id):
     """Create a new booking"""
@@ -86,10 +147,28 @@ def book_hall(request, hall_id):
                 faculty=faculty,
                 status='pending'
             )
-            booking.full_clean()
-            booking.save()
-            
-            messages.success(request, f'Booking request submitted for {hall.name}!')
+            repeat = request.POST.get('repeat', 'none')
+            if repeat != 'none':
+                repeat_until = parse_date(request.POST.get('repeat_until') or '')
+                if repeat_until is None:
+                    raise ValueError("Repeat until date is required")
+                series = create_series(booking, build_rule(repeat, repeat_until))
+                booking = series[0]
+                messages.success(request, f'{len(series)} booking requests submitted for {hall.name}!')
+            else:
+                try:
+                    admit_booking(booking)
+                except ValidationError as e:
+                    if CONFLICT_MESSAGE not in e.messages or not request.POST.get('waitlist'):
+                        raise
+                    entry = join_waitlist(booking)
+                    messages.success(
+                        request,
+                        f'That slot is taken. You are number {queue_position(entry)} on the waitlist '
+                        f'for {hall.name} on {entry.booking_date:%b %d}.',
+                    )
+                    return redirect('my_waitlist')
+                messages.success(request, f'Booking request submitted for {hall.name}!')
             return redirect('booking_confirmation', booking_id=booking.id)
         
         except Exception as e:
@@ -102,8 +181,14 @@ def book_hall(request, hall_id):
 @login_required(login_url='login')
 def booking_confirmation(request, booking_id):
     """Show booking confirmation"""
-    booking = get_object_or_404(Booking, id=booking_id, user=request.user)
+    booking = get_object_or_404(Booking.objects.select_related('hall', 'recurrence'), id=booking_id, user=request.user)
     context = {'booking': booking}
+    if booking.recurrence:
+        # Only the next few dates are expanded for display
+        context['occurrences'] = list(islice(
+            booking.recurrence.occurrences(after=booking.booking_date), 10
+        ))
+        context['occurrence_count'] = booking.recurrence.bookings.count()
     return render(request, 'bookings/booking_confirmation.html', context)
 
 
@@ -113,12 +198,23 @@ def my_bookings(request):
     if request.user.is_staff:
         return redirect('admin_dashboard')
         
-    bookings = Booking.objects.filter(user=request.user).order_by('-created_at')
+    bookings = Booking.objects.filter(user=request.user)
+    counts = bookings.aggregate(
+        total_count=Count('id'),
+        pending_count=Count('id', filter=Q(status='pending')),
+        approved_count=Count('id', filter=Q(status='approved')),
+    )
+    try:
+        page, next_cursor = keyset_page(
+            bookings.select_related('hall'), after=request.GET.get('after'), descending=True
+        )
+    except InvalidCursor:
+        return redirect('my_bookings')
     
     context = {
-        'bookings': bookings,
-        'pending_count': bookings.filter(status='pending').count(),
-        'approved_count': bookings.filter(status='approved').count(),
+        'bookings': page,
+        'next_cursor': next_cursor,
+        **counts,
     }
     return render(request, 'bookings/my_bookings.html', context)
 
@@ -130,7 +226,9 @@ def cancel_booking(request, booking_id):
     
     if booking.status in ['pending', 'approved']:
         booking.status = 'cancelled'
-        booking.save()
+        # The freed slot goes to the waitlist in the same transaction
+        with transaction.atomic():
+            booking.save()
         messages.success(request, 'Booking cancelled successfully!')
     else:
         messages.error(request, 'Cannot cancel this booking.')
@@ -138,136 +236,186 @@ def cancel_booking(request, booking_id):
     return redirect('my_bookings')
 
 
-@require_http_methods(["GET"])
-def check_availability(request):
+@login_required(login_url='login')
+def my_waitlist(request):
+    """Display the user's waitlist entries that are still waiting"""
+    entries = WaitlistEntry.objects.filter(user=request.user, status='waiting').select_related('hall')
+    context = {'entries': entries.order_by('booking_date', 'start_time')}
+    return render(request, 'bookings/my_waitlist.html', context)
+
+
+@login_required(login_url='login')
+@require_POST
+def leave_waitlist(request, entry_id):
+    """Withdraw from a waitlist"""
+    updated = WaitlistEntry.objects.filter(id=entry_id, user=request.user, status='waiting').update(status='withdrawn')
+    if updated:
+        messages.success(request, 'You have left the waitlist.')
+    else:
+        messages.error(request, 'You are not on that waitlist.')
+    return redirect('my_waitlist')
+
+
+@read_only_view
+@conditional_view(_availability_validators, per_user=False)
+async def check_availability(request):
     """AJAX endpoint to check hall availability"""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
     hall_id = request.GET.get('hall_id')
     booking_date = request.GET.get('date')
     
     if not hall_id or not booking_date:
         return JsonResponse({'available': False})
-    
+    if not hall_id.isdigit():
+        return JsonResponse({'error': 'Invalid hall_id'}, status=400)
     try:
-        hall = Hall.objects.get(id=hall_id)
-        is_available = hall.is_available_on_date(booking_date)
+        booking_date = date.fromisoformat(booking_date)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date'}, status=400)
+
+    try:
+        hall = await Hall.objects.aget(id=hall_id)
+        is_available = await hall.ais_available_on_date(booking_date)
         return JsonResponse({'available': is_available})
     except Hall.DoesNotExist:
         return JsonResponse({'available': False})
 
 
-@require_POST
-def logout_view(request):
-    """Log out user via POST and redirect to index."""
-    logout(request)
-    return redirect('index')
-
-
-@staff_member_required
-def pending_bookings(request):
-    """List all pending bookings for staff to review."""
-    bookings = Booking.objects.filter(status='pending').order_by('booking_date', 'start_time')
-    return render(request, 'bookings/pending_bookings.html', {'bookings': bookings})
+@read_only_view
+async def availability_range(request):
+    """Busy-slot bitmaps per hall and day for a date range (default: next 30 days)"""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        date_from = date.fromisoformat(request.GET.get('from') or datetime.now().date().isoformat())
+        date_to = date.fromisoformat(request.GET.get('to') or (date_from + timedelta(days=30)).isoformat())
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date'}, status=400)
+    if date_to < date_from or (date_to - date_from).days >= MAX_RANGE_DAYS:
+        return JsonResponse({'error': f'Range must be between 1 and {MAX_RANGE_DAYS} days'}, status=400)
 
+    hall_id = request.GET.get('hall_id')
+    if hall_id:
+        halls = [hall async for hall in Hall.objects.filter(id=hall_id)] if hall_id.isdigit() else []
+        if not halls:
+            return JsonResponse({'error': 'Hall not found'}, status=404)
+    else:
+        halls = [hall async for hall in Hall.objects.filter(available=True)]
 
-@staff_member_required
-@require_POST
-def approve_booking(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
-    booking.status = 'approved'
-    booking.approved_by = request.user
-    booking.rejection_reason = ''
-    booking.save()
-    messages.success(request, f'Booking #{booking.id} approved.')
-    return redirect('pending_bookings')
+    return JsonResponse(await aavailability_payload(halls, date_from, date_to))
 
 
-@staff_member_required
-@require_POST
-def reject_booking(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
-    reason = request.POST.get('rejection_reason', '')
-    booking.status = 'rejected'
-    booking.rejection_reason = reason
-    booking.approved_by = request.user
-    booking.save()
-    messages.success(request, f'Booking #{booking.id} rejected.')
-    return redirect('pending_bookings')
-
-
-@staff_member_required
-def admin_dashboard(request):
-    """Admin dashboard to manage bookings and halls"""
-    context = {
-        'pending_count': Booking.objects.filter(status='pending').count(),
-        'total_halls': Hall.objects.count(),
-    }
-    return render(request, 'bookings/admin_dashboard.html', context)
+@read_only_view
+def find_slot(request):
+    """Search every hall for a free slot that fits the event"""
+    context = {'durations': DURATIONS, 'max_range_days': SLOT_SEARCH_MAX_DAYS}
+    if request.GET:
+        try:
+            query = parse_slot_query(request.GET)
+        except ValueError as e:
+            context['error'] = str(e)
+        else:
+            _, halls = available_halls()
+            context['query'] = query
+            context['results'] = find_free_slots(query, halls)
+    return render(request, 'bookings/find_slot.html', context)
 
-from .forms import HallForm
 
-@staff_member_required
-def manage_halls(request):
-    """List and manage halls"""
-    halls = Hall.objects.all()
-    return render(request, 'bookings/manage_halls.html', {'halls': halls})
+@require_http_methods(["GET"])
+@read_only_view
+def free_slots_api(request):
+    """Ranked free (hall, date, start) candidates as JSON"""
+    try:
+        query = parse_slot_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    _, halls = available_halls()
+    return JsonResponse({
+        'query': query.to_dict(),
+        'results': [candidate.to_dict() for candidate in find_free_slots(query, halls)],
+    })
+
+
+async def hall_events(request, hall_id):
+    """Server-sent stream of availability changes for one hall"""
+    if not events.serves_streams(request):
+        # 204 tells EventSource to stop reconnecting (see events)
+        return HttpResponse(status=204)
+    _, hall = await aget_hall(hall_id)
+    if hall is None:
+        raise Http404('No Hall matches the given query.')
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
 
-@staff_member_required
-def add_hall(request):
-    """Add a new hall"""
-    if request.method == 'POST':
-        form = HallForm(request.POST)
-        if form.is_valid():
-            form.save()
-            messages.success(request, 'New hall added successfully!')
-            return redirect('manage_halls')
-    else:
-        form = HallForm()
-    return render(request, 'bookings/hall_form.html', {'form': form})
+    response = StreamingHttpResponse(
+        events.stream(events.hall_channel(hall.id), last_event_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
-@staff_member_required
-def edit_hall(request, hall_id):
-    """Edit an existing hall"""
-    hall = get_object_or_404(Hall, id=hall_id)
-    if request.method == 'POST':
-        form = HallForm(request.POST, instance=hall)
-        if form.is_valid():
-            form.save()
-            messages.success(request, 'Hall updated successfully!')
-            return redirect('manage_halls')
-    else:
-        form = HallForm(instance=hall)
-    return render(request, 'bookings/hall_form.html', {'form': form})
 
-@staff_member_required
-def delete_hall(request, hall_id):
-    """Delete a hall"""
-    hall = get_object_or_404(Hall, id=hall_id)
-    if request.method == 'POST':
-        hall.delete()
-        messages.success(request, 'Hall deleted successfully!')
-        return redirect('manage_halls')
-    return render(request, 'bookings/hall_confirm_delete.html', {'hall': hall})
+@require_POST
+def logout_view(request):
+    """Log out user via POST and redirect to index."""
+    logout(request)
+    return redirect('index')
 
 
-from django.db.models import Count
+@require_http_methods(["GET"])
+def bookings_page_api(request):
+    """JSON keyset pages of bookings.
+
+    ``scope`` is ``hall`` (upcoming bookings of ``hall_id``), ``mine`` (the
+    signed-in user's bookings) or ``pending`` (staff only). Pass the
+    returned ``next`` value as ``after`` to get the following page.
+    """
+    scope = request.GET.get('scope', 'hall')
+    descending = False
+    if scope == 'hall':
+        hall_id = request.GET.get('hall_id', '')
+        hall = Hall.objects.filter(id=hall_id).first() if hall_id.isdigit() else None
+        if hall is None:
+            return JsonResponse({'error': 'Hall not found'}, status=404)
+        bookings = _upcoming_hall_bookings(hall)
+    elif scope == 'mine':
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        bookings = Booking.objects.filter(user=request.user)
+        descending = True
+    elif scope == 'pending':
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'Staff access required'}, status=403)
+        bookings = Booking.objects.filter(status='pending')
+    else:
+        return JsonResponse({'error': 'Unknown scope'}, status=400)
 
-@staff_member_required
-def admin_reports(request):
-    """View booking reports"""
-    # Summary stats
-    total_bookings = Booking.objects.count()
-    status_counts = Booking.objects.values('status').annotate(count=Count('id'))
-    
-    # Hall popularity
-    hall_stats = Booking.objects.values('hall__name').annotate(count=Count('id')).order_by('-count')
-    
-    # Recent activity
-    recent_bookings = Booking.objects.select_related('user', 'hall').order_by('-created_at')[:10]
-    
-    context = {
-        'total_bookings': total_bookings,
-        'status_counts': status_counts,
-        'hall_stats': hall_stats,
-        'recent_bookings': recent_bookings,
-    }
-    return render(request, 'bookings/admin_reports.html', context)
+    try:
+        page, next_cursor = keyset_page(
+            bookings.select_related('hall'), after=request.GET.get('after'), descending=descending
+        )
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': b.id,
+                'hall_id': b.hall_id,
+                'hall_name': b.hall.name,
+                'booking_date': b.booking_date.isoformat(),
+                'start_time': b.start_time.strftime('%H:%M'),
+                'end_time': b.end_time.strftime('%H:%M'),
+                'purpose': b.purpose,
+                'status': b.status,
+            }
+            for b in page
+        ],
+        'next': next_cursor,
+    })
@@ -0,0 +1,108 @@
+"""Waitlist for taken slots.
+
+A booking request that conflicts can be queued as a ``WaitlistEntry`` for
+its hall and day instead of being resubmitted until the slot frees up.
+When an active booking is cancelled, rejected, moved or deleted,
+``promote_waitlist`` runs in the same transaction under the hall-day lock
+(see ``admission``). One indexed query reads that day's queue in promotion
+order, lowest ``priority`` (the faculty's rank in
+``WAITLIST_FACULTY_PRIORITY``) first and then by request time, and every
+entry whose slot is now free becomes a pending Booking, and its owner is
+notified through the outbox.
+
+A user can wait only once for the same hall, day and start time
+(``waitlist_waiting_uniq``).
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .admission import lock_hall_day
+from .conflicts import ACTIVE_STATUSES, IntervalSet
+from .models import Booking, WaitlistEntry
+from .outbox import enqueue_status_changes
+
+
+ALREADY_WAITING_MESSAGE = "You are already on the waitlist for this slot"
+
+
+def faculty_priority(faculty):
+    """Rank of ``faculty`` in WAITLIST_FACULTY_PRIORITY; unlisted faculties share the last rank."""
+    order = list(getattr(settings, 'WAITLIST_FACULTY_PRIORITY', ()))
+    return order.index(faculty) if faculty in order else len(order)
+
+
+def join_waitlist(booking):
+    """Queue the unsaved, conflicting ``booking`` request; return the entry."""
+    booking.clean_fields()
+    booking.validate_request()
+    slot = dict(
+        hall=booking.hall, user=booking.user, booking_date=booking.booking_date,
+        start_time=booking.start_time,
+    )
+    if WaitlistEntry.objects.filter(**slot, status='waiting').exists():
+        raise ValidationError(ALREADY_WAITING_MESSAGE)
+    try:
+        with transaction.atomic():
+            return WaitlistEntry.objects.create(
+                **slot,
+                end_time=booking.end_time,
+                purpose=booking.purpose,
+                expected_attendees=booking.expected_attendees,
+                faculty=booking.faculty,
+                priority=faculty_priority(booking.faculty),
+            )
+    except IntegrityError:
+        # A second request for the same slot got in first
+        raise ValidationError(ALREADY_WAITING_MESSAGE)
+
+
+def queue_position(entry):
+    """1-based place of a waiting ``entry`` in its hall-day queue."""
+    ahead = (
+        Q(priority__lt=entry.priority)
+        | Q(priority=entry.priority, created_at__lt=entry.created_at)
+        | Q(priority=entry.priority, created_at=entry.created_at, id__lte=entry.id)
+    )
+    return WaitlistEntry.objects.filter(
+        ahead, hall_id=entry.hall_id, booking_date=entry.booking_date, status='waiting',
+    ).count()
+
+
+def promote_waitlist(hall_days):
+    """Promote waiting entries whose slot is free on each ``(hall_id, date)``.
+
+    Returns the new pending bookings; their owners are notified.
+    """
+    today = datetime.now().date()
+    promoted = []
+    with transaction.atomic():
+        for hall_id, day in sorted(set(hall_days)):
+            if day < today:
+                continue
+            lock_hall_day(hall_id, day)
+            queue = list(WaitlistEntry.objects.filter(
+                hall_id=hall_id, booking_date=day, status='waiting',
+            ).select_related('hall', 'user').order_by('priority', 'created_at', 'id'))
+            if not queue:
+                continue
+            taken = IntervalSet(Booking.objects.filter(
+                hall_id=hall_id, booking_date=day, status__in=ACTIVE_STATUSES,
+            ).values_list('start_time', 'end_time'))
+            for entry in queue:
+                # The hall may have shrunk since the entry was queued
+                if entry.expected_attendees > entry.hall.capacity:
+                    continue
+                if taken.try_add(entry.start_time, entry.end_time):
+                    booking = entry.to_booking()
+                    booking.user = entry.user
+                    booking.save(validate=False)
+                    entry.status = 'promoted'
+                    entry.booking = booking
+                    entry.save(update_fields=['status', 'booking'])
+                    promoted.append(booking)
+        enqueue_status_changes(promoted, 'promoted')
+    return promoted
@@ -1,3 +1,4 @@
+import argparse
 import os
 import django
 
@@ -6,6 +7,12 @@ django.setup()
 
 from bookings.models import Hall
 
+parser = argparse.ArgumentParser(description='Create the college halls')
+parser.add_argument('--synthetic', type=int, default=0, metavar='N',
+                    help='Also create N deterministic benchmark halls')
+parser.add_argument('--seed', type=int, default=1234)
+args = parser.parse_args()
+
 halls_data = [
     {
         'name': 'Saibaba Hall',
@@ -52,3 +59,8 @@ for data in halls_data:
 # Hall.objects.exclude(name__in=[h['name'] for h in halls_data]).update(amenities='')
 
 print("\nHall amenities removed and updated.")
+
+if args.synthetic:
+    from bookings.seed import seed_halls
+    seed_halls(args.synthetic, seed=args.seed)
+    print(f"Created {args.synthetic} synthetic halls (seed {args.seed}).")
@@ -1,3 +1,4 @@
+import argparse
 import os
 import django
 
@@ -6,6 +7,14 @@ django.setup()
 
 from django.contrib.auth import get_user_model
 
+parser = argparse.ArgumentParser(description='Create the test users')
+parser.add_argument('--synthetic', type=int, default=0, metavar='M',
+                    help='Also create M benchmark users (bench_user00000, ...)')
+parser.add_argument('--bookings', type=int, default=0, metavar='K',
+                    help='Also create K deterministic bookings over all halls and regular users')
+parser.add_argument('--seed', type=int, default=1234)
+args = parser.parse_args()
+
 User = get_user_model()
 
 users = [
@@ -38,3 +47,12 @@ for u in users:
 print('\nTest users are ready:')
 print(' - student1 / studentpass  (regular user)')
 print(' - admin / admin  (superuser)')
+
+if args.synthetic:
+    from bookings.seed import seed_users
+    seed_users(args.synthetic)
+    print(f"\nCreated {args.synthetic} synthetic users.")
+if args.bookings:
+    from bookings.seed import seed_bookings
+    created = seed_bookings(args.bookings, seed=args.seed)
+    print(f"Created {len(created)} synthetic bookings (seed {args.seed}).")
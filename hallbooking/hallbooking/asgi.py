@@ -0,0 +1,20 @@
+"""
+ASGI config for hallbooking project.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hallbooking.settings')
+# Each sync_to_async thread would keep its own persistent connection, and a
+# busy worker would run the database out of connections. Close them after
+# each request unless DB_CONN_MAX_AGE says otherwise (e.g. behind PgBouncer).
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
+application = get_asgi_application()
+
+# Parse every template now rather than on the first requests
+from bookings.precompile import precompile_templates  # noqa: E402
+
+precompile_templates()
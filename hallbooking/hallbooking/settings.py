@@ -7,10 +7,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-hallbooking-secret-key-change-in-production')
 
+# Deployment profile. "production" (the default) runs with DEBUG off and has
+# web workers compile every template at startup; "development" turns DEBUG
+# on. DJANGO_DEBUG overrides DEBUG on its own.
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = 'RENDER' not in os.environ
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'production')
+DEBUG = os.environ.get('DJANGO_DEBUG', str(DJANGO_ENV == 'development')).lower() in ('1', 'true', 'yes', 'on')
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',') if host]
 RENDER_EXTERNAL_HOSTNAME = os.environ.get('RENDER_EXTERNAL_HOSTNAME')
 if RENDER_EXTERNAL_HOSTNAME:
     ALLOWED_HOSTS.append(RENDER_EXTERNAL_HOSTNAME)
@@ -18,7 +22,9 @@ if RENDER_EXTERNAL_HOSTNAME:
 ALLOWED_HOSTS.append('.onrender.com')
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # No admin autodiscovery: only bookings' admin_site is served, and the
+    # URLconf imports bookings/admin.py on the first request, not django.setup()
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -28,8 +34,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bookings.metrics.QueryMetricsMiddleware',
+    'bookings.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'bookings.middleware.StaticFilesMiddleware',
+    'bookings.middleware.JSONCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -44,27 +53,66 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'bookings.events.live_events',
+            ],
+            # Each template is parsed once per process; runserver drops the
+            # cache when a template file changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
 
+# Web workers parse every bookings template at startup (bookings/precompile.py)
+TEMPLATE_PRECOMPILE = not DEBUG
+
 WSGI_APPLICATION = 'hallbooking.wsgi.application'
 
+# Connections persist for DB_CONN_MAX_AGE seconds and are checked before
+# reuse, so one dropped by the server or a pooler is replaced instead of
+# failing the request. These are persistent connections, one per thread,
+# not a pool. Under ASGI every sync_to_async thread holds one, so
+# hallbooking/asgi.py defaults DB_CONN_MAX_AGE to 0 there; to keep
+# connections open under ASGI, put an external pooler such as PgBouncer in
+# front of the database. Behind PgBouncer in transaction mode set
+# DATABASE_POOLER=pgbouncer: server-side cursors do not survive it.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
 DATABASES = {
     'default': dj_database_url.config(
         default='sqlite:///' + str(BASE_DIR / 'db.sqlite3'),
-        conn_max_age=600
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
     )
 }
 
+# Read replicas (bookings/routers.py): comma-separated URLs become the
+# aliases replica_1, replica_2, ... Read-only views and reports read from
+# them; a browser that just wrote stays on the primary for
+# REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for i, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    alias = f'replica_{i}'
+    DATABASES[alias] = dj_database_url.parse(
+        url.strip(), conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True,
+    )
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+if os.environ.get('DATABASE_POOLER') == 'pgbouncer':
+    for database in DATABASES.values():
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+DATABASE_ROUTERS = ['bookings.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 15))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -80,6 +128,41 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Session/auth profile. SESSION_PROFILE picks where sessions live:
+#   db             - one query per request to load the session
+#   cached_db      - cache first, database on a miss (default)
+#   signed_cookies - no server-side storage; logging out elsewhere or
+#                    flushing sessions cannot revoke a stolen cookie
+SESSION_PROFILE = os.environ.get('SESSION_PROFILE', 'cached_db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_PROFILE]
+
+# request.user comes from the cache (bookings/auth.py); 0 disables it.
+# CachedModelBackend is a ModelBackend, so it is the only backend: a second
+# one would check every failed login's password again. Sessions signed in
+# through django.contrib.auth.backends.ModelBackend before it was introduced
+# end, and their users sign in once more.
+AUTHENTICATION_BACKENDS = ['bookings.auth.CachedModelBackend']
+AUTH_USER_CACHE = 'default'
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 60))
+
+# New passwords use the first hasher; hashes made with the others still
+# verify and are upgraded on the next login. With Django's defaults scrypt
+# costs ~50ms per login against ~270ms for PBKDF2 (600k iterations), see
+# `manage.py benchmark --hashers`. argon2 needs the argon2-cffi package.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+password_hashers = {
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'bcrypt_sha256': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [password_hashers.pop(PASSWORD_HASHER), *password_hashers.values()]
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -89,17 +172,67 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'
-if not DEBUG:
-    STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Hashed, compressed file names once collectstatic (build.sh) has written its
+# manifest; plain names before that, e.g. in development and the tests
+if (STATIC_ROOT / 'staticfiles.json').exists():
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-else:
-    STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at e.g.
+# django.core.cache.backends.redis.RedisCache to share across workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'hallbooking'),
+    }
+}
+
+# Anonymous catalog pages may be cached this long by browsers and proxies
+# (bookings/http_cache.py); everything else revalidates with ETags.
+PUBLIC_PAGE_MAX_AGE = int(os.environ.get('PUBLIC_PAGE_MAX_AGE', 60))
+
+# Hall catalog cache (bookings/catalog.py). A hall edit only invalidates
+# the catalog of the process that saved it unless this cache is shared by
+# every worker (Redis, Memcached); the others catch up within the timeout,
+# so only raise it with a shared cache.
+HALL_CATALOG_CACHE = 'default'
+HALL_CATALOG_TIMEOUT = int(os.environ.get('HALL_CATALOG_TIMEOUT', 60))
+
 # Custom User Model
 AUTH_USER_MODEL = 'auth.User'
 
 # Redirect after login: avoid default /accounts/profile/ 404
 LOGIN_REDIRECT_URL = '/my-bookings/'
+
+# Request/SQL metrics (bookings/metrics.py), served at /metrics.
+# Each sampled request pays for timing its SQL, so only 5% are sampled by
+# default; set 1 to see every request, 0 to turn collection off.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '0.05'))
+METRICS_SLOW_REQUEST_SECONDS = float(os.environ.get('METRICS_SLOW_REQUEST_SECONDS', '1.0'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Waitlist promotion order (bookings/waitlist.py): faculties listed here are
+# served first, in this order; the rest follow. Ties go by request time.
+WAITLIST_FACULTY_PRIORITY = []
+
+# Live availability events (bookings/events.py), streamed at
+# /api/halls/<id>/events/. The in-process backend only reaches viewers
+# connected to the same process.
+BOOKING_EVENTS_BACKEND = os.environ.get('BOOKING_EVENTS_BACKEND', 'bookings.events.InProcessBackend')
+BOOKING_EVENTS_REPLAY = 200
+BOOKING_EVENTS_HEARTBEAT_SECONDS = 15
+BOOKING_EVENTS_STREAM_SECONDS = 300
+
+# Booking status notifications (bookings/outbox.py), queued in the database
+# and sent by manage.py run_outbox_worker. Email goes through EMAIL_BACKEND;
+# NOTIFICATION_BACKEND=bookings.outbox.FileBackend writes every message to
+# NOTIFICATION_FILE_PATH (or stdout) instead of sending it.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@hallbooking.local')
+NOTIFICATION_BACKEND = os.environ.get('NOTIFICATION_BACKEND', 'bookings.outbox.DeliveryBackend')
+NOTIFICATION_FILE_PATH = os.environ.get('NOTIFICATION_FILE_PATH', '')
+NOTIFICATION_WEBHOOK_URLS = [url for url in os.environ.get('NOTIFICATION_WEBHOOK_URLS', '').split(',') if url]
+NOTIFICATION_MAX_ATTEMPTS = 6
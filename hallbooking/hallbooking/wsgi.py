@@ -9,3 +9,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hallbooking.settings')
 
 application = get_wsgi_application()
+
+# Parse every template now rather than on the first requests
+from bookings.precompile import precompile_templates  # noqa: E402
+
+precompile_templates()
@@ -55,21 +55,58 @@ function validateForm(formId) {
 }
 
 // AJAX availability check
-function checkAvailability(hallId, date) {
+// One request per hall and month; each day is a 96-bit busy-slot bitmap
+// (15-minute slots, slot 0 = lowest bit) sent as a hex string.
+const SLOT_MINUTES = 15;
+const availabilityCache = {};
+
+function fetchMonthAvailability(hallId, date) {
+    const month = date.slice(0, 7);
+    const key = `${hallId}:${month}`;
+    if (!availabilityCache[key]) {
+        const [year, mon] = month.split('-').map(Number);
+        const lastDay = String(new Date(year, mon, 0).getDate()).padStart(2, '0');
+        availabilityCache[key] = fetch(`/api/availability/?hall_id=${hallId}&from=${month}-01&to=${month}-${lastDay}`)
+            .then(response => response.json())
+            .then(data => (data.halls && data.halls.length) ? data.halls[0].days : {})
+            .catch(error => {
+                delete availabilityCache[key];
+                throw error;
+            });
+    }
+    return availabilityCache[key];
+}
+
+function toSlot(timeValue, roundUp) {
+    const [h, m] = timeValue.split(':').map(Number);
+    const minutes = h * 60 + m;
+    return roundUp ? Math.ceil(minutes / SLOT_MINUTES) : Math.floor(minutes / SLOT_MINUTES);
+}
+
+function isSlotRangeFree(bitmapHex, startTime, endTime) {
+    const busy = BigInt('0x' + (bitmapHex || '0'));
+    if (!startTime || !endTime) return busy === 0n;
+    const first = toSlot(startTime, false);
+    const last = toSlot(endTime, true);
+    if (last <= first) return true;
+    const mask = ((1n << BigInt(last - first)) - 1n) << BigInt(first);
+    return (busy & mask) === 0n;
+}
+
+function checkAvailability(hallId, date, startTime, endTime) {
     if (!date) return;
 
-    fetch(`/api/check-availability/?hall_id=${hallId}&date=${date}`)
-        .then(response => response.json())
-        .then(data => {
+    fetchMonthAvailability(hallId, date)
+        .then(days => {
             const check = document.getElementById('availabilityCheck');
             if (check) {
-                const text = document.getElementById('availabilityText');
-                if (data.available) {
+                const content = document.getElementById('availabilityContent');
+                if (isSlotRangeFree(days[date], startTime, endTime)) {
                     check.className = 'availability-check available';
-                    text.textContent = '✓ This date appears to be available';
+                    content.innerHTML = '<div class="availability-message success"><span class="icon">✓</span> <span>This date appears to be available</span></div>';
                 } else {
                     check.className = 'availability-check unavailable';
-                    text.textContent = '⚠ This date may have conflicts. Please choose another time slot.';
+                    content.innerHTML = '<div class="availability-message warning"><span class="icon">⚠️</span> <span>This date may have conflicts. Please choose another time slot.</span></div>';
                 }
                 check.style.display = 'block';
             }
@@ -77,6 +114,30 @@ function checkAvailability(hallId, date) {
         .catch(error => console.error('Error checking availability:', error));
 }
 
+// Live availability: one server-sent event stream per hall. Each
+// "availability" event carries a day's new bitmap and patches the month
+// cache; "reset" means updates were missed, so the cache is dropped.
+// EventSource reconnects by itself and resumes from the last event id.
+function watchHallAvailability(hallId, onChange) {
+    if (!window.EventSource) return null;
+    const source = new EventSource(`/api/halls/${hallId}/events/`);
+    source.addEventListener('availability', event => {
+        const data = JSON.parse(event.data);
+        const key = `${hallId}:${data.date.slice(0, 7)}`;
+        if (availabilityCache[key]) {
+            availabilityCache[key] = availabilityCache[key].then(days => ({ ...days, [data.date]: data.busy }));
+        }
+        if (onChange) onChange(data);
+    });
+    source.addEventListener('reset', () => {
+        Object.keys(availabilityCache)
+            .filter(key => key.startsWith(`${hallId}:`))
+            .forEach(key => delete availabilityCache[key]);
+        if (onChange) onChange(null);
+    });
+    return source;
+}
+
 // Smooth scroll for navigation
 document.querySelectorAll('a[href^="#"]').forEach(anchor => {
     anchor.addEventListener('click', function (e) {